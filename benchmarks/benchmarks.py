@@ -0,0 +1,170 @@
+"""Benchmarks of the hot paths of building and rendering component trees, in the format of
+airspeed velocity (asv), which runs them for each commit and tracks the results over time.
+
+    asv run                     # Benchmarks the latest commit
+    asv continuous HEAD~1 HEAD  # Reports the regressions between two commits
+    asv publish && asv preview  # Shows the results over time
+
+A benchmark can also be run directly, for example
+`python -m benchmarks.benchmarks Render.time_get_template 1000 app`."""
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+
+from panel_components import tags
+from panel_components.component import template_cache
+from panel_components.utils import inline_cache, inline_uri_cache, make_inline_uri
+
+# Deterministic contents, so that every run publishes and inlines the same bytes
+_IMAGE_BYTES = bytes(range(256)) * 4
+_JS = "var count = 0;\nfunction increment() {\n  count += 1;\n}\n" * 200
+_CSS = "body {\n  margin: 0;\n}\n.item {\n  color: #333;\n}\n" * 200
+
+
+def build_tree(width, depth):
+    """Returns a list with width items, each holding a paragraph nested in depth divs. Every tenth
+    paragraph has an image, which is inlined unless the tree has a main."""
+
+    def build_item(index):
+        children = ["Item {}".format(index)]
+        if index % 10 == 0:
+            children.append(tags.img(src="image.png"))
+        node = tags.p(*children, id="item-{}".format(index))
+        for _ in range(depth):
+            node = tags.div(node)
+        return tags.li(node)
+
+    root = tags.ul(*[build_item(index) for index in range(width)])
+    root.add_classes("items")
+    root.append_body_js(app="app.js")
+    root.prepend_body_css(app="app.css")
+    return root
+
+
+class _PageFolder:
+    """Runs each benchmark in a new working folder with the www folder of the assets."""
+
+    def setup_folder(self):
+        self.cwd = os.getcwd()
+        self.folder = tempfile.mkdtemp()
+        os.chdir(self.folder)
+        www = os.path.join(self.folder, "www")
+        os.mkdir(www)
+        with open(os.path.join(www, "image.png"), "wb") as image:
+            image.write(_IMAGE_BYTES)
+        with open(os.path.join(www, "app.js"), "w") as js:
+            js.write(_JS)
+        with open(os.path.join(www, "app.css"), "w") as css:
+            css.write(_CSS)
+
+    def teardown(self, *params):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+
+class TreeBuild:
+    params = ([10, 100, 1000], [1, 4])
+    param_names = ["width", "depth"]
+
+    def time_build(self, width, depth):
+        build_tree(width, depth)
+
+    def peakmem_build(self, width, depth):
+        build_tree(width, depth)
+
+
+class Render(_PageFolder):
+    params = ([100, 1000], ["", "app"])
+    param_names = ["width", "main"]
+
+    def setup(self, width, main):
+        self.setup_folder()
+        self.tree = build_tree(width, 2)
+        self.tree.main = main
+        self.tree._get_template(["www"])  # Publishes the assets and fills the caches
+
+    def time_get_html(self, width, main):
+        self.tree.get_html(self.tree.main, nb=False)
+
+    def time_get_template(self, width, main):
+        self.tree._get_template(["www"])
+
+    def time_get_nb_template(self, width, main):
+        self.tree._get_nb_template(["www"], nb=True)
+
+    def time_repr_html(self, width, main):
+        self.tree._repr_html_(nb=True)
+
+    def time_collect_resources(self, width, main):
+        self.tree.collect_resources()
+
+    def time_fingerprint(self, width, main):
+        self.tree.fingerprint()
+
+    def time_get_page(self, width, main):
+        self.tree.get_page()
+
+    def time_get_template_cold(self, width, main):
+        inline_cache.clear()
+        inline_uri_cache.clear()
+        template_cache.invalidate()
+        self.tree._get_template(["www"])
+
+
+class TableBuild:
+    params = ([1000, 100000], ["tags", "table_from_frame", "virtual_table"])
+    param_names = ["cells", "builder"]
+
+    def setup(self, cells, builder):
+        self.rows = [[index * 10 + column for column in range(10)] for index in range(cells // 10)]
+
+    def time_build_and_render(self, cells, builder):
+        if builder == "tags":
+            table = tags.table(
+                tags.tbody(*[tags.tr(*[tags.td(value) for value in row]) for row in self.rows])
+            )
+        elif builder == "table_from_frame":
+            table = tags.table_from_frame(self.rows)
+        else:
+            table = tags.virtual_table(self.rows)
+        table.get_html("", nb=False)
+
+
+class InlineUri(_PageFolder):
+    params = [1024, 1024 * 1024]
+    param_names = ["size"]
+
+    def setup(self, size):
+        self.setup_folder()
+        with open(os.path.join("www", "large.png"), "wb") as image:
+            image.write(_IMAGE_BYTES * (size // len(_IMAGE_BYTES)))
+        make_inline_uri("large.png", "www")
+
+    def time_make_inline_uri(self, size):
+        make_inline_uri("large.png", "www")
+
+    def time_make_inline_uri_uncached(self, size):
+        inline_uri_cache.clear()
+        make_inline_uri("large.png", "www")
+
+
+def _run(name, *params):
+    class_name, method_name = name.split(".")
+    benchmark = globals()[class_name]()
+    params = [int(param) if param.isdigit() else param for param in params]
+    if hasattr(benchmark, "setup"):
+        benchmark.setup(*params)
+    try:
+        method = getattr(benchmark, method_name)
+        number = 10
+        seconds = min(timeit.repeat(lambda: method(*params), number=number, repeat=3))
+        print("{} {}: {:.3f} ms".format(name, params, seconds / number * 1000))
+    finally:
+        if hasattr(benchmark, "teardown"):
+            benchmark.teardown(*params)
+
+
+if __name__ == "__main__":
+    _run(*sys.argv[1:])
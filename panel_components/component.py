@@ -1,24 +1,44 @@
 # -*- coding: utf-8 -*-
 from __future__ import print_function, division
 
+import os
+import re
 import html
+import datetime
 import uuid
 import json
+import hashlib
 import itertools
+import threading
+import weakref
+from collections import namedtuple, OrderedDict
+from types import MappingProxyType
 
 import panel as pn
+from bokeh.embed import components as bokeh_components
+from bokeh.io import curdoc
+from jinja2 import Template
 
 from .utils import (
     IS_A_JUPYTER_NOTEBOOK,
     is_a_number,
     template_escape,
     get_dir_name,
+    find_src_file,
     get_inline_js,
     get_inline_css,
     make_available,
+    make_available_fingerprinted,
+    make_bundle,
     can_make_inline_uri,
     make_inline_uri,
+    write_text_file,
+    publish_manifest,
+    recording_published_files,
+    _read_file,
 )
+from .minify import minify, minify_css, minify_js
+from .critical import get_critical_css, get_selector_names
 
 try:
     from urllib.parse import urlsplit
@@ -106,6 +126,563 @@ PYVIZ_EXTENSIONS = {
 }
 
 
+# The pyviz extensions needed by Panel objects, by the name of their class or
+# of one of its bases. LaTeX panes need the extension of their renderer.
+PANEL_EXTENSIONS = {
+    "Ace": "ace",
+    "Plotly": "plotly",
+    "Vega": "vega",
+    "VTK": "vtk",
+    "VTKVolume": "vtk",
+}
+# The extensions that only Panel objects use, unlike for example katex, that
+# can also render the math in the html of the page.
+_PANEL_ONLY_EXTENSIONS = frozenset(PANEL_EXTENSIONS.values())
+
+
+def get_panel_extensions(panels):
+    """Returns the names of the pyviz extensions that the Panel objects, and
+    the objects they contain, need."""
+    extensions = set()
+    for panel in panels:
+        if isinstance(panel, LazyPanel):
+            panel = panel.panel
+        if not isinstance(panel, pn.viewable.Viewable):
+            panel = pn.panel(panel)
+        viewables = panel.select() if hasattr(panel, "select") else [panel]
+        for viewable in viewables:
+            for cls in type(viewable).__mro__:
+                if cls.__name__ == "LaTeX":
+                    extensions.add(getattr(viewable, "renderer", None) or "katex")
+                    break
+                if cls.__name__ in PANEL_EXTENSIONS:
+                    extensions.add(PANEL_EXTENSIONS[cls.__name__])
+                    break
+    return extensions
+
+
+class LazyPanel:
+    """Wraps a Panel object, or anything pn.panel accepts, so that when it's
+    added as a child of a component the served page only creates its Bokeh
+    models once it's scrolled into view. See lazy."""
+
+    def __init__(self, panel, height=None):
+        self.panel = panel
+        self.height = height
+
+
+def lazy(panel, height=None):
+    """Returns the panel wrapped in a LazyPanel. The height, in pixels, is
+    reserved for the panel until it's rendered, defaults to the height of the
+    panel if it has one, otherwise 300."""
+    return LazyPanel(panel, height)
+
+
+class JSONText(str):
+    """Data of component_data that is already serialized as JSON, written
+    as is into window.data_values. For example rows serialized compactly,
+    without the spaces of json.dumps."""
+
+
+def compact_json(data):
+    """Returns the data serialized as JSON without spaces, as a JSONText."""
+    return JSONText(json.dumps(data, separators=(",", ":")))
+
+
+# The name of the hidden Bokeh root that the browser sets to the name of a
+# lazy panel that became visible, to have the server render it.
+LAZY_PANELS_TRIGGER = "lazy_panels_trigger"
+
+_LAZY_PANELS_SCRIPT = """
+(function () {
+  function render(name) {
+    var documents = (window.Bokeh && window.Bokeh.documents) || [];
+    for (var i = 0; i < documents.length; i++) {
+      var trigger = documents[i].get_model_by_name("%s");
+      if (trigger) {
+        trigger.value = name;
+        return;
+      }
+    }
+    setTimeout(function () { render(name); }, 100);
+  }
+  var elements = document.querySelectorAll("[data-lazy-panel]");
+  if (!("IntersectionObserver" in window)) {
+    for (var i = 0; i < elements.length; i++) {
+      render(elements[i].getAttribute("data-lazy-panel"));
+    }
+    return;
+  }
+  var observer = new IntersectionObserver(function (entries) {
+    entries.forEach(function (entry) {
+      if (entry.isIntersecting) {
+        observer.unobserve(entry.target);
+        render(entry.target.getAttribute("data-lazy-panel"));
+      }
+    });
+  }, { rootMargin: "200px" });
+  for (var i = 0; i < elements.length; i++) {
+    observer.observe(elements[i]);
+  }
+})();
+""" % LAZY_PANELS_TRIGGER
+
+# Matches, in a single pass, the escapes of template_escape and the panels
+# embedded in the html, to render pages without Jinja, see iter_page.
+_PAGE_TEMPLATE_RE = re.compile(
+    r"\{\{'(\{\{|\{%|\{#)'\}\}|\{\{ embed\(roots\.(\w+)\) \}\}"
+)
+PAGE_CHUNK_SIZE = 16 * 1024
+
+
+def render_static_panel(name, panel):
+    """Returns the html of the panel as a static Bokeh document, that needs
+    no server. The default render_panel of Component.iter_page."""
+    if isinstance(panel, LazyPanel):
+        panel = panel.panel
+    script, div = bokeh_components(pn.panel(panel).get_root())
+    return div + script
+
+
+# Subresource integrity hashes, for example "sha384-...", of the cdn urls in
+# PYVIZ_EXTENSIONS. Only the urls listed here get an integrity attribute, as
+# a wrong hash would make the browser refuse the file.
+PYVIZ_INTEGRITY = {}
+
+# Where the pyviz resources come from: "local" copies them to the static
+# folder (inlining them if there is no main), "inline" always inlines them
+# and "cdn" links to their cdn urls.
+RESOURCE_MODES = ("local", "inline", "cdn")
+_resource_mode = "local"
+
+
+def set_resource_mode(mode):
+    """Sets the resource mode of the components that don't set their own."""
+    global _resource_mode
+    if mode not in RESOURCE_MODES:
+        raise ValueError(
+            "The resource mode must be one of {}, not {!r}".format(RESOURCE_MODES, mode)
+        )
+    _resource_mode = mode
+
+
+def get_resource_mode():
+    return _resource_mode
+
+
+# The id namespaces and counters of the Bokeh documents. Panel runs the script
+# of an app in a new document for every session, and every document gets its
+# own namespace, so that a component kept from an earlier session never gets
+# the id of a new one.
+_id_counters = weakref.WeakKeyDictionary()
+_id_counters_lock = threading.Lock()
+_id_namespaces = itertools.count(1)
+
+
+def counter_id(prefix):
+    """Returns the prefix followed by the namespace of the current Bokeh
+    document and the next number of its id counter, for example "id_3_1".
+    The default id generator."""
+    document = curdoc()
+    counter = _id_counters.get(document)
+    if counter is None:
+        with _id_counters_lock:
+            counter = _id_counters.get(document)
+            if counter is None:
+                counter = _id_counters[document] = (
+                    str(next(_id_namespaces)) + "_",
+                    itertools.count(1),
+                )
+    return prefix + counter[0] + str(next(counter[1]))
+
+
+def uuid_id(prefix):
+    """Returns the prefix followed by a random uuid, unique across documents."""
+    return prefix + str(uuid.uuid4().hex)
+
+
+_id_generator = counter_id
+
+
+def set_id_generator(generator=None):
+    """Sets the function, called with a prefix like "id_", that returns the
+    ids of the components and of their panels. None restores counter_id."""
+    global _id_generator
+    if generator is None:
+        generator = counter_id
+    if not callable(generator):
+        raise TypeError("The id generator must be callable, not {!r}".format(generator))
+    _id_generator = generator
+
+
+def get_id_generator():
+    return _id_generator
+
+
+def make_id(prefix):
+    return _id_generator(prefix)
+
+
+def _is_url(item):
+    return item.startswith("//") or bool(urlsplit(item).scheme)
+
+
+def _get_pyviz_items(extension_name, kind, mode):
+    sources = PYVIZ_EXTENSIONS[extension_name].get(kind, {})
+    return sources.get("cdn" if mode == "cdn" else "local", [])
+
+
+def _get_integrity_attr(url):
+    if url in PYVIZ_INTEGRITY:
+        return ' integrity="{}"'.format(PYVIZ_INTEGRITY[url])
+    return ""
+
+
+# Everything the template builders need from a component tree, gathered by
+# Component.collect_resources() in a single walk of the tree.
+ComponentResources = namedtuple(
+    "ComponentResources",
+    [
+        "append_head_no_nb_css",
+        "append_head_no_nb_js",
+        "append_head_no_nb_module",
+        "pyviz_extensions",
+        "body_classes",
+        "prepend_body_css",
+        "prepend_body_style",
+        "component_data",
+        "data_prefix",
+        "data_postfix",
+        "panel_css_files",
+        "panel_raw_css",
+        "panels",
+        "append_body_js",
+        "append_body_script",
+        "append_body_no_nb_js",
+        "append_body_no_nb_script",
+        "files_uris",
+        "asset_folders",
+        "script_loading",
+    ],
+)
+
+# Resources where a descendant (or a later sibling) overrides an entry with
+# the same name registered earlier in document order.
+_DESCENDANTS_WIN_RESOURCES = (
+    "append_head_no_nb_css",
+    "append_head_no_nb_js",
+    "append_head_no_nb_module",
+    "component_data",
+    "panel_css_files",
+    "panel_raw_css",
+    "panels",
+    "append_body_js",
+    "append_body_script",
+    "append_body_no_nb_js",
+    "append_body_no_nb_script",
+    "script_loading",
+)
+
+# Resources where an ancestor (or an earlier sibling) keeps its entry, and
+# entries of later siblings come first.
+_ANCESTORS_WIN_RESOURCES = (
+    "prepend_body_css",
+    "prepend_body_style",
+)
+
+_UNION_RESOURCES = (
+    "pyviz_extensions",
+    "body_classes",
+    "files_uris",
+)
+
+
+# How a script given a loading, preload or after is loaded, see
+# Component.script_loading. The
+# script_loading resource maps (block, name) keys, where block is the name of
+# the registration method, to these.
+ScriptLoading = namedtuple("ScriptLoading", ["loading", "preload", "after"])
+
+SCRIPT_LOADINGS = ("defer", "async")
+
+# The blocks of scripts that can be given a loading strategy, in document order
+_SCRIPT_BLOCKS = (
+    "append_head_no_nb_js",
+    "append_head_no_nb_module",
+    "append_body_js",
+    "append_body_no_nb_js",
+)
+
+
+def _order_scripts(files, block, script_loading):
+    """Returns the names of the files ordered so that every script comes after
+    the scripts of the same block it was registered to run after, keeping the
+    registration order otherwise."""
+    ordered = list()
+    states = dict()
+    for name in files:
+        stack = [(name, False)]
+        while stack:
+            current, expanded = stack.pop()
+            if expanded:
+                states[current] = "done"
+                ordered.append(current)
+                continue
+            state = states.get(current)
+            if state == "done":
+                continue
+            if state == "visiting":
+                raise ValueError(
+                    "The scripts of {} depend on each other: {}".format(block, current)
+                )
+            states[current] = "visiting"
+            stack.append((current, True))
+            loading = script_loading.get((block, current))
+            if loading is not None:
+                for dependency in reversed(loading.after):
+                    if dependency in files and states.get(dependency) != "done":
+                        if states.get(dependency) == "visiting":
+                            raise ValueError(
+                                "The scripts of {} depend on each other: {}".format(
+                                    block, dependency
+                                )
+                            )
+                        stack.append((dependency, False))
+    return ordered
+
+
+def _resolve_script_loadings(resources):
+    """Returns the loading attribute, None, "defer" or "async", of every script
+    in the _SCRIPT_BLOCKS. Scripts with dependencies or dependents can't be
+    async, as async scripts run in any order, and scripts running after a
+    deferred script must be deferred too."""
+    script_loading = resources.script_loading
+    dependencies = set()
+    for loading in script_loading.values():
+        dependencies.update(loading.after)
+
+    resolved = dict()
+    for block in _SCRIPT_BLOCKS:
+        files = getattr(resources, block)
+        for name in _order_scripts(files, block, script_loading):
+            loading = script_loading.get((block, name), ScriptLoading(None, False, ()))
+            value = loading.loading
+            if value == "async" and (loading.after or name in dependencies):
+                value = "defer"
+            if value is None:
+                for dependency in loading.after:
+                    for dependency_block in _SCRIPT_BLOCKS:
+                        if dependency not in getattr(resources, dependency_block):
+                            continue
+                        if (
+                            dependency_block == "append_head_no_nb_module"
+                            or resolved.get((dependency_block, dependency))
+                        ):
+                            value = "defer"
+            resolved[(block, name)] = value
+    return resolved
+
+
+def _get_loading_attr(loading):
+    if loading:
+        return " " + loading
+    return ""
+
+
+class _LazyContainer:
+    """A dict, set or list attribute of Component that is only created when it
+    is first used. Most components, for example the text of a table cell, never
+    use most of their containers. The code walking the tree reads them with
+    _get_container, that doesn't create them."""
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.empty = _EMPTY_CONTAINERS[factory]
+
+    def __set_name__(self, owner, name):
+        self.name = name
+        _CONTAINER_EMPTIES[name] = self.empty
+
+    def __get__(self, component, owner=None):
+        if component is None:
+            return self
+        containers = component._containers
+        if containers is None:
+            containers = component._containers = dict()
+        container = containers.get(self.name)
+        if container is None:
+            container = containers[self.name] = self.factory()
+        return container
+
+    def __set__(self, component, value):
+        if component._containers is None:
+            component._containers = dict()
+        component._containers[self.name] = value
+
+
+_EMPTY_CONTAINERS = {dict: MappingProxyType({}), set: frozenset(), list: ()}
+_CONTAINER_EMPTIES = dict()
+
+
+def _get_container(component, name):
+    """Returns the container of the component, or an empty read-only one if it
+    wasn't created yet."""
+    containers = component._containers
+    if containers:
+        container = containers.get(name)
+        if container is not None:
+            return container
+    return _CONTAINER_EMPTIES[name]
+
+
+def _merge_descendants_win(components, attr):
+    merged = dict()
+    for component in components:
+        merged.update(_get_container(component, attr))
+    return merged
+
+
+def _merge_ancestors_win(components, attr):
+    # Same result as the recursive dict(child_items, **own_items) merge:
+    # walking the tree in reverse document order, the last write wins.
+    merged = dict()
+    for component in reversed(components):
+        merged.update(_get_container(component, attr))
+    return merged
+
+
+def _merge_union(components, attr):
+    merged = set()
+    for component in components:
+        merged.update(_get_container(component, attr))
+    return merged
+
+
+def _merge_asset_folders(components):
+    # Folders of later components come first, so that the folders of the
+    # outer components have precedence when looking up files.
+    asset_folders = list()
+    for component in reversed(components):
+        asset_folders.extend(_get_container(component, "_asset_folders"))
+    return asset_folders
+
+
+def _first_non_empty(components, attr):
+    for component in components:
+        value = getattr(component, attr)
+        if value:
+            return value
+    return ""
+
+
+# The templates that Component.servable() generated for a component tree, both
+# as source and compiled, plus the id of the spacer panel it may have added and
+# the files published for them.
+CachedTemplate = namedtuple(
+    "CachedTemplate",
+    [
+        "template_source",
+        "nb_template_source",
+        "template",
+        "nb_template",
+        "spacer_id",
+        "published_files",
+    ],
+)
+
+
+def _get_cached_template_size(entry):
+    """Returns an estimate of the memory held by a CachedTemplate: its sources,
+    and its compiled templates, that hold their text again."""
+    if isinstance(entry, CachedTemplate):
+        return 2 * (len(entry.template_source) + len(entry.nb_template_source))
+    return 0
+
+
+class TemplateCache:
+    """Keeps the templates generated by Component.servable() across sessions,
+    keyed by Component.fingerprint(), so that a page whose component tree and
+    asset files did not change is not regenerated for every new session.
+
+    It's bounded by the number of entries and by their estimated size, as the
+    templates of pages with inlined resources can take megabytes each. The
+    least recently used entries are evicted first, and entries larger than
+    max_bytes are never kept."""
+
+    def __init__(self, max_entries=64, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._sizes = dict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry, size=None):
+        if size is None:
+            size = _get_cached_template_size(entry)
+        with self._lock:
+            self._remove(key)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = entry
+            self._sizes[key] = size
+            self._size += size
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        if key in self._entries:
+            del self._entries[key]
+            self._size -= self._sizes.pop(key)
+
+    def invalidate(self, key=None):
+        """Removes the entry of the given fingerprint, or all entries when no
+        fingerprint is given."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._sizes.clear()
+                self._size = 0
+            else:
+                self._remove(key)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+            }
+
+
+template_cache = TemplateCache()
+
+
+def _get_pyviz_files(extension_names, mode="local"):
+    files = list()
+    for extension_name in sorted(extension_names):
+        for kind in ["css", "js"]:
+            for item in _get_pyviz_items(extension_name, kind, mode):
+                if not _is_url(item):
+                    files.append(item)
+    return files
+
+
 def make_tag_function(tag, xml_closing_style=False):
     """Generate a function that returns a component for an html tag."""
 
@@ -129,6 +706,61 @@ class Component:
     methods that assist in creating and generating a template (or html partial)
     for a component of a page that will served by a Panel server."""
 
+    # Large generated pages, like tables, have tens of thousands of components,
+    # so only the attributes every component uses get a slot. The containers
+    # are created on first use, and the settings are class attributes until a
+    # component changes them.
+    __slots__ = (
+        "tag_name",
+        "_opening",
+        "_closing",
+        "main",
+        "_id",
+        "children",
+        "_pre_html",
+        "_post_html",
+        "_containers",
+        "__dict__",
+        "__weakref__",
+    )
+
+    _src_folder = "www"
+    _dst_folder = "static"
+    _fingerprint_assets = False
+    _compress_assets = False
+    _bundle_assets = False
+    _minify_assets = False
+    _critical_css = False
+    _detect_extensions = False
+    _resource_mode = None
+    _asset_root = None
+    _generated_id = False
+    data_prefix = ""
+    data_postfix = ""
+    _no_panel_spacer = ""
+
+    attributes = _LazyContainer(dict)
+    css_classes = _LazyContainer(set)
+    _append_head_no_nb_css = _LazyContainer(dict)
+    _append_head_no_nb_js = _LazyContainer(dict)
+    _append_head_no_nb_module = _LazyContainer(dict)
+    _pyviz_extensions = _LazyContainer(set)
+    _body_classes = _LazyContainer(set)
+    _prepend_body_css = _LazyContainer(dict)
+    _prepend_body_style = _LazyContainer(dict)
+    _component_data = _LazyContainer(dict)
+    _panel_css_files = _LazyContainer(dict)
+    _panel_raw_css = _LazyContainer(dict)
+    _panels = _LazyContainer(dict)
+    _append_body_js = _LazyContainer(dict)
+    _append_body_script = _LazyContainer(dict)
+    _append_body_no_nb_js = _LazyContainer(dict)
+    _append_body_no_nb_script = _LazyContainer(dict)
+    _files_attrs = _LazyContainer(dict)
+    _files_uris = _LazyContainer(set)
+    _asset_folders = _LazyContainer(list)
+    _script_loading = _LazyContainer(dict)
+
     def __init__(
         self,
         *children,
@@ -152,49 +784,11 @@ class Component:
             self.main = ""
 
         self._id = ""
-
-        self._src_folder = "www"
-        self._dst_folder = "static"
-
         self.children = list()
-        self.attributes = dict()
-
         self._pre_html = ""
-
-        self._append_head_no_nb_css = dict()
-        self._append_head_no_nb_js = dict()
-        self._append_head_no_nb_module = dict()
-
-        self._pyviz_extensions = set()
-
-        self._body_classes = set()
-
-        self._prepend_body_css = dict()
-        self._prepend_body_style = dict()
-
-        self._component_data = dict()
-        self.data_prefix = ""
-        self.data_postfix = ""
-
-        self._panel_css_files = dict()
-        self._panel_raw_css = dict()
-
-        self._panels = dict()
-        self._no_panel_spacer = ""
-
-        self._append_body_js = dict()
-        self._append_body_script = dict()
-
-        self._append_body_no_nb_js = dict()
-        self._append_body_no_nb_script = dict()
-
         self._post_html = ""
+        self._containers = None
 
-        self._files_attrs = dict()
-        self._files_uris = set()
-        self._asset_folders = list()
-
-        self.css_classes = set()
         if css_classes:
             if isinstance(css_classes, str):
                 css_classes = css_classes.split()
@@ -210,7 +804,8 @@ class Component:
     def id(self):
         if not self._id:
             # Auto-generate an unique id for the component
-            self.id = "id" + str(uuid.uuid4().hex)
+            self.id = make_id("id_")
+            self._generated_id = True
         return self._id
 
     @id.setter
@@ -275,30 +870,21 @@ class Component:
         return self
 
     def get_append_head_no_nb_css(self):
-        append_head_no_nb_css = self._append_head_no_nb_css.copy()
-        for child in self.children:
-            append_head_no_nb_css.update(child.get_append_head_no_nb_css())
-        return append_head_no_nb_css
+        return _merge_descendants_win(self._iter_tree(), "_append_head_no_nb_css")
 
     def append_head_no_nb_js(self, **files):
         self._append_head_no_nb_js.update(files)
         return self
 
     def get_append_head_no_nb_js(self):
-        append_head_no_nb_js = self._append_head_no_nb_js.copy()
-        for child in self.children:
-            append_head_no_nb_js.update(child.get_append_head_no_nb_js())
-        return append_head_no_nb_js
+        return _merge_descendants_win(self._iter_tree(), "_append_head_no_nb_js")
 
     def append_head_no_nb_module(self, **files):
         self._append_head_no_nb_module.update(files)
         return self
 
     def get_append_head_no_nb_module(self):
-        append_head_no_nb_module = self._append_head_no_nb_module.copy()
-        for child in self.children:
-            append_head_no_nb_module.update(child.get_append_head_no_nb_module())
-        return append_head_no_nb_module
+        return _merge_descendants_win(self._iter_tree(), "_append_head_no_nb_module")
 
     def pyviz_extensions(self, *extensions):
         extensions_no_spaces = [item.split() for item in extensions if item]
@@ -308,10 +894,7 @@ class Component:
         return self
 
     def get_pyviz_extensions(self):
-        pyviz_extensions = self._pyviz_extensions.copy()
-        for child in self.children:
-            pyviz_extensions = pyviz_extensions.union(child.get_pyviz_extensions())
-        return pyviz_extensions
+        return _merge_union(self._iter_tree(), "_pyviz_extensions")
 
     def body_classes(self, *classes):
         classes_no_spaces = [item.split() for item in classes if item]
@@ -321,32 +904,21 @@ class Component:
         return self
 
     def get_body_classes(self):
-        body_classes = self._body_classes.copy()
-        for child in self.children:
-            body_classes = body_classes.union(child.get_body_classes())
-        return body_classes
+        return _merge_union(self._iter_tree(), "_body_classes")
 
     def prepend_body_css(self, **files):
         self._prepend_body_css.update(files)
         return self
 
     def get_prepend_body_css(self):
-        prepend_body_css = self._prepend_body_css.copy()
-        for child in self.children:
-            prepend_body_css = dict(child.get_prepend_body_css(), **prepend_body_css)
-        return prepend_body_css
+        return _merge_ancestors_win(list(self._iter_tree()), "_prepend_body_css")
 
     def prepend_body_style(self, **styles):
         self._prepend_body_style.update(styles)
         return self
 
     def get_prepend_body_style(self):
-        prepend_body_style = self._prepend_body_style.copy()
-        for child in self.children:
-            prepend_body_style = dict(
-                child.get_prepend_body_style(), **prepend_body_style
-            )
-        return prepend_body_style
+        return _merge_ancestors_win(list(self._iter_tree()), "_prepend_body_style")
 
     def component_data(self, prefix=None, data=None, postfix=None):
         if self.id not in self._component_data:
@@ -369,88 +941,92 @@ class Component:
         return self
 
     def get_component_data(self):
-        component_data = self._component_data.copy()
-        for child in self.children:
-            component_data.update(child.get_component_data())
-        return component_data
+        return _merge_descendants_win(self._iter_tree(), "_component_data")
 
     def get_data_prefix(self):
-        data_prefix = self.data_prefix
-        if not data_prefix:
-            for child in self.children:
-                data_prefix = child.get_data_prefix()
-                if data_prefix:
-                    break
-        return data_prefix
+        return _first_non_empty(self._iter_tree(), "data_prefix")
 
     def get_data_postfix(self):
-        data_postfix = self.data_postfix
-        if not data_postfix:
-            for child in self.children:
-                data_postfix = child.get_data_postfix()
-                if data_postfix:
-                    break
-        return data_postfix
+        return _first_non_empty(self._iter_tree(), "data_postfix")
 
     def panel_css_files(self, **files):
         self._panel_css_files.update(files)
         return self
 
     def get_panel_css_files(self):
-        panel_css_files = self._panel_css_files.copy()
-        for child in self.children:
-            panel_css_files.update(child.get_panel_css_files())
-        return panel_css_files
+        return _merge_descendants_win(self._iter_tree(), "_panel_css_files")
 
     def panel_raw_css(self, **styles):
         self._panel_raw_css.update(styles)
         return self
 
     def get_panel_raw_css(self):
-        panel_raw_css = self._panel_raw_css.copy()
-        for child in self.children:
-            panel_raw_css.update(child.get_panel_raw_css())
-        return panel_raw_css
+        return _merge_descendants_win(self._iter_tree(), "_panel_raw_css")
 
     def append_body_js(self, **files):
         self._append_body_js.update(files)
         return self
 
     def get_append_body_js(self):
-        append_body_js = self._append_body_js.copy()
-        for child in self.children:
-            append_body_js.update(child.get_append_body_js())
-        return append_body_js
+        return _merge_descendants_win(self._iter_tree(), "_append_body_js")
 
     def append_body_script(self, **scripts):
         self._append_body_script.update(scripts)
         return self
 
     def get_append_body_script(self):
-        append_body_script = self._append_body_script.copy()
-        for child in self.children:
-            append_body_script.update(child.get_append_body_script())
-        return append_body_script
+        return _merge_descendants_win(self._iter_tree(), "_append_body_script")
 
     def append_body_no_nb_js(self, **files):
         self._append_body_no_nb_js.update(files)
         return self
 
     def get_append_body_no_nb_js(self):
-        append_body_no_nb_js = self._append_body_no_nb_js.copy()
-        for child in self.children:
-            append_body_no_nb_js.update(child.get_append_body_no_nb_js())
-        return append_body_no_nb_js
+        return _merge_descendants_win(self._iter_tree(), "_append_body_no_nb_js")
 
     def append_body_no_nb_script(self, **scripts):
         self._append_body_no_nb_script.update(scripts)
         return self
 
     def get_append_body_no_nb_script(self):
-        append_body_no_nb_script = self._append_body_no_nb_script.copy()
-        for child in self.children:
-            append_body_no_nb_script.update(child.get_append_body_no_nb_script())
-        return append_body_no_nb_script
+        return _merge_descendants_win(self._iter_tree(), "_append_body_no_nb_script")
+
+    def script_loading(self, *names, loading=None, preload=False, after=None):
+        """Sets how the scripts of the names, registered on this component with
+        append_head_no_nb_js, append_head_no_nb_module, append_body_js or
+        append_body_no_nb_js, are loaded: with a loading of "defer" or "async",
+        preloaded with a <link rel=preload> hint, and after the scripts of the
+        names in after. Without any of them, the scripts load as usual."""
+        if loading is not None and loading not in SCRIPT_LOADINGS:
+            raise ValueError(
+                "The loading must be one of {}, not {!r}".format(
+                    SCRIPT_LOADINGS, loading
+                )
+            )
+        if isinstance(after, str):
+            after = after.split()
+        after = tuple(after or ())
+        for name in names:
+            blocks = [
+                block
+                for block in _SCRIPT_BLOCKS
+                if name in _get_container(self, "_" + block)
+            ]
+            if not blocks:
+                raise ValueError(
+                    "No script named {!r} is registered on the component".format(name)
+                )
+            for block in blocks:
+                if loading or preload or after:
+                    self._script_loading[(block, name)] = ScriptLoading(
+                        loading, bool(preload), after
+                    )
+                else:
+                    self._script_loading.pop((block, name), None)
+        return self
+
+    def get_script_loading(self):
+        return _merge_descendants_win(self._iter_tree(), "_script_loading")
 
     def files_uris(self, *files):
         for filename in files:
@@ -458,10 +1034,7 @@ class Component:
         return self
 
     def get_files_uris(self):
-        files_uris = self._files_uris.copy()
-        for child in self.children:
-            files_uris = files_uris.union(child.get_files_uris())
-        return files_uris
+        return _merge_union(self._iter_tree(), "_files_uris")
 
     def asset_folders(self, *folders):
         for folder in folders:
@@ -469,10 +1042,7 @@ class Component:
         return self
 
     def get_asset_folders(self):
-        asset_folders = self._asset_folders.copy()
-        for child in self.children:
-            asset_folders = child.get_asset_folders() + asset_folders
-        return asset_folders
+        return _merge_asset_folders(list(self._iter_tree()))
 
     def opening(self, markup):
         self._opening += markup
@@ -483,15 +1053,24 @@ class Component:
         return self
 
     def _append_html_child(self, child):
-        child_component = Component()
-        child_component.append_html(html.escape(child))
-        self.children.append(child_component)
+        self.children.append(TextNode(child))
         return self
 
     def _append_panel_child(self, child):
-        child_id = "panel_" + str(uuid.uuid4().hex)
+        child_id = make_id("panel_")
         child_component = Component()
-        self._post_html += r"{{ embed(roots." + child_id + r") }}"
+        if isinstance(child, LazyPanel):
+            height = child.height or getattr(child.panel, "height", None) or 300
+            self._post_html += (
+                '<div data-lazy-panel="{}" style="min-height: {}px">'.format(
+                    child_id, height
+                )
+                + r"{{ embed(roots."
+                + child_id
+                + r") }}</div>"
+            )
+        else:
+            self._post_html += r"{{ embed(roots." + child_id + r") }}"
         self.children.append(child_component)
         self._panels[child_id] = child
         return self
@@ -530,10 +1109,12 @@ class Component:
 
     def get_attributes(self, main, asset_folders, nb=IS_A_JUPYTER_NOTEBOOK):
         attributes = ""
-        for attr in self.attributes:
-            attr_value = self.attributes[attr]
+        own_attributes = _get_container(self, "attributes")
+        files_attrs = _get_container(self, "_files_attrs")
+        for attr in own_attributes:
+            attr_value = own_attributes[attr]
 
-            if attr in self._files_attrs:
+            if attr in files_attrs:
                 if main:
                     self.files_uris(attr_value)
                 if not main or nb:
@@ -552,9 +1133,12 @@ class Component:
                                 attr_value = uri_value
                 else:
                     if len(attr_value) != 0 and attr == "src":
-                        attr_value = "{}/{}/{}".format(
-                            main, self._dst_folder, attr_value
-                        )
+                        if self._asset_root is not None:
+                            attr_value = "{}/{}".format(self._asset_root, attr_value)
+                        else:
+                            attr_value = "{}/{}/{}".format(
+                                main, self._dst_folder, attr_value
+                            )
 
             if attr_value is not None:
                 if len(attr_value) == 0:
@@ -562,15 +1146,207 @@ class Component:
                 else:
                     attributes += ' {}="{}"'.format(attr, attr_value)
 
-        if self.css_classes:
-            attributes += ' class="{}"'.format(html.escape(" ".join(self.css_classes)))
+        css_classes = _get_container(self, "css_classes")
+        if css_classes:
+            attributes += ' class="{}"'.format(html.escape(" ".join(css_classes)))
         return attributes
 
     def get_panels(self):
-        panels = self._panels.copy()
-        for child in self.children:
-            panels.update(child.get_panels())
-        return panels
+        return _merge_descendants_win(self._iter_tree(), "_panels")
+
+    def _iter_tree(self):
+        """Yields this component and all its descendants in document order."""
+        stack = [self]
+        while stack:
+            component = stack.pop()
+            yield component
+            stack.extend(reversed(component.children))
+
+    def _get_asset_stat(self, filename, asset_folders):
+        src_file, _ = find_src_file(
+            filename, self._src_folder, asset_folders=asset_folders
+        )
+        if not src_file:
+            return None
+        stat = os.stat(src_file)
+        return src_file, stat.st_mtime_ns, stat.st_size
+
+    def fingerprint(self, resources=None, canonical_ids=False):
+        """Returns a hash of everything that goes into the templates generated
+        for this component tree: its structure, attributes and resources, plus
+        the modification time and size of every asset file it uses.
+
+        With canonical_ids, the generated ids of the components and panels are
+        replaced by their order in the tree, so that the same tree built in
+        another Bokeh document, with other ids, gets the same hash."""
+        if resources is None:
+            resources = self.collect_resources()
+
+        digest = hashlib.sha1()
+        substitute_ids = None
+        if canonical_ids:
+            substitute_ids = self._get_canonical_ids_substitute(resources)
+
+        def feed(*values):
+            text = repr(values)
+            if substitute_ids is not None:
+                text = substitute_ids(text)
+            digest.update(text.encode("utf8"))
+
+        feed(
+            self.main,
+            self._src_folder,
+            self._dst_folder,
+            self._fingerprint_assets,
+            self._compress_assets,
+            self._bundle_assets,
+            self._minify_assets,
+            self._critical_css,
+            self.get_resource_mode(),
+            PYVIZ_INTEGRITY,
+            IS_A_JUPYTER_NOTEBOOK,
+        )
+
+        for component in self._iter_tree():
+            feed(
+                component.tag_name,
+                component._opening,
+                component._closing,
+                component._pre_html,
+                component._post_html,
+                list(_get_container(component, "attributes").items()),
+                sorted(_get_container(component, "css_classes")),
+                sorted(_get_container(component, "_files_uris")),
+                len(component.children),
+            )
+
+        for name in ComponentResources._fields:
+            value = getattr(resources, name)
+            if name == "panels":
+                # Only the names of the panels, and which are lazy, matter
+                value = [
+                    (panel_name, isinstance(panel, LazyPanel))
+                    for panel_name, panel in value.items()
+                ]
+            elif isinstance(value, frozenset):
+                value = sorted(value)
+            elif isinstance(value, MappingProxyType):
+                value = list(value.items())
+            feed(name, value)
+
+        feed(sorted(self._get_pyviz_extension_names(resources)))
+        for filename in self._get_asset_filenames(resources):
+            feed(filename, self._get_asset_stat(filename, resources.asset_folders))
+
+        return digest.hexdigest()
+
+    def _get_canonical_ids_substitute(self, resources):
+        """Returns a function replacing the generated ids of the tree in a text
+        by their order in the tree, or None if it has none."""
+        generated_ids = [
+            component._id for component in self._iter_tree() if component._generated_id
+        ]
+        generated_ids.extend(resources.panels)
+        if not generated_ids:
+            return None
+        canonical_ids = {
+            generated_id: "#{}".format(index)
+            for index, generated_id in enumerate(generated_ids)
+        }
+        # The longest first, so that id_1_10 isn't replaced as id_1_1
+        ids_re = re.compile(
+            "|".join(
+                re.escape(generated_id)
+                for generated_id in sorted(canonical_ids, key=len, reverse=True)
+            )
+        )
+        return lambda text: ids_re.sub(lambda match: canonical_ids[match.group(0)], text)
+
+    def _get_asset_filenames(self, resources):
+        filenames = set()
+        for component in self._iter_tree():
+            filenames.update(_get_container(component, "_files_attrs").values())
+        for name in [
+            "append_head_no_nb_css",
+            "append_head_no_nb_js",
+            "append_head_no_nb_module",
+            "prepend_body_css",
+            "append_body_js",
+            "append_body_no_nb_js",
+            "append_body_no_nb_script",
+        ]:
+            filenames.update(getattr(resources, name).values())
+        filenames.update(resources.files_uris)
+        pyviz_extensions = self._get_pyviz_extension_names(resources)
+        filenames.update(_get_pyviz_files(pyviz_extensions, self.get_resource_mode()))
+        return sorted(filenames)
+
+    def etag(self, resources=None, variant="", version=None):
+        """Returns the HTTP entity tag of the page of the component, based on
+        its fingerprint and the variant, for example the title of the page.
+
+        The fingerprint doesn't cover what the panels show, so a page with
+        panels only gets an entity tag with a version of the state of its
+        panels, otherwise None. The tag is weak if the page has panels or
+        generated ids, as they are different in every Bokeh document."""
+        if resources is None:
+            resources = self.collect_resources()
+        if resources.panels and version is None:
+            return None
+        fingerprint = self.fingerprint(resources, canonical_ids=True)
+        digest = hashlib.sha1(
+            "{}\n{}\n{}".format(fingerprint, variant, version).encode("utf8")
+        )
+        etag = '"{}"'.format(digest.hexdigest())
+        if resources.panels or any(
+            component._generated_id for component in self._iter_tree()
+        ):
+            return "W/" + etag
+        return etag
+
+    def last_modified(self, resources=None):
+        """Returns the latest modification time of the asset files of the page,
+        as a UTC datetime, or None if it has none."""
+        if resources is None:
+            resources = self.collect_resources()
+        mtimes = [
+            stat[1]
+            for stat in (
+                self._get_asset_stat(filename, resources.asset_folders)
+                for filename in self._get_asset_filenames(resources)
+            )
+            if stat
+        ]
+        if not mtimes:
+            return None
+        return datetime.datetime.fromtimestamp(
+            max(mtimes) // 1000000000, tz=datetime.timezone.utc
+        )
+
+    def collect_resources(self):
+        """Walks the component tree once and returns an immutable
+        ComponentResources with everything the template builders need, merged
+        with the same precedence as the corresponding get_* methods."""
+        components = list(self._iter_tree())
+        # Only the components that created containers can have resources
+        with_containers = [
+            component for component in components if component._containers
+        ]
+        collected = dict()
+        for name in _DESCENDANTS_WIN_RESOURCES:
+            collected[name] = MappingProxyType(
+                _merge_descendants_win(with_containers, "_" + name)
+            )
+        for name in _ANCESTORS_WIN_RESOURCES:
+            collected[name] = MappingProxyType(
+                _merge_ancestors_win(with_containers, "_" + name)
+            )
+        for name in _UNION_RESOURCES:
+            collected[name] = frozenset(_merge_union(with_containers, "_" + name))
+        collected["data_prefix"] = _first_non_empty(components, "data_prefix")
+        collected["data_postfix"] = _first_non_empty(components, "data_postfix")
+        collected["asset_folders"] = tuple(_merge_asset_folders(with_containers))
+        return ComponentResources(**collected)
 
     def extension(self, *args, **params):
         pn.extension(*args, **params)
@@ -579,269 +1355,501 @@ class Component:
                 self._pyviz_extensions.add(name)
         return self
 
-    def _make_available_head_no_nb(self, asset_folders):
-        append_head_no_nb_js = self.get_append_head_no_nb_js()
-        for item_name in append_head_no_nb_js:
-            item = append_head_no_nb_js[item_name]
-            make_available(
+    def fingerprint_assets(self, enabled=True):
+        """Publishes the css and js files of the page under names that include a
+        hash of their contents, for example bokeh.min.0123456789ab.js, so that
+        they can be served with a far future expiration date."""
+        self._fingerprint_assets = enabled
+        return self
+
+    def compress_assets(self, enabled=True):
+        """Writes gzip, and brotli if installed, compressed copies next to the
+        published css and js files, for servers that can send them as is."""
+        self._compress_assets = enabled
+        return self
+
+    def _make_asset_available(self, item, asset_folders):
+        if self._fingerprint_assets:
+            return make_available_fingerprinted(
                 item,
                 src_folder=self._src_folder,
                 dst_folder=self._dst_folder,
                 asset_folders=asset_folders,
+                compress=self._compress_assets,
             )
-        append_head_no_nb_module = self.get_append_head_no_nb_module()
+        make_available(
+            item,
+            src_folder=self._src_folder,
+            dst_folder=self._dst_folder,
+            asset_folders=asset_folders,
+            compress=self._compress_assets,
+        )
+        return item
+
+    def _get_asset_root(self):
+        if self._asset_root is not None:
+            return self._asset_root
+        return "/{}/{}".format(self.main, self._dst_folder)
+
+    def _get_asset_url(self, item, asset_folders):
+        if self._fingerprint_assets:
+            item = self._make_asset_available(item, asset_folders) or item
+        return "{}/{}".format(self._get_asset_root(), item)
+
+    def bundle_assets(self, enabled=True):
+        """Concatenates the local css files, and the local js files loaded
+        without a loading strategy, of each part of the page into bundle files,
+        so that browsers make a few requests instead of one per file."""
+        self._bundle_assets = enabled
+        return self
+
+    def minify_assets(self, enabled=True):
+        """Removes comments and redundant whitespace from the inlined css and js,
+        the inline scripts and styles, and the bundles of the page."""
+        self._minify_assets = enabled
+        return self
+
+    def _get_minifier(self, kind):
+        if not self._minify_assets:
+            return None
+        return minify_css if kind == "css" else minify_js
+
+    def _get_inline_js(self, item, asset_folders):
+        return get_inline_js(
+            item,
+            src_folder=self._src_folder,
+            asset_folders=asset_folders,
+            minifier=self._get_minifier("js"),
+        )
+
+    def _get_inline_css(self, item, asset_folders):
+        return get_inline_css(
+            item,
+            src_folder=self._src_folder,
+            asset_folders=asset_folders,
+            minifier=self._get_minifier("css"),
+        )
+
+    def critical_css(self, enabled=True):
+        """Inlines only the rules of the prepend_body_css files that can match
+        the html of the page, and loads the full files without blocking the
+        first paint."""
+        self._critical_css = enabled
+        return self
+
+    def _get_template_critical_css(self, items, asset_folders):
+        names = get_selector_names(self.get_html(self.main, asset_folders, nb=False))
+        root = self._get_asset_root()
+        critical = ""
+        for item in items:
+            src_file, _ = find_src_file(
+                item, self._src_folder, asset_folders=asset_folders
+            )
+            if src_file:
+                critical += get_critical_css(item, src_file, names, root)
+        template = """
+<style>
+{}</style>""".format(
+            minify(critical, self._get_minifier("css")).replace(
+                "</style", r"\00003c/style"
+            )
+        )
+
+        if self._is_bundling():
+            urls = [self._get_bundle_url(items, "css", asset_folders)]
+        else:
+            urls = list()
+            for item in items:
+                self._make_asset_available(item, asset_folders)
+                urls.append(self._get_asset_url(item, asset_folders))
+        for url in filter(None, urls):
+            template += """
+<link rel="preload" href="{0}" as="style" crossorigin="anonymous" onload="this.onload=null;this.rel='stylesheet'">
+<noscript><link href="{0}" rel="stylesheet" crossorigin="anonymous"></noscript>""".format(
+                url
+            )
+        return template
+
+    def _is_bundling(self, nb=False):
+        return bool(self._bundle_assets and self.main and not nb)
+
+    def _is_bundled(self, block, item_name, resources, nb=False):
+        return (
+            self._is_bundling(nb) and (block, item_name) not in resources.script_loading
+        )
+
+    def _get_bundle_url(self, items, kind, asset_folders):
+        if not items:
+            return None
+        bundle = make_bundle(
+            items,
+            kind,
+            src_folder=self._src_folder,
+            dst_folder=self._dst_folder,
+            asset_folders=asset_folders,
+            compress=self._compress_assets,
+            minifier=self._get_minifier(kind),
+        )
+        if bundle is None:
+            return None
+        return "{}/{}".format(self._get_asset_root(), bundle)
+
+    def _get_template_bundle(self, items, kind, asset_folders):
+        url = self._get_bundle_url(items, kind, asset_folders)
+        if url is None:
+            return ""
+        if kind == "css":
+            return """
+<link href="{}" rel="stylesheet" crossorigin="anonymous">""".format(
+                url
+            )
+        return """
+<script src="{}" type="text/javascript" crossorigin="anonymous"></script>""".format(
+            url
+        )
+
+    def _make_available_head_no_nb(self, asset_folders, resources=None):
+        if resources is None:
+            resources = self.collect_resources()
+        append_head_no_nb_js = resources.append_head_no_nb_js
+        for item_name in append_head_no_nb_js:
+            if self._is_bundled("append_head_no_nb_js", item_name, resources):
+                continue
+            item = append_head_no_nb_js[item_name]
+            self._make_asset_available(item, asset_folders)
+        append_head_no_nb_module = resources.append_head_no_nb_module
         for item_name in append_head_no_nb_module:
             item = append_head_no_nb_module[item_name]
-            make_available(
-                item,
-                src_folder=self._src_folder,
-                dst_folder=self._dst_folder,
-                asset_folders=asset_folders,
-            )
-        append_head_no_nb_css = self.get_append_head_no_nb_css()
+            self._make_asset_available(item, asset_folders)
+        if self._is_bundling():
+            return
+        append_head_no_nb_css = resources.append_head_no_nb_css
         for item_name in append_head_no_nb_css:
             item = append_head_no_nb_css[item_name]
-            make_available(
-                item,
-                src_folder=self._src_folder,
-                dst_folder=self._dst_folder,
-                asset_folders=asset_folders,
-            )
+            self._make_asset_available(item, asset_folders)
 
-    def _get_template_head_no_nb(self, asset_folders):
+    def _get_template_preload_hints(self, asset_folders, resources=None):
+        if resources is None:
+            resources = self.collect_resources()
         template = ""
-        append_head_no_nb_js = self.get_append_head_no_nb_js()
-        for item_name in append_head_no_nb_js:
+        if not self.main:
+            return template
+        script_loading = resources.script_loading
+        for block in _SCRIPT_BLOCKS:
+            files = getattr(resources, block)
+            for item_name in _order_scripts(files, block, script_loading):
+                loading = script_loading.get((block, item_name))
+                if loading is None or not loading.preload:
+                    continue
+                if block.endswith("module"):
+                    template += """
+<link rel="modulepreload" href="{}" crossorigin="anonymous">""".format(
+                        self._get_asset_url(files[item_name], asset_folders)
+                    )
+                else:
+                    template += """
+<link rel="preload" href="{}" as="script" crossorigin="anonymous">""".format(
+                        self._get_asset_url(files[item_name], asset_folders)
+                    )
+        return template
+
+    def _get_template_head_no_nb(self, asset_folders, resources=None):
+        if resources is None:
+            resources = self.collect_resources()
+        template = self._get_template_preload_hints(asset_folders, resources)
+        loadings = _resolve_script_loadings(resources)
+        bundle = list()
+        append_head_no_nb_js = resources.append_head_no_nb_js
+        for item_name in _order_scripts(
+            append_head_no_nb_js, "append_head_no_nb_js", resources.script_loading
+        ):
             item = append_head_no_nb_js[item_name]
-            if self.main:
+            loading = loadings[("append_head_no_nb_js", item_name)]
+            if self._is_bundled("append_head_no_nb_js", item_name, resources):
+                bundle.append(item)
+            elif self.main:
+                if loading is None:
+                    template += self._get_template_bundle(bundle, "js", asset_folders)
+                    bundle = list()
                 template += """
-<script src="/{}/{}/{}" type="text/javascript" crossorigin="anonymous"></script>""".format(
-                    self.main, self._dst_folder, item
+<script src="{}" type="text/javascript"{} crossorigin="anonymous"></script>""".format(
+                    self._get_asset_url(item, asset_folders), _get_loading_attr(loading),
                 )
             else:
                 template += (
                     """
 <script type="text/javascript">
 """
-                    + get_inline_js(
-                        item, src_folder=self._src_folder, asset_folders=asset_folders,
-                    )
+                    + self._get_inline_js(item, asset_folders)
                     + "</script>"
                 )
-        append_head_no_nb_module = self.get_append_head_no_nb_module()
-        for item_name in append_head_no_nb_module:
+        template += self._get_template_bundle(bundle, "js", asset_folders)
+        append_head_no_nb_module = resources.append_head_no_nb_module
+        for item_name in _order_scripts(
+            append_head_no_nb_module,
+            "append_head_no_nb_module",
+            resources.script_loading,
+        ):
             item = append_head_no_nb_module[item_name]
             if self.main:
+                loading = loadings[("append_head_no_nb_module", item_name)]
                 template += """
-<script src="/{}/{}/{}" type="module" crossorigin="anonymous"></script>""".format(
-                    self.main, self._dst_folder, item
+<script src="{}" type="module"{} crossorigin="anonymous"></script>""".format(
+                    self._get_asset_url(item, asset_folders),
+                    # Modules are deferred already
+                    _get_loading_attr("async" if loading == "async" else None),
                 )
             else:
                 template += (
                     """
 <script type="module">
 """
-                    + get_inline_js(
-                        item, src_folder=self._src_folder, asset_folders=asset_folders,
-                    )
+                    + self._get_inline_js(item, asset_folders)
                     + "</script>"
                 )
 
-        append_head_no_nb_css = self.get_append_head_no_nb_css()
+        append_head_no_nb_css = resources.append_head_no_nb_css
+        if self._is_bundling():
+            return template + self._get_template_bundle(
+                list(append_head_no_nb_css.values()), "css", asset_folders
+            )
         for item_name in append_head_no_nb_css:
             item = append_head_no_nb_css[item_name]
             if self.main:
                 template += """
-<link href="/{}/{}/{}" rel="stylesheet" crossorigin="anonymous">""".format(
-                    self.main, self._dst_folder, item
+<link href="{}" rel="stylesheet" crossorigin="anonymous">""".format(
+                    self._get_asset_url(item, asset_folders)
                 )
             else:
                 template += (
                     """
 <style>
 """
-                    + get_inline_css(
-                        item, src_folder=self._src_folder, asset_folders=asset_folders,
-                    )
+                    + self._get_inline_css(item, asset_folders)
                     + "</style>"
                 )
         return template
 
-    def _make_available_head_resources(self, asset_folders):
-        pyviz_extensions = self.get_pyviz_extensions().union({"bokeh"})
+    def detect_extensions(self, enabled=True):
+        """Includes the resources of the pyviz extensions that the embedded
+        Panel objects need, and leaves out those of the registered extensions
+        that are only used by Panel objects, like plotly, if none needs them."""
+        self._detect_extensions = enabled
+        return self
 
-        for extension_name in pyviz_extensions:
-            extension = PYVIZ_EXTENSIONS[extension_name]
-
-            if "css" in extension:
-                # TODO add support for CDN resources
-                if "local" in extension["css"]:
-                    for item in extension["css"]["local"]:
-                        make_available(
-                            item,
-                            src_folder=self._src_folder,
-                            dst_folder=self._dst_folder,
-                            asset_folders=asset_folders,
-                        )
-            if "js" in extension:
-                # TODO add support for CDN resources
-                if "local" in extension["js"]:
-                    for item in extension["js"]["local"]:
-                        make_available(
-                            item,
-                            src_folder=self._src_folder,
-                            dst_folder=self._dst_folder,
-                            asset_folders=asset_folders,
-                        )
-
-    def _get_template_pyviz_resources(self, asset_folders):
+    def _get_pyviz_extension_names(self, resources):
+        if not self._detect_extensions:
+            return resources.pyviz_extensions.union({"bokeh"})
+        registered = resources.pyviz_extensions.difference(_PANEL_ONLY_EXTENSIONS)
+        detected = get_panel_extensions(resources.panels.values())
+        return registered.union(detected, {"bokeh"})
+
+    def resource_mode(self, mode):
+        """Sets where the pyviz resources of the page come from, one of
+        RESOURCE_MODES, instead of the mode set with set_resource_mode."""
+        if mode not in RESOURCE_MODES:
+            raise ValueError(
+                "The resource mode must be one of {}, not {!r}".format(
+                    RESOURCE_MODES, mode
+                )
+            )
+        self._resource_mode = mode
+        return self
+
+    def get_resource_mode(self):
+        return self._resource_mode or _resource_mode
+
+    def _make_available_head_resources(self, asset_folders, resources=None):
+        if resources is None:
+            resources = self.collect_resources()
+        mode = self.get_resource_mode()
+        if mode == "inline" or self._is_bundling():
+            return
+        pyviz_extensions = self._get_pyviz_extension_names(resources)
+
+        for item in _get_pyviz_files(pyviz_extensions, mode):
+            self._make_asset_available(item, asset_folders)
+
+    def _get_template_pyviz_resources(self, asset_folders, resources=None):
+        if resources is None:
+            resources = self.collect_resources()
         template = ""
-        pyviz_extensions = self.get_pyviz_extensions().union({"bokeh"})
+        mode = self.get_resource_mode()
+        pyviz_extensions = self._get_pyviz_extension_names(resources)
+        bundling = self._is_bundling() and mode != "inline"
+        bundle_css = list()
+        bundle_js = list()
 
         for extension_name in pyviz_extensions:
-            extension = PYVIZ_EXTENSIONS[extension_name]
-
-            if "css" in extension:
-                # TODO add support for CDN resources
-                if "local" in extension["css"]:
-                    for item in extension["css"]["local"]:
-                        if self.main:
-                            template += """
-<link href="/{}/{}/{}" rel="stylesheet" crossorigin="anonymous">""".format(
-                                self.main, self._dst_folder, item
-                            )
-                        else:
-                            template += (
-                                """
+            for item in _get_pyviz_items(extension_name, "css", mode):
+                if bundling and not _is_url(item):
+                    bundle_css.append(item)
+                elif _is_url(item):
+                    template += self._get_template_bundle(bundle_css, "css", asset_folders)
+                    bundle_css = list()
+                    template += """
+<link href="{}" rel="stylesheet"{} crossorigin="anonymous">""".format(
+                        item, _get_integrity_attr(item)
+                    )
+                elif self.main and mode != "inline":
+                    template += """
+<link href="{}" rel="stylesheet" crossorigin="anonymous">""".format(
+                        self._get_asset_url(item, asset_folders)
+                    )
+                else:
+                    template += (
+                        """
 <style>
 """
-                                + get_inline_css(
-                                    item,
-                                    src_folder=self._src_folder,
-                                    asset_folders=asset_folders,
-                                )
-                                + "</style>"
-                            )
+                        + self._get_inline_css(item, asset_folders)
+                        + "</style>"
+                    )
 
-            if "js" in extension:
-                # TODO add support for CDN resources
-                if "local" in extension["js"]:
-                    for item in extension["js"]["local"]:
-                        if self.main:
-                            template += """
-<script src="/{}/{}/{}" type="text/javascript" crossorigin="anonymous"></script>""".format(
-                                self.main, self._dst_folder, item
-                            )
-                        else:
-                            template += (
-                                """
+            for item in _get_pyviz_items(extension_name, "js", mode):
+                if bundling and not _is_url(item):
+                    bundle_js.append(item)
+                elif _is_url(item):
+                    template += self._get_template_bundle(bundle_js, "js", asset_folders)
+                    bundle_js = list()
+                    template += """
+<script src="{}" type="text/javascript"{} crossorigin="anonymous"></script>""".format(
+                        item, _get_integrity_attr(item)
+                    )
+                elif self.main and mode != "inline":
+                    template += """
+<script src="{}" type="text/javascript" crossorigin="anonymous"></script>""".format(
+                        self._get_asset_url(item, asset_folders)
+                    )
+                else:
+                    template += (
+                        """
 <script type="text/javascript">
 """
-                                + get_inline_js(
-                                    item,
-                                    src_folder=self._src_folder,
-                                    asset_folders=asset_folders,
-                                )
-                                + "</script>"
-                            )
+                        + self._get_inline_js(item, asset_folders)
+                        + "</script>"
+                    )
+        template += self._get_template_bundle(bundle_css, "css", asset_folders)
+        template += self._get_template_bundle(bundle_js, "js", asset_folders)
         return template
 
-    def _get_template_body_classes_attr(self):
-        classes = self.get_body_classes()
+    def _get_template_body_classes_attr(self, resources=None):
+        if resources is None:
+            resources = self.collect_resources()
+        classes = resources.body_classes
         if classes:
             return ' class="' + " ".join(classes) + '"'
         else:
             return ""
 
-    def _get_template_contents_top(self, asset_folders, nb=IS_A_JUPYTER_NOTEBOOK):
+    def _get_template_contents_top(
+        self, asset_folders, nb=IS_A_JUPYTER_NOTEBOOK, resources=None
+    ):
+        if resources is None:
+            resources = self.collect_resources()
         template = ""
-        prepend_body_css = self.get_prepend_body_css()
+        prepend_body_css = resources.prepend_body_css
+        if self._critical_css and self.main and not nb:
+            template += self._get_template_critical_css(
+                list(prepend_body_css.values()), asset_folders
+            )
+            prepend_body_css = dict()
+        elif self._is_bundling(nb):
+            template += self._get_template_bundle(
+                list(prepend_body_css.values()), "css", asset_folders
+            )
+            prepend_body_css = dict()
         for item_name in prepend_body_css:
             item = prepend_body_css[item_name]
             if self.main:
-                make_available(
-                    item,
-                    src_folder=self._src_folder,
-                    dst_folder=self._dst_folder,
-                    asset_folders=asset_folders,
-                )
+                self._make_asset_available(item, asset_folders)
             if self.main and not nb:
                 template += """
-<link href="/{}/{}/{}" rel="stylesheet" crossorigin="anonymous">""".format(
-                    self.main, self._dst_folder, item
+<link href="{}" rel="stylesheet" crossorigin="anonymous">""".format(
+                    self._get_asset_url(item, asset_folders)
                 )
             else:
                 template += (
                     """
 <style>
 """
-                    + get_inline_css(
-                        item, src_folder=self._src_folder, asset_folders=asset_folders,
-                    )
+                    + self._get_inline_css(item, asset_folders)
                     + "</style>"
                 )
 
-        prepend_body_style = self.get_prepend_body_style()
+        prepend_body_style = resources.prepend_body_style
         for item_name in prepend_body_style:
             template += (
                 """
 <style>
 """
-                + prepend_body_style[item_name].replace("</style", r"\00003c/style")
+                + minify(prepend_body_style[item_name], self._get_minifier("css")).replace(
+                    "</style", r"\00003c/style"
+                )
                 + "</style>"
             )
         return template
 
-    def _make_available_contents_bottom_no_nb(self, asset_folders):
-        append_body_no_nb_js = self.get_append_body_no_nb_js()
+    def _make_available_contents_bottom_no_nb(self, asset_folders, resources=None):
+        if resources is None:
+            resources = self.collect_resources()
+        append_body_no_nb_js = resources.append_body_no_nb_js
         for item_name in append_body_no_nb_js:
+            if self._is_bundled("append_body_no_nb_js", item_name, resources):
+                continue
             item = append_body_no_nb_js[item_name]
-            make_available(
-                item,
-                src_folder=self._src_folder,
-                dst_folder=self._dst_folder,
-                asset_folders=asset_folders,
-            )
+            self._make_asset_available(item, asset_folders)
 
-    def _get_template_contents_bottom_no_nb(self, asset_folders):
+    def _get_template_contents_bottom_no_nb(self, asset_folders, resources=None):
+        if resources is None:
+            resources = self.collect_resources()
         template = ""
-        append_body_no_nb_js = self.get_append_body_no_nb_js()
-        for item_name in append_body_no_nb_js:
+        loadings = _resolve_script_loadings(resources)
+        bundle = list()
+        append_body_no_nb_js = resources.append_body_no_nb_js
+        for item_name in _order_scripts(
+            append_body_no_nb_js, "append_body_no_nb_js", resources.script_loading
+        ):
             item = append_body_no_nb_js[item_name]
-            if self.main:
+            loading = loadings[("append_body_no_nb_js", item_name)]
+            if self._is_bundled("append_body_no_nb_js", item_name, resources):
+                bundle.append(item)
+            elif self.main:
+                if loading is None:
+                    template += self._get_template_bundle(bundle, "js", asset_folders)
+                    bundle = list()
                 template += """
-<script src="/{}/{}/{}" type="text/javascript" crossorigin="anonymous"></script>""".format(
-                    self.main, self._dst_folder, item
+<script src="{}" type="text/javascript"{} crossorigin="anonymous"></script>""".format(
+                    self._get_asset_url(item, asset_folders), _get_loading_attr(loading),
                 )
             else:
                 template += (
                     """
 <script type="text/javascript">
 """
-                    + get_inline_js(
-                        item, src_folder=self._src_folder, asset_folders=asset_folders,
-                    )
+                    + self._get_inline_js(item, asset_folders)
                     + "</script>"
                 )
 
-        append_body_no_nb_script = self.get_append_body_no_nb_script()
+        template += self._get_template_bundle(bundle, "js", asset_folders)
+
+        append_body_no_nb_script = resources.append_body_no_nb_script
         for item_name in append_body_no_nb_script:
             item = append_body_no_nb_script[item_name]
             template += (
                 """
 <script type="text/javascript">
 """
-                + get_inline_js(
-                    item, src_folder=self._src_folder, asset_folders=asset_folders,
-                )
+                + self._get_inline_js(item, asset_folders)
                 + "</script>"
             )
         return template
 
-    def get_data_template(self):
+    def get_data_template(self, resources=None):
+        if resources is None:
+            resources = self.collect_resources()
         template = ""
 
-        data = self.get_component_data()
+        data = resources.component_data
         data_value_elements = list()
         data_elements = list()
 
@@ -849,7 +1857,10 @@ class Component:
             item = data[component_id]
 
             try:
-                json_data = json.dumps(item["data"])
+                if isinstance(item["data"], JSONText):
+                    json_data = str(item["data"])
+                else:
+                    json_data = json.dumps(item["data"])
                 data_value_elements.append(component_id + ": " + json_data)
             except:
                 pass
@@ -890,8 +1901,8 @@ window.data_values = {
         else:
             data_script = ""
 
-        data_prefix = self.get_data_prefix()
-        data_postfix = self.get_data_postfix()
+        data_prefix = resources.data_prefix
+        data_postfix = resources.data_postfix
 
         if data_elements or data_prefix or data_postfix:
             if not data_prefix:
@@ -925,53 +1936,82 @@ window.data = {
         )
         return template
 
-    def _get_template_contents_bottom(self, asset_folders, nb=IS_A_JUPYTER_NOTEBOOK):
+    def _get_template_contents_bottom(
+        self, asset_folders, nb=IS_A_JUPYTER_NOTEBOOK, resources=None
+    ):
+        if resources is None:
+            resources = self.collect_resources()
         template = ""
-        append_body_js = self.get_append_body_js()
-        for item_name in append_body_js:
+        loadings = _resolve_script_loadings(resources)
+        bundle = list()
+        append_body_js = resources.append_body_js
+        for item_name in _order_scripts(
+            append_body_js, "append_body_js", resources.script_loading
+        ):
             item = append_body_js[item_name]
+            loading = loadings[("append_body_js", item_name)]
+            if self._is_bundled("append_body_js", item_name, resources, nb):
+                bundle.append(item)
+                continue
             if self.main:
-                make_available(
-                    item,
-                    src_folder=self._src_folder,
-                    dst_folder=self._dst_folder,
-                    asset_folders=asset_folders,
-                )
+                self._make_asset_available(item, asset_folders)
             if self.main and not nb:
+                if loading is None:
+                    template += self._get_template_bundle(bundle, "js", asset_folders)
+                    bundle = list()
                 template += """
-<script src="/{}/{}/{}" type="text/javascript" crossorigin="anonymous"></script>""".format(
-                    self.main, self._dst_folder, item
+<script src="{}" type="text/javascript"{} crossorigin="anonymous"></script>""".format(
+                    self._get_asset_url(item, asset_folders), _get_loading_attr(loading),
                 )
             else:
                 template += (
                     """
 <script type="text/javascript">
 """
-                    + get_inline_js(
-                        item, src_folder=self._src_folder, asset_folders=asset_folders,
-                    )
+                    + self._get_inline_js(item, asset_folders)
                     + "</script>"
                 )
 
-        append_body_script = self.get_append_body_script()
+        template += self._get_template_bundle(bundle, "js", asset_folders)
+
+        append_body_script = resources.append_body_script
         for item_name in append_body_script:
             template += (
                 """
 <script type="text/javascript">
 """
-                + append_body_script[item_name].replace("</script", r"\u003c/script")
+                + minify(append_body_script[item_name], self._get_minifier("js")).replace(
+                    "</script", r"\u003c/script"
+                )
                 + "</script>"
             )
 
-        template += self.get_data_template()
+        template += self.get_data_template(resources)
 
         return template
 
-    def _get_template(self, asset_folders):
+    def _get_template_lazy_panels(self, resources=None):
+        if resources is None:
+            resources = self.collect_resources()
+        if not any(isinstance(panel, LazyPanel) for panel in resources.panels.values()):
+            return ""
+        return (
+            """
+<div style="display: none">{{ embed(roots."""
+            + LAZY_PANELS_TRIGGER
+            + """) }}</div>
+<script type="text/javascript">"""
+            + template_escape(minify(_LAZY_PANELS_SCRIPT, self._get_minifier("js")))
+            + "</script>"
+        )
+
+    def _get_template(self, asset_folders, resources=None):
+        if resources is None:
+            resources = self.collect_resources()
         if self.main:
-            self._make_available_head_resources(asset_folders)
-            self._make_available_head_no_nb(asset_folders)
-            self._make_available_contents_bottom_no_nb(asset_folders)
+            self._make_available_head_resources(asset_folders, resources)
+            self._make_available_head_no_nb(asset_folders, resources)
+            self._make_available_contents_bottom_no_nb(asset_folders, resources)
         return (
             """\
 {% extends base %}
@@ -986,12 +2026,14 @@ window.data = {
     {% block preamble %}{% endblock %}
     {% block resources %}
 """
-            + template_escape(self._get_template_pyviz_resources(asset_folders))
+            + template_escape(
+                self._get_template_pyviz_resources(asset_folders, resources)
+            )
             + """
     {% endblock %}
     {% block postamble %}
 """
-            + template_escape(self._get_template_head_no_nb(asset_folders))
+            + template_escape(self._get_template_head_no_nb(asset_folders, resources))
             + """
     {% endblock %}
     {% endblock %}
@@ -1000,11 +2042,13 @@ window.data = {
 
 {% block body %}
 <body"""
-            + template_escape(self._get_template_body_classes_attr())
+            + template_escape(self._get_template_body_classes_attr(resources))
             + """>
 """
             + template_escape(
-                self._get_template_contents_top(asset_folders=asset_folders, nb=False)
+                self._get_template_contents_top(
+                    asset_folders=asset_folders, nb=False, resources=resources
+                )
             )
             + """
     {% block inner_body %}
@@ -1018,10 +2062,13 @@ window.data = {
 """
             + template_escape(
                 self._get_template_contents_bottom(
-                    asset_folders=asset_folders, nb=False
+                    asset_folders=asset_folders, nb=False, resources=resources
                 )
             )
-            + template_escape(self._get_template_contents_bottom_no_nb(asset_folders))
+            + template_escape(
+                self._get_template_contents_bottom_no_nb(asset_folders, resources)
+            )
+            + self._get_template_lazy_panels(resources)
             + """
     {% endblock %}
 </body>
@@ -1029,7 +2076,11 @@ window.data = {
 """
         )
 
-    def _get_nb_template(self, asset_folders, nb=IS_A_JUPYTER_NOTEBOOK):
+    def _get_nb_template(
+        self, asset_folders, nb=IS_A_JUPYTER_NOTEBOOK, resources=None
+    ):
+        if resources is None:
+            resources = self.collect_resources()
         return (
             """\
 {% extends base %}
@@ -1037,21 +2088,26 @@ window.data = {
 {% block contents %}
 """
             + template_escape(
-                self._get_template_contents_top(asset_folders=asset_folders, nb=nb)
+                self._get_template_contents_top(
+                    asset_folders=asset_folders, nb=nb, resources=resources
+                )
             )
             + self.get_html(self.main, asset_folders=asset_folders)
             + self._no_panel_spacer
             + template_escape(
-                self._get_template_contents_bottom(asset_folders=asset_folders, nb=nb)
+                self._get_template_contents_bottom(
+                    asset_folders=asset_folders, nb=nb, resources=resources
+                )
             )
             + """
 {% endblock %}
 """
         )
 
-    def servable(self, *args, **kwargs):
-        asset_folders = self.get_asset_folders()
-        for filename in self.get_files_uris():
+    def servable(self, *args, use_cache=True, **kwargs):
+        resources = self.collect_resources()
+        asset_folders = resources.asset_folders
+        for filename in resources.files_uris:
             if self.main:
                 make_available(
                     filename,
@@ -1059,36 +2115,233 @@ window.data = {
                     dst_folder=self._dst_folder,
                     asset_folders=asset_folders,
                 )
-        self._no_panel_spacer = ""
-        panels = self.get_panels()
+        panels = dict(resources.panels)
         if not panels:
             pn.extension()
-            child_id = "panel_" + str(uuid.uuid4().hex)
-            self._no_panel_spacer = r"{{ embed(roots." + child_id + r") }}"
-            panels[child_id] = pn.Spacer()
 
-        tmpl = pn.Template(
-            self._get_template(asset_folders),
-            nb_template=self._get_nb_template(asset_folders),
-        )
+        cached = None
+        if use_cache:
+            key = self.fingerprint(resources)
+            cached = template_cache.get(key)
+            # The fingerprint covers the source files, not the published ones,
+            # that may have been removed since, for example by a redeploy
+            if cached is not None:
+                missing_files = [
+                    dst_file
+                    for dst_file in cached.published_files
+                    if not os.path.exists(dst_file)
+                ]
+                if missing_files:
+                    for dst_file in missing_files:
+                        publish_manifest.forget(dst_file)
+                    cached = None
+
+        if cached is None:
+            spacer_id = ""
+            self._no_panel_spacer = ""
+            if not panels:
+                spacer_id = make_id("panel_")
+                self._no_panel_spacer = r"{{ embed(roots." + spacer_id + r") }}"
+            with recording_published_files() as published_files:
+                template_source = self._get_template(asset_folders, resources)
+                nb_template_source = self._get_nb_template(
+                    asset_folders, resources=resources
+                )
+            cached = CachedTemplate(
+                template_source,
+                nb_template_source,
+                Template(template_source),
+                Template(nb_template_source),
+                spacer_id,
+                tuple(sorted(set(published_files))),
+            )
+            if use_cache:
+                template_cache.set(key, cached)
+
+        if cached.spacer_id:
+            self._no_panel_spacer = r"{{ embed(roots." + cached.spacer_id + r") }}"
+            panels[cached.spacer_id] = pn.Spacer()
+        else:
+            self._no_panel_spacer = ""
+
+        lazy_panels = dict()
+        for name, panel in panels.items():
+            if isinstance(panel, LazyPanel):
+                if IS_A_JUPYTER_NOTEBOOK:
+                    panels[name] = panel.panel
+                else:
+                    panels[name] = pn.Column(
+                        sizing_mode=getattr(panel.panel, "sizing_mode", None)
+                    )
+                    lazy_panels[name] = (panels[name], panel.panel)
+        if lazy_panels:
+            trigger = pn.widgets.TextInput()
+
+            def render_lazy_panel(event):
+                if event.new in lazy_panels:
+                    placeholder, panel = lazy_panels.pop(event.new)
+                    placeholder.objects = [panel]
+
+            trigger.param.watch(render_lazy_panel, "value")
+            panels[LAZY_PANELS_TRIGGER] = trigger
+
+        tmpl = pn.Template(cached.template, nb_template=cached.nb_template)
         for panel in panels:
             tmpl.add_panel(panel, panels[panel])
 
-        panel_css_files = self.get_panel_css_files()
+        panel_css_files = resources.panel_css_files
         if panel_css_files:
             pn.extension(css_files=list(panel_css_files.values()))
 
-        panel_raw_css = self.get_panel_raw_css()
+        panel_raw_css = resources.panel_raw_css
         if panel_raw_css:
             pn.extension(raw_css=list(panel_raw_css.values()))
 
         tmpl.servable(*args, **kwargs)
         return tmpl
 
-    def get_html(self, main, asset_folders=None, nb=IS_A_JUPYTER_NOTEBOOK):
-        if asset_folders is None:
-            asset_folders = self.get_asset_folders()
+    def _get_template_panel_css(self, resources=None):
+        if resources is None:
+            resources = self.collect_resources()
+        template = ""
+        for css_file in resources.panel_css_files.values():
+            if os.path.isfile(css_file):
+                template += "\n<style>\n" + _read_file(css_file) + "</style>"
+            else:
+                template += '\n<link href="{}" rel="stylesheet">'.format(css_file)
+        for style in resources.panel_raw_css.values():
+            template += "\n<style>\n" + style + "</style>"
+        return template
+
+    def iter_page(
+        self, title="Panel App", render_panel=None, chunk_size=PAGE_CHUNK_SIZE
+    ):
+        """Yields the html of the complete page as a sequence of chunks, without
+        going through Jinja or pn.Template, so that it can be flushed to the
+        browser while it is rendered.
+
+        The head, with the resource hints, is the first chunk. The body follows
+        in chunks of about chunk_size characters. The panels are rendered with
+        render_panel(name, panel), by default render_static_panel."""
+        resources = self.collect_resources()
+        asset_folders = resources.asset_folders
+        if self.main:
+            for filename in resources.files_uris:
+                make_available(
+                    filename,
+                    src_folder=self._src_folder,
+                    dst_folder=self._dst_folder,
+                    asset_folders=asset_folders,
+                )
+            self._make_available_head_resources(asset_folders, resources)
+            self._make_available_head_no_nb(asset_folders, resources)
+            self._make_available_contents_bottom_no_nb(asset_folders, resources)
+        if render_panel is None:
+            render_panel = render_static_panel
+        panels = resources.panels
+
+        def render(match):
+            if match.group(1):
+                return match.group(1)
+            name = match.group(2)
+            return render_panel(name, panels[name]) if name in panels else ""
+
+        yield (
+            """\
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="utf-8">
+    <meta http-equiv="X-UA-Compatible" content="IE=edge">
+    <title>"""
+            + html.escape(title)
+            + """</title>
+    <meta name="viewport" content="width=device-width, initial-scale=1">"""
+            + self._get_template_pyviz_resources(asset_folders, resources)
+            + self._get_template_panel_css(resources)
+            + self._get_template_head_no_nb(asset_folders, resources)
+            + """
+</head>
+"""
+        )
+
+        chunk = [
+            "<body"
+            + self._get_template_body_classes_attr(resources)
+            + ">\n"
+            + self._get_template_contents_top(
+                asset_folders=asset_folders, nb=False, resources=resources
+            )
+        ]
+        size = len(chunk[0])
+        for fragment in self.iter_html(
+            self.main, asset_folders=asset_folders, nb=False
+        ):
+            fragment = _PAGE_TEMPLATE_RE.sub(render, fragment)
+            chunk.append(fragment)
+            size += len(fragment)
+            if size >= chunk_size:
+                yield "".join(chunk)
+                chunk = []
+                size = 0
+        chunk.append(
+            self._get_template_contents_bottom(
+                asset_folders=asset_folders, nb=False, resources=resources
+            )
+            + self._get_template_contents_bottom_no_nb(asset_folders, resources)
+            + """
+</body>
+</html>
+"""
+        )
+        yield "".join(chunk)
+
+    def get_page(self, title="Panel App", render_panel=None):
+        return "".join(self.iter_page(title=title, render_panel=render_panel))
+
+    def save(self, filename, resources="inline", title="Panel App", render_panel=None):
+        """Writes the page to the file, with the panels embedded as static Bokeh
+        documents, so that any file server can serve it.
+
+        With "inline" resources the page is self-contained. With "local" the
+        assets are published to the static folder next to the file, and with
+        "cdn" the pyviz resources are loaded from their CDNs instead.
+
+        An unchanged page is not written again, so that its modification time,
+        and the ETag that file servers derive from it, stay the same."""
+        if resources not in RESOURCE_MODES:
+            raise ValueError(
+                "The resources must be one of {}, not {!r}".format(
+                    RESOURCE_MODES, resources
+                )
+            )
+        tree = list(self._iter_tree())
+        state = (self.main, self._dst_folder, self._resource_mode)
+        asset_roots = [component._asset_root for component in tree]
+        if resources == "inline":
+            self.main = ""
+        else:
+            self.main = self.main or "."
+            self._dst_folder = os.path.join(
+                os.path.dirname(os.path.abspath(filename)), "static"
+            )
+            for component in tree:
+                component._asset_root = "static"
+        self._resource_mode = resources
+        try:
+            write_text_file(
+                filename,
+                self.iter_page(title=title, render_panel=render_panel),
+                compress=self._compress_assets,
+                keep_unchanged=True,
+            )
+        finally:
+            self.main, self._dst_folder, self._resource_mode = state
+            for component, asset_root in zip(tree, asset_roots):
+                component._asset_root = asset_root
+        return self
 
+    def _get_html_opening(self, main, asset_folders, nb=IS_A_JUPYTER_NOTEBOOK):
         opening = self._opening
         if opening.endswith("/>"):
             opening_close = "/>"
@@ -1101,7 +2354,6 @@ window.data = {
                 opening_close = ">"
             else:
                 opening_close = ""
-        closing = self._post_html + self._closing
 
         if opening:
             opening += (
@@ -1109,24 +2361,81 @@ window.data = {
                 + opening_close
             )
 
-        markup = opening + self._pre_html
+        return opening + self._pre_html
 
-        for child in self.children:
-            markup += child.get_html(main, asset_folders)
+    def iter_html(self, main, asset_folders=None, nb=IS_A_JUPYTER_NOTEBOOK):
+        """Yields the html of the component tree as a sequence of fragments,
+        without building any intermediate strings, so that large pages can be
+        written straight to a response or a file."""
+        if asset_folders is None:
+            asset_folders = self.get_asset_folders()
 
-        markup += closing
+        # Closing markup is pushed as a string, to be yielded after all the
+        # children of its component. Only the root component gets the nb
+        # argument, the children are always rendered with its default value.
+        stack = [self]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, str):
+                if item:
+                    yield item
+                continue
+            if item is self:
+                fragment = item._get_html_opening(main, asset_folders, nb=nb)
+            else:
+                fragment = item._get_html_opening(main, asset_folders)
+            if fragment:
+                yield fragment
+            stack.append(item._post_html + item._closing)
+            stack.extend(reversed(item.children))
 
-        return markup
+    def get_html(self, main, asset_folders=None, nb=IS_A_JUPYTER_NOTEBOOK):
+        return "".join(self.iter_html(main, asset_folders=asset_folders, nb=nb))
 
     def _repr_html_(self, asset_folders=None, nb=IS_A_JUPYTER_NOTEBOOK):
+        resources = self.collect_resources()
         if asset_folders is None:
-            asset_folders = self.get_asset_folders()
+            asset_folders = resources.asset_folders
         return (
-            self._get_template_contents_top(asset_folders=asset_folders, nb=nb)
+            self._get_template_contents_top(
+                asset_folders=asset_folders, nb=nb, resources=resources
+            )
             + """ 
 """
             + self.get_html(self.main, asset_folders)
             + """ 
 """
-            + self._get_template_contents_bottom(asset_folders=asset_folders, nb=nb)
+            + self._get_template_contents_bottom(
+                asset_folders=asset_folders, nb=nb, resources=resources
+            )
+        )
+
+
+class TextNode(Component):
+    """The escaped text of a component, created by add_children for its string
+    and number children. It has the api of Component, but it's always a leaf
+    and skips all the processing of Component.__init__. Adding children or
+    html to it raises a TypeError, they go in its parent component."""
+
+    __slots__ = ()
+
+    def __init__(self, text):
+        self.tag_name = None
+        self._opening = ""
+        self._closing = ""
+        self.main = ""
+        self._id = ""
+        self.children = ()
+        self._pre_html = ""
+        self._post_html = template_escape(html.escape(text))
+        self._containers = None
+
+    def add_children(self, *args):
+        raise TypeError(
+            "The text of a component can't have children, add them to the component"
+        )
+
+    def append_html(self, markup):
+        raise TypeError(
+            "The text of a component can't have children, add the html to the component"
         )
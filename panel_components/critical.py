@@ -0,0 +1,189 @@
+"""This module extracts the critical css of a page: the rules of a stylesheet that can match the
+elements in the html of the page, so that they can be inlined while the full stylesheet loads
+without blocking the first paint.
+
+The selectors are checked conservatively. A rule is kept when every tag, class and id that its
+selector requires is present somewhere in the html, without checking how the elements are
+nested. Rules that style content added by javascript later, for example by the Bokeh models of
+Panel, are left to the full stylesheet."""
+import os
+import re
+from typing import FrozenSet, List, Optional, Tuple
+
+from .utils import LRUCache, _read_file, _rebase_css_urls
+
+critical_cache = LRUCache(max_bytes=8 * 1024 * 1024)
+
+# Always present, even if the html is only a fragment of the page
+_PAGE_TAGS = frozenset(["html", "body"])
+# At rules containing rules that are checked one by one
+_GROUPING_AT_RULES = ("@media", "@supports", "@document", "@layer")
+# At rules kept only if the name they define is used by the kept rules
+_NAMED_AT_RULES = {
+    "@font-face": re.compile(r"font-family\s*:\s*([^;]+)", re.IGNORECASE),
+    "@keyframes": re.compile(r"@keyframes\s+(\S+)", re.IGNORECASE),
+    "@-webkit-keyframes": re.compile(r"@-webkit-keyframes\s+(\S+)", re.IGNORECASE),
+}
+
+_TAG_RE = re.compile(r"<([a-zA-Z][\w-]*)")
+_ATTRIBUTE_RE = re.compile(
+    r"""\s(class|id)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))""", re.IGNORECASE
+)
+_COMMENT_RE = re.compile(r"/\*.*?\*/", re.DOTALL)
+_SELECTOR_ARGUMENTS_RE = re.compile(r"\[[^\]]*\]|\([^()]*\)")
+_SELECTOR_PSEUDO_RE = re.compile(r"::?[\w-]+")
+_SELECTOR_TAG_RE = re.compile(r"(?:^|[\s>+~,])([a-zA-Z][\w-]*)")
+_SELECTOR_CLASS_RE = re.compile(r"\.(-?[_a-zA-Z][\w-]*)")
+_SELECTOR_ID_RE = re.compile(r"#(-?[_a-zA-Z][\w-]*)")
+
+SelectorNames = Tuple[FrozenSet[str], FrozenSet[str], FrozenSet[str]]
+
+
+def get_selector_names(html: str) -> SelectorNames:
+    """Returns the tags, classes and ids used in the html
+
+    Example:
+
+    >>> tags, classes, ids = get_selector_names('<div id="main" class="a b"><p>Hi</p></div>')
+    >>> sorted(tags), sorted(classes), sorted(ids)
+    (['body', 'div', 'html', 'p'], ['a', 'b'], ['main'])
+
+    Args:
+        html (str): The html.
+
+    Returns:
+        SelectorNames: The (tags, classes, ids) sets
+    """
+    tags = set(_PAGE_TAGS)
+    tags.update(tag.lower() for tag in _TAG_RE.findall(html))
+    classes = set()
+    ids = set()
+    for name, *values in _ATTRIBUTE_RE.findall(html):
+        value = "".join(values)
+        if name.lower() == "class":
+            classes.update(value.split())
+        else:
+            ids.add(value.strip())
+    return frozenset(tags), frozenset(classes), frozenset(ids)
+
+
+def _split_css(css: str) -> List[Tuple[str, Optional[str]]]:
+    """Returns the top level (prelude, block) pairs of the css, with block None for statements
+    like @import that end with a semicolon.
+    """
+    items: List[Tuple[str, Optional[str]]] = []
+    depth = 0
+    start = 0
+    block_start = 0
+    index = 0
+    length = len(css)
+    while index < length:
+        char = css[index]
+        if char in "'\"":
+            end = index + 1
+            while end < length and css[end] != char:
+                end += 2 if css[end] == "\\" else 1
+            index = end + 1
+            continue
+        if char == "{":
+            if depth == 0:
+                block_start = index
+            depth += 1
+        elif char == "}" and depth:
+            depth -= 1
+            if depth == 0:
+                items.append((css[start:block_start].strip(), css[block_start + 1 : index]))
+                start = index + 1
+        elif char == ";" and depth == 0:
+            items.append((css[start:index].strip(), None))
+            start = index + 1
+        index += 1
+    return items
+
+
+def _selector_may_match(selector: str, names: SelectorNames) -> bool:
+    tags, classes, ids = names
+    selector = _SELECTOR_ARGUMENTS_RE.sub("", selector)
+    selector = _SELECTOR_PSEUDO_RE.sub("", selector)
+    return (
+        all(tag.lower() in tags for tag in _SELECTOR_TAG_RE.findall(selector))
+        and all(name in classes for name in _SELECTOR_CLASS_RE.findall(selector))
+        and all(name in ids for name in _SELECTOR_ID_RE.findall(selector))
+    )
+
+
+def _extract_rules(css: str, names: SelectorNames, named_rules: List[Tuple[str, str]]) -> str:
+    critical = []
+    for prelude, block in _split_css(css):
+        if block is None or not prelude:
+            continue  # @import and @charset are left to the full stylesheet
+        at_rule = prelude.split(None, 1)[0].lower() if prelude.startswith("@") else ""
+        if at_rule in _GROUPING_AT_RULES:
+            inner = _extract_rules(block, names, named_rules)
+            if inner:
+                critical.append("{}{{{}}}".format(prelude, inner))
+        elif at_rule in _NAMED_AT_RULES:
+            match = _NAMED_AT_RULES[at_rule].search(prelude + block)
+            if match:
+                name = match.group(1).strip(" \"'")
+                named_rules.append((name, "{}{{{}}}".format(prelude, block)))
+        elif at_rule:
+            critical.append("{}{{{}}}".format(prelude, block))
+        elif any(_selector_may_match(selector, names) for selector in prelude.split(",")):
+            critical.append("{}{{{}}}".format(prelude, block.strip()))
+    return "".join(critical)
+
+
+def extract_critical_css(css: str, names: SelectorNames) -> str:
+    """Returns the rules of the css that can match an element with the given names, see
+    get_selector_names, plus the @font-face and @keyframes rules they use
+
+    Example:
+
+    >>> names = get_selector_names('<p class="note">Hi</p>')
+    >>> extract_critical_css("p.note { color: red } .other { color: blue }", names)
+    'p.note{color: red}'
+
+    Args:
+        css (str): The css.
+        names (SelectorNames): The (tags, classes, ids) sets.
+
+    Returns:
+        str: The critical css
+    """
+    css = _COMMENT_RE.sub("", css)
+    named_rules: List[Tuple[str, str]] = []
+    critical = _extract_rules(css, names, named_rules)
+    used = [rule for name, rule in named_rules if name and name in critical]
+    return "".join(used) + critical
+
+
+def get_critical_css(filename: str, src_file: str, names: SelectorNames, root: str = "") -> str:
+    """Returns the critical css of the src_file, using the critical_cache, with its relative urls
+    rebased to the root, the url of the folder the file is published to.
+
+    Args:
+        filename (str): The name of the file. For example 'katex/katex.css'.
+        src_file (str): The path to the file.
+        names (SelectorNames): The (tags, classes, ids) sets, see get_selector_names.
+        root (str, optional): For example '/app/static'. Defaults to "".
+
+    Returns:
+        str: The critical css
+    """
+    src_stat = os.stat(src_file)
+    key = (
+        os.path.abspath(src_file),
+        src_stat.st_mtime_ns,
+        src_stat.st_size,
+        filename,
+        names,
+        root,
+    )
+    critical = critical_cache.get(key)
+    if critical is None:
+        critical = extract_critical_css(
+            _rebase_css_urls(_read_file(src_file), filename, root), names
+        )
+        critical_cache.set(key, critical)
+    return critical
@@ -0,0 +1,83 @@
+"""This module exports many pages at once, rendering them in a pool of processes so that large
+batches, like nightly reports, use all the cores of the machine.
+
+Pages saved to the same folder share its static folder. The processes publish to it safely at
+the same time: the files are replaced atomically and the manifest.json of fingerprinted assets
+is updated under a file lock."""
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from .component import Component
+
+ExportResult = namedtuple("ExportResult", ["filename", "seconds", "error"])
+
+
+def export_page(
+    filename: str,
+    create_component: Callable[[], Component],
+    resources: str = "local",
+    title: str = "Panel App",
+) -> ExportResult:
+    """Saves the page of the component returned by create_component to the file, see
+    Component.save
+
+    Args:
+        filename (str): The path to the html file. For example 'site/index.html'.
+        create_component (Callable[[], Component]): Returns the component of the page.
+        resources (str, optional): One of "inline", "local" and "cdn". Defaults to "local".
+        title (str, optional): The title of the page. Defaults to "Panel App".
+
+    Returns:
+        ExportResult: The filename, the seconds it took to build and save the page, and the
+            error message if it failed, otherwise None
+    """
+    start = time.perf_counter()
+    error = None
+    try:
+        create_component().save(filename, resources=resources, title=title)
+    except Exception as exception:  # pylint: disable=broad-except
+        # Reported instead of raised, so that one broken page doesn't stop the batch
+        error = "{}: {}".format(type(exception).__name__, exception)
+    return ExportResult(filename, time.perf_counter() - start, error)
+
+
+def export_pages(
+    pages: Iterable[Tuple[str, Callable[[], Component]]],
+    resources: str = "local",
+    title: str = "Panel App",
+    max_workers: Optional[int] = None,
+) -> List[ExportResult]:
+    """Saves the pages in a pool of processes, see export_page
+
+    Example:
+
+    >>> def create_report():
+    ...     return tags.div(tags.h1("Report"))
+    >>> results = export_pages([("site/report.html", create_report)])  # doctest: +SKIP
+
+    Args:
+        pages (Iterable[Tuple[str, Callable[[], Component]]]): The (filename, create_component)
+            pairs. As they are sent to other processes, the create_component functions must be
+            picklable, for example functions defined at the top level of a module.
+        resources (str, optional): One of "inline", "local" and "cdn". Defaults to "local".
+        title (str, optional): The title of the pages. Defaults to "Panel App".
+        max_workers (Optional[int], optional): The number of processes. Defaults to None, one
+            per core. With 1 the pages are saved in this process.
+
+    Returns:
+        List[ExportResult]: The results, in the order of the pages
+    """
+    pages = list(pages)
+    if max_workers == 1 or len(pages) < 2:
+        return [
+            export_page(filename, create_component, resources, title)
+            for filename, create_component in pages
+        ]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(export_page, filename, create_component, resources, title)
+            for filename, create_component in pages
+        ]
+        return [future.result() for future in futures]
@@ -0,0 +1,231 @@
+"""This module contains conservative, pure Python minifiers for the css and js that the components
+inline in their templates or bundle.
+
+They only remove comments and whitespace. Anything they don't fully understand, like the
+contents of strings, regular expressions and template literals, is copied as is. Line breaks in
+js are kept, so automatic semicolon insertion is not affected. Comments starting with /*! are
+kept, as they usually hold licenses."""
+import hashlib
+from typing import Callable, List, Optional
+
+from .utils import LRUCache
+
+minify_cache = LRUCache(max_bytes=16 * 1024 * 1024)
+
+_JS_KEYWORDS_BEFORE_EXPRESSION = {
+    "await",
+    "case",
+    "delete",
+    "do",
+    "else",
+    "in",
+    "instanceof",
+    "new",
+    "of",
+    "return",
+    "throw",
+    "typeof",
+    "void",
+    "yield",
+}
+# A space next to one of these characters can be removed. Leaves out "+", "-", "." and "/" as
+# for example "a + +b", "1 .toString()" and "a / /re/" would change meaning
+_JS_PUNCTUATION = set("{}()[];,:=<>?!&|*%^~")
+_CSS_PUNCTUATION = set("{};,>")
+_JS_SPACES = " \t\r\f\v\u00a0\ufeff"
+_CSS_SPACES = " \t\r\n\f"
+
+
+def _copy_quoted(text: str, start: int, quote: str, out: List[str]) -> int:
+    """Copies the string, regular expression or template literal starting at the start index,
+    which holds the opening quote, to out, and returns the index after the closing quote. Stops
+    at the end of the line if the quote is not closed, except for template literals.
+    """
+    index = start + 1
+    in_class = False  # Inside a [...] character class of a regular expression
+    depth = 0  # Of the braces of the ${...} placeholders of a template literal
+    length = len(text)
+    while index < length:
+        char = text[index]
+        if char == "\\":
+            index += 2
+            continue
+        if char == "\n" and quote != "`":
+            break
+        if depth:
+            if char in "'\"`":
+                index = _copy_quoted(text, index, char, [])
+                continue
+            if char == "{":
+                depth += 1
+            elif char == "}":
+                depth -= 1
+        elif quote == "`" and text.startswith("${", index):
+            depth = 1
+            index += 1
+        elif quote == "/":
+            if char == "[":
+                in_class = True
+            elif char == "]":
+                in_class = False
+            elif char == "/" and not in_class:
+                index += 1
+                break
+        elif char == quote:
+            index += 1
+            break
+        index += 1
+    index = min(index, length)
+    out.append(text[start:index])
+    return index
+
+
+def _append_space(out: List[str], next_char: str, punctuation: set):
+    if not out or out[-1] == "\n":
+        return
+    previous_char = out[-1][-1]
+    if previous_char in " \n" or previous_char in punctuation or next_char in punctuation:
+        return
+    out.append(" ")
+
+
+def minify_js(js: str) -> str:
+    """Returns the js without comments, indentation and other redundant whitespace
+
+    Example:
+
+    >>> minify_js("// Counts\\nvar count = 0;  /* None */\\n\\nif (count > 1) {\\n  count++;\\n}")
+    'var count=0;\\nif(count>1){\\ncount++;\\n}'
+
+    Args:
+        js (str): The js.
+
+    Returns:
+        str: The minified js
+    """
+    out: List[str] = []
+    last_token = ""  # The last identifier, number or punctuation character copied to out
+    index = 0
+    length = len(js)
+    while index < length:
+        char = js[index]
+        if char in _JS_SPACES:
+            index += 1
+            while index < length and js[index] in _JS_SPACES:
+                index += 1
+            if index < length and js[index] != "\n":
+                _append_space(out, js[index], _JS_PUNCTUATION)
+        elif char == "\n":
+            while out and out[-1] == " ":
+                out.pop()
+            if out and out[-1] != "\n":
+                out.append("\n")
+            index += 1
+        elif char == "/" and js.startswith("//", index):
+            newline = js.find("\n", index)
+            index = length if newline == -1 else newline
+        elif char == "/" and js.startswith("/*", index):
+            end = js.find("*/", index + 2)
+            end = length if end == -1 else end + 2
+            if js.startswith("/*!", index):
+                out.append(js[index:end])
+            elif "\n" in js[index:end]:
+                out.append("\n")
+            elif index > 0 and end < length:
+                _append_space(out, js[end], _JS_PUNCTUATION)
+            index = end
+        elif char in "'\"`":
+            index = _copy_quoted(js, index, char, out)
+            last_token = char
+        elif char == "/" and (
+            not last_token
+            or last_token in _JS_KEYWORDS_BEFORE_EXPRESSION
+            or not (last_token[-1].isalnum() or last_token[-1] in "_$)]'\"`")
+        ):
+            # A regular expression, or a division that is safely copied as is
+            index = _copy_quoted(js, index, "/", out)
+            last_token = "/"
+        elif char.isalnum() or char in "_$" or ord(char) > 127:
+            end = index + 1
+            while end < length and (js[end].isalnum() or js[end] in "_$" or ord(js[end]) > 127):
+                end += 1
+            last_token = js[index:end]
+            out.append(last_token)
+            index = end
+        else:
+            out.append(char)
+            last_token = char
+            index += 1
+    while out and out[-1] in (" ", "\n"):
+        out.pop()
+    return "".join(out)
+
+
+def minify_css(css: str) -> str:
+    """Returns the css without comments and redundant whitespace and semicolons
+
+    Example:
+
+    >>> minify_css("/* Body */\\nbody {\\n  color: red;\\n  font-family: 'Open  Sans';\\n}\\n")
+    "body{color:red;font-family:'Open  Sans'}"
+
+    Args:
+        css (str): The css.
+
+    Returns:
+        str: The minified css
+    """
+    out: List[str] = []
+    index = 0
+    length = len(css)
+    while index < length:
+        char = css[index]
+        if char in _CSS_SPACES:
+            index += 1
+            while index < length and css[index] in _CSS_SPACES:
+                index += 1
+            if index < length:
+                _append_space(out, css[index], _CSS_PUNCTUATION)
+        elif char == "/" and css.startswith("/*", index):
+            end = css.find("*/", index + 2)
+            end = length if end == -1 else end + 2
+            if css.startswith("/*!", index):
+                out.append(css[index:end])
+            index = end
+        elif char in "'\"":
+            index = _copy_quoted(css, index, char, out)
+        elif char == ":":
+            out.append(char)
+            index += 1
+            while index < length and css[index] in _CSS_SPACES:
+                index += 1
+        elif char == "}" and out and out[-1] == ";":
+            out[-1] = char
+            index += 1
+        else:
+            out.append(char)
+            index += 1
+    while out and out[-1] == " ":
+        out.pop()
+    return "".join(out)
+
+
+def minify(text: str, minifier: Optional[Callable[[str], str]]) -> str:
+    """Returns the text minified with the minifier, using the minify_cache, or the text itself if
+    the minifier is None
+
+    Args:
+        text (str): The css or js.
+        minifier (Optional[Callable[[str], str]]): For example minify_js.
+
+    Returns:
+        str: The minified text
+    """
+    if minifier is None or not text:
+        return text
+    key = (minifier, hashlib.sha1(text.encode("utf8")).hexdigest(), len(text))
+    minified = minify_cache.get(key)
+    if minified is None:
+        minified = minifier(text)
+        minify_cache.set(key, minified)
+    return minified
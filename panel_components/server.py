@@ -0,0 +1,130 @@
+"""This module streams the pages of components to the browser with Tornado, the web server that
+Bokeh and Panel run on. The head of the page, with its resource hints, is flushed before the body
+is rendered, so the time to the first byte doesn't grow with the size of the page.
+
+The pages get an ETag, so a browser that already has the page gets a 304 Not Modified response,
+without the page being rendered again. Pages with panels only get one if a get_version function
+returns a version of what their panels show, as the ETag can't cover the content of the panels. Their Last-Modified header is the modification time of
+their latest asset file. It's only informative, as the tree of a page can change without any of
+its files changing.
+
+The RowsHandler serves the pages of rows of the virtual lists and tables that fetch their rows
+from the server, see virtual.virtual_list.
+
+Example:
+
+>>> from tornado import web
+>>> from panel_components import tags
+>>> app = web.Application([(r"/", ComponentHandler, {"create_component": lambda: tags.p("Hi")})])
+"""
+import json
+from typing import Any, Callable, Optional, Sequence
+
+from bokeh.document import Document
+from bokeh.io import curdoc
+from bokeh.io.doc import set_curdoc
+from tornado import web
+
+from .component import PAGE_CHUNK_SIZE, Component
+
+
+def _create_in_new_document(create_component: Callable[[], Component]) -> Component:
+    """Returns the component created in a new Bokeh document, so that its ids are in a namespace
+    of their own, like in a Panel session"""
+    document = curdoc()
+    set_curdoc(Document())
+    try:
+        return create_component()
+    finally:
+        set_curdoc(document)
+
+
+class ComponentHandler(web.RequestHandler):
+    """A request handler that streams the page of a new component to the browser, chunk by
+    chunk, see Component.iter_page.
+
+    The arguments are given as the initialize arguments of the route.
+
+    Args:
+        create_component (Callable[[], Component]): Returns the component of a request. A new
+            component per request, as the Bokeh models of its panels can't be shared.
+        title (str, optional): The title of the page. Defaults to "Panel App".
+        render_panel (Optional[Callable[[str, Any], str]], optional): Returns the html of a
+            panel. Defaults to None, which renders the panels as static Bokeh documents.
+        chunk_size (int, optional): The minimum number of characters flushed at once, except for
+            the head. Defaults to PAGE_CHUNK_SIZE.
+        get_version (Optional[Callable[[], Any]], optional): Returns a version of what the panels
+            of the page show, for example the time their data was last updated, used in the ETag
+            of pages with panels. Defaults to None, which sends no ETag for pages with panels, as
+            they can show different data with the same tree.
+    """
+
+    # pylint: disable=arguments-differ,attribute-defined-outside-init,abstract-method
+    def initialize(
+        self,
+        create_component: Callable[[], Component],
+        title: str = "Panel App",
+        render_panel: Optional[Callable[[str, Any], str]] = None,
+        chunk_size: int = PAGE_CHUNK_SIZE,
+        get_version: Optional[Callable[[], Any]] = None,
+    ):
+        self.create_component = create_component
+        self.title = title
+        self.render_panel = render_panel
+        self.chunk_size = chunk_size
+        self.get_version = get_version
+
+    async def get(self, *args, **kwargs):
+        self.set_header("Content-Type", "text/html; charset=UTF-8")
+        component = _create_in_new_document(self.create_component)
+        resources = component.collect_resources()
+        version = self.get_version() if resources.panels and self.get_version else None
+        etag = component.etag(resources, variant=self.title, version=version)
+        last_modified = component.last_modified(resources)
+        if last_modified:
+            self.set_header("Last-Modified", last_modified)
+        if etag:
+            self.set_header("Etag", etag)
+        if etag and self.check_etag_header():
+            self.set_status(304)
+            return
+        for chunk in component.iter_page(
+            title=self.title, render_panel=self.render_panel, chunk_size=self.chunk_size
+        ):
+            self.write(chunk)
+            await self.flush()
+
+
+class RowsHandler(web.RequestHandler):
+    """A request handler that answers the rows from the start to the stop query arguments as a
+    JSON list, for the virtual lists and tables with a page_url, see virtual.virtual_list.
+
+    The arguments are given as the initialize arguments of the route.
+
+    Example:
+
+    >>> items = ["Item {}".format(index) for index in range(100000)]
+    >>> app = web.Application([(r"/items", RowsHandler, {"get_rows": items.__getitem__})])
+
+    Args:
+        get_rows (Callable[[slice], Sequence]): Returns the rows of a slice, the texts of the items
+            of a list, or the lists of the texts of the cells of a table, like __getitem__ of a
+            list.
+        max_page_size (int, optional): The maximum number of rows answered at once. Defaults to
+            1000.
+    """
+
+    # pylint: disable=arguments-differ,attribute-defined-outside-init,abstract-method
+    def initialize(self, get_rows: Callable[[slice], Sequence], max_page_size: int = 1000):
+        self.get_rows = get_rows
+        self.max_page_size = max_page_size
+
+    def get(self, *args, **kwargs):
+        try:
+            start = max(0, int(self.get_query_argument("start", "0")))
+            stop = int(self.get_query_argument("stop", str(start + self.max_page_size)))
+        except ValueError:
+            raise web.HTTPError(400, "The start and the stop must be integers")
+        stop = max(start, min(stop, start + self.max_page_size))
+        self.set_header("Content-Type", "application/json; charset=UTF-8")
+        self.write(json.dumps(list(self.get_rows(slice(start, stop))), separators=(",", ":")))
@@ -0,0 +1,161 @@
+"""This module builds large html tables from pandas DataFrames, NumPy arrays and lists of rows.
+
+Instead of a Component per row and cell, the whole table is a single Component holding the
+markup of its rows. The values are converted to text and html escaped a column at a time, so a
+table of 100 000 cells is built in a fraction of the time and memory of the same table built
+with tags.tr and tags.td."""
+import html
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple, Union
+
+from .component import Component
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+Formatter = Union[str, Callable[[Any], str]]
+
+
+def _get_columns(
+    data: Any, columns: Optional[Sequence[Hashable]] = None
+) -> Tuple[List[Hashable], List[Sequence]]:
+    """Returns the names and the values of the columns of the data. The columns of a DataFrame
+    are selected by name, the columns of arrays and rows are named by position."""
+    if hasattr(data, "columns") and hasattr(data, "iloc"):  # A pandas DataFrame
+        if columns is None:
+            names = list(data.columns)
+            return names, [data.iloc[:, index].to_numpy() for index in range(len(names))]
+        names = list(columns)
+        return names, [data[name].to_numpy() for name in names]
+    if np is not None and isinstance(data, np.ndarray):
+        if data.ndim == 1:
+            data = data.reshape(-1, 1)
+        values = [data[:, index] for index in range(data.shape[1])]
+    else:
+        rows = list(data)
+        if not rows and columns is not None:  # Only a header
+            return list(columns), [()] * len(columns)
+        values = list(zip(*rows))
+        if any(len(row) != len(values) for row in rows):
+            raise ValueError("All the rows must have the same number of values")
+    if columns is None:
+        return list(range(len(values))), values
+    if len(columns) != len(values):
+        raise ValueError(
+            "There are {} columns but {} names of columns".format(len(values), len(columns))
+        )
+    return list(columns), values
+
+
+def _format_column(values: Sequence, formatter: Optional[Formatter] = None) -> List[str]:
+    """Returns the values converted to text, with the formatter if there is one. A formatter
+    can be a format string, for example "{:,.2f}", or a function."""
+    if np is not None and isinstance(values, np.ndarray) and values.dtype.kind in "biuf":
+        # Converting the whole array to Python numbers at once is much faster than converting
+        # each NumPy number, and is also faster than astype(str)
+        values = values.tolist()
+    if formatter is None:
+        formatter = str
+    elif isinstance(formatter, str):
+        formatter = formatter.format
+    return list(map(formatter, values))
+
+
+def escape_column(texts: List[str]) -> List[str]:
+    """Returns the texts html escaped with a single call to html.escape
+
+    Example:
+
+    >>> escape_column(["Fish & Chips", "<b>", "42"])
+    ['Fish &amp; Chips', '&lt;b&gt;', '42']
+
+    Args:
+        texts (List[str]): The texts.
+
+    Returns:
+        List[str]: The escaped texts
+    """
+    escaped = html.escape("\0".join(texts)).split("\0")
+    if len(escaped) != len(texts):  # Some text had a null character
+        escaped = [html.escape(text) for text in texts]
+    return escaped
+
+
+def _get_cell_tag(tag: str, css_class: Optional[str]) -> str:
+    if css_class:
+        return '<{} class="{}">'.format(tag, html.escape(css_class))
+    return "<{}>".format(tag)
+
+
+def table_from_frame(
+    data: Any,
+    columns: Optional[Sequence[Hashable]] = None,
+    formatters: Optional[Dict[Hashable, Formatter]] = None,
+    column_classes: Optional[Dict[Hashable, str]] = None,
+    header: Optional[bool] = None,
+    **attributes
+) -> Component:
+    """Returns a table component with the data, built a column at a time
+
+    Example:
+
+    >>> table = table_from_frame([[7.5]], columns=["Price"], formatters={"Price": "{:.2f}"})
+    >>> print(table.get_html("", nb=False))
+    <table><thead><tr><th>Price</th></tr></thead><tbody><tr><td>7.50</td></tr></tbody></table>
+
+    Args:
+        data (Any): A pandas DataFrame, a 1 or 2 dimensional NumPy array, or rows of values.
+        columns (Optional[Sequence[Hashable]], optional): The columns of the DataFrame to show,
+            or the names of the columns of the array or the rows, used as headers and as the keys
+            of the formatters and column_classes. Defaults to None, all the columns of the
+            DataFrame, or the positions of the columns.
+        formatters (Optional[Dict[Hashable, Formatter]], optional): The format strings, for
+            example "{:,.2f}", or the functions that convert the values of the columns to text.
+            Defaults to None, which converts them with str.
+        column_classes (Optional[Dict[Hashable, str]], optional): The css classes of the cells
+            of the columns. Defaults to None.
+        header (Optional[bool], optional): Whether the table has a header row. Defaults to None,
+            which adds one for DataFrames and for the given columns.
+        **attributes: The attributes of the table, for example css_classes or id.
+
+    Raises:
+        ValueError: If the rows don't all have the same number of values, or if the number of
+            columns isn't the number of values of the rows.
+
+    Returns:
+        Component: The table
+    """
+    names, values = _get_columns(data, columns)
+    if header is None:
+        header = columns is not None or hasattr(data, "columns")
+    formatters = formatters or dict()
+    column_classes = column_classes or dict()
+
+    cell_columns = list()
+    for name, column in zip(names, values):
+        opening = _get_cell_tag("td", column_classes.get(name))
+        cell_columns.append(
+            [
+                opening + text + "</td>"
+                for text in escape_column(_format_column(column, formatters.get(name)))
+            ]
+        )
+
+    markup = list()
+    if header:
+        markup.append("<thead><tr>")
+        for name in names:
+            markup.append(
+                _get_cell_tag("th", column_classes.get(name))
+                + html.escape(str(name))
+                + "</th>"
+            )
+        markup.append("</tr></thead>")
+    markup.append("<tbody>")
+    markup.extend("<tr>" + "".join(row) + "</tr>" for row in zip(*cell_columns))
+    markup.append("</tbody>")
+
+    table = Component(tag_name="table", opening="<table>", closing="</table>", **attributes)
+    table.append_html("".join(markup))
+    return table
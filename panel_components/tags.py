@@ -3,6 +3,8 @@ from __future__ import print_function, division
 
 import sys
 from .component import make_tag_function
+from .table import table_from_frame
+from .virtual import virtual_list, virtual_table
 
 
 tag_list = [
@@ -281,4 +283,4 @@ module = sys.modules[__name__]
 for tag in tag_list:
     setattr(module, tag, make_tag_function(tag, tag in xml_closing_style_tags))
 
-__all__ = tag_list
+__all__ = tag_list + ["table_from_frame", "virtual_list", "virtual_table"]
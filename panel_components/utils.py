@@ -7,11 +7,33 @@ assets"""
 from __future__ import division, print_function
 
 import base64
+import contextlib
 import errno
+import filecmp
+import gzip
+import hashlib
 import html
+import json
 import os
+import posixpath
+import re
 import shutil
-from typing import Any, List, Optional, Text, Tuple
+import stat
+import tempfile
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Text, Tuple
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
 
 try:
     # Detect if running inside a Jupyter notebook
@@ -90,6 +112,98 @@ def get_dir_name(folder: Optional[str] = None) -> str:
     return folder.replace("/", os.sep).rstrip(os.sep).split(os.sep)[-1]
 
 
+class LRUCache:
+    """A thread-safe least recently used cache bounded by the total size of its values
+
+    The size of a value is its length, so for text it is the number of characters and for
+    bytes the number of bytes. Values larger than the whole budget are never stored.
+
+    Example:
+
+    >>> cache = LRUCache(max_bytes=10)
+    >>> cache.set("a", "12345")
+    >>> cache.set("b", "67890")
+    >>> cache.get("a")
+    '12345'
+    >>> cache.set("c", "!")
+    >>> cache.get("b") is None
+    True
+
+    Args:
+        max_bytes (int): The maximum total size of the cached values.
+    """
+
+    def __init__(self, max_bytes: int):
+        self._max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def max_bytes(self) -> int:
+        """The maximum total size of the cached values. Lowering it evicts entries."""
+        return self._max_bytes
+
+    @max_bytes.setter
+    def max_bytes(self, value: int):
+        with self._lock:
+            self._max_bytes = value
+            self._evict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Returns the value cached for the key, or the default if there is none"""
+        with self._lock:
+            if key in self._entries:
+                self._hits += 1
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            self._misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any):
+        """Caches the value for the key, evicting the least recently used entries if needed"""
+        with self._lock:
+            if key in self._entries:
+                self._size -= len(self._entries.pop(key))
+            if len(value) <= self._max_bytes:
+                self._entries[key] = value
+                self._size += len(value)
+                self._evict()
+
+    def clear(self):
+        """Removes all entries and resets the statistics"""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self._hits = 0
+            self._misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the number of hits, misses and entries, and the size and budget in bytes"""
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self._max_bytes,
+            }
+
+    def _evict(self):
+        while self._size > self._max_bytes and self._entries:
+            _, value = self._entries.popitem(last=False)
+            self._size -= len(value)
+
+
+# The escaped text of the files inlined by get_inline_js and get_inline_css
+inline_cache = LRUCache(max_bytes=64 * 1024 * 1024)
+
+# The data uris of the files inlined by make_inline_uri
+inline_uri_cache = LRUCache(max_bytes=32 * 1024 * 1024)
+
+
 # Todo: Consider renaming src_path to path or file_path as this is more specific
 def _read_file(src_path: Optional[str] = None) -> str:
     """Returns the text content of the src_path if it is a file
@@ -108,6 +222,260 @@ def _read_file(src_path: Optional[str] = None) -> str:
     return file_contents
 
 
+def _read_inline_file(
+    src_file: Optional[str],
+    closing_tag: str,
+    escaped_closing_tag: str,
+    minifier: Optional[Callable[[str], str]] = None,
+) -> str:
+    """Returns the text content of the src_file with the closing_tag escaped, using the
+    inline_cache. The cache key includes the modification time and size of the file, so a
+    changed file is read again.
+
+    Args:
+        src_file (Optional[str]): The path to the file.
+        closing_tag (str): For example "</script".
+        escaped_closing_tag (str): For example r"\u003c/script"
+        minifier (Optional[Callable[[str], str]], optional): Applied to the content before
+            escaping it, for example minify.minify_js. Defaults to None.
+
+    Returns:
+        str: The escaped text content of the file
+    """
+    if not src_file:
+        return ""
+    try:
+        src_stat = os.stat(src_file)
+    except OSError:
+        return ""
+    if not stat.S_ISREG(src_stat.st_mode):
+        return ""
+
+    key = (
+        os.path.abspath(src_file),
+        src_stat.st_mtime_ns,
+        src_stat.st_size,
+        closing_tag,
+        minifier,
+    )
+    inline_text = inline_cache.get(key)
+    if inline_text is None:
+        inline_text = _read_file(src_file)
+        if minifier is not None:
+            inline_text = minifier(inline_text)
+        inline_text = inline_text.replace(closing_tag, escaped_closing_tag)
+        inline_cache.set(key, inline_text)
+    return inline_text
+
+
+def _split_path(path: str) -> List[str]:
+    """Returns the elements of a "/" separated path, leaving out empty and hidden elements
+
+    Example:
+
+    >>> _split_path("./css/.hidden/style.css/")
+    ['css', 'style.css']
+
+    Args:
+        path (str): The path. For example 'css/style.css'.
+
+    Returns:
+        List[str]: The path elements
+    """
+    return [element for element in path.strip("/").split("/") if element and element[0] != "."]
+
+
+def _get_asset_folder_path(folder: str) -> str:
+    """Returns the path that an asset folder is searched in
+
+    Args:
+        folder (str): The asset folder. For example '/home/user/assets' or 'assets'.
+
+    Returns:
+        str: The path of the asset folder.
+    """
+    folder_path_elements = _split_path(folder)
+    if folder.startswith("/"):
+        if not folder_path_elements:
+            return "/"
+        folder_path_elements[0] = "/" + folder_path_elements[0]
+    return os.path.join(*folder_path_elements) if folder_path_elements else ""
+
+
+class AssetIndex:
+    """An index of the files found in a list of folders, mapping the relative path of each file
+    to the path of the file that wins the lookup, the first folder having precedence.
+
+    The index is built by scanning the folders once. It rescans them when the modification time
+    of one of the scanned directories changed, which is checked at most once every
+    check_interval seconds, when refresh() is called, or when the file found by a lookup was
+    removed. Folders holding more than max_files
+    files are not indexed, and each lookup checks the folders instead.
+
+    Args:
+        folders (Tuple[str, ...]): The folders to index. For example ('www', 'assets').
+        max_files (int, optional): The maximum number of files to index. Defaults to 20000.
+    """
+
+    check_interval = 1.0
+
+    def __init__(self, folders: Tuple[str, ...], max_files: int = 20000):
+        self.folders = folders
+        self.max_files = max_files
+        self._files: Dict[Tuple[str, ...], str] = dict()
+        self._dir_mtimes: Dict[str, Optional[int]] = dict()
+        self._complete = False
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def refresh(self):
+        """Scans the folders again"""
+        files: Dict[Tuple[str, ...], str] = dict()
+        dir_mtimes: Dict[str, Optional[int]] = dict()
+        complete = True
+        for folder in reversed(self.folders):  # The first folder overrides the others
+            if not self._scan(folder or ".", folder, (), files, dir_mtimes, set()):
+                complete = False
+                break
+        with self._lock:
+            self._files = files if complete else dict()
+            self._dir_mtimes = dir_mtimes
+            self._complete = complete
+            self._checked_at = time.monotonic()
+
+    def _scan(self, dir_path, path, elements, files, dir_mtimes, visited) -> bool:
+        try:
+            dir_stat = os.stat(dir_path)
+        except OSError:
+            dir_mtimes[dir_path] = None
+            return True
+        dir_mtimes[dir_path] = dir_stat.st_mtime_ns
+        if (dir_stat.st_dev, dir_stat.st_ino) in visited:  # Guard against symlink loops
+            return True
+        visited.add((dir_stat.st_dev, dir_stat.st_ino))
+        try:
+            entries = list(os.scandir(dir_path))
+        except OSError:
+            return True
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            entry_elements = elements + (entry.name,)
+            entry_path = os.path.join(path, entry.name) if path else entry.name
+            try:
+                if entry.is_dir():
+                    if not self._scan(
+                        entry.path, entry_path, entry_elements, files, dir_mtimes, visited
+                    ):
+                        return False
+                elif entry.is_file():
+                    files[entry_elements] = entry_path
+                    if len(files) > self.max_files:
+                        return False
+            except OSError:
+                continue
+        return True
+
+    def is_stale(self) -> bool:
+        """Returns True if a file was added to or removed from the folders since the last scan"""
+        for dir_path, mtime in self._dir_mtimes.items():
+            try:
+                if os.stat(dir_path).st_mtime_ns != mtime:
+                    return True
+            except OSError:
+                if mtime is not None:
+                    return True
+        return False
+
+    def lookup(self, file_path_elements: Tuple[str, ...]) -> Optional[str]:
+        """Returns the path of the file that wins the lookup, or None if no folder has it
+
+        Args:
+            file_path_elements (Tuple[str, ...]): For example ('css', 'style.css').
+
+        Returns:
+            Optional[str]: The path of the file. For example 'www/css/style.css'.
+        """
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            if self.is_stale():
+                self.refresh()
+            else:
+                self._checked_at = time.monotonic()
+        if self._complete:
+            src_file = self._files.get(file_path_elements)
+            if src_file is None or os.path.isfile(src_file):
+                return src_file
+            # Removed since the last scan, another folder may have the file
+            self.refresh()
+            if self._complete:
+                return self._files.get(file_path_elements)
+        for folder in self.folders:
+            src_file = os.path.join(folder, *file_path_elements)
+            if os.path.isfile(src_file):
+                return src_file
+        return None
+
+
+_asset_indexes: Dict[Tuple, AssetIndex] = dict()
+_asset_indexes_lock = threading.Lock()
+
+
+def get_asset_index(src_folder: str, asset_folders: Optional[List[str]] = None) -> AssetIndex:
+    """Returns the AssetIndex of the src_folder and asset_folders, building it on first use.
+    As in find_src_file, the src_folder has precedence, followed by the asset_folders from the
+    last to the first.
+
+    Args:
+        src_folder (str): The path to the source folder. For example 'www'.
+        asset_folders (Optional[List[str]], optional): A list of extra source folders.
+            Defaults to None.
+
+    Returns:
+        AssetIndex: The index
+    """
+    folders = (src_folder,) + tuple(
+        _get_asset_folder_path(folder) for folder in reversed(asset_folders or ())
+    )
+    key = (os.getcwd(), folders)
+    asset_index = _asset_indexes.get(key)
+    if asset_index is None:
+        with _asset_indexes_lock:
+            asset_index = _asset_indexes.get(key)
+            if asset_index is None:
+                asset_index = _asset_indexes[key] = AssetIndex(folders)
+    return asset_index
+
+
+def refresh_asset_indexes():
+    """Rescans the folders of every AssetIndex, for example after adding asset files"""
+    with _asset_indexes_lock:
+        asset_indexes = list(_asset_indexes.values())
+    for asset_index in asset_indexes:
+        asset_index.refresh()
+
+
+_existing_folders = set()
+
+
+def _make_folder(folder: str):
+    """Creates the folder and its parents, once per process, if it does not exist yet
+
+    Args:
+        folder (str): The folder. For example 'static/css'.
+    """
+    key = os.path.abspath(folder)  # Relative folders change with the working directory
+    if key in _existing_folders:
+        return
+    if not os.path.exists(folder):
+        try:
+            os.makedirs(folder)
+        except OSError as exception:  # Guard against race condition
+            if exception.errno != errno.EEXIST:
+                raise
+    _existing_folders.add(key)
+
+
 # Todo:
 # This function is very complicated and could benefit from a refactoring
 # Consider refactoring into find_src_file, find_dst_filde and file_src_and_dst_file functions as
@@ -132,49 +500,17 @@ def find_src_file(
     Returns:
         Tuple[Optional[Text], Optional[Text]]: The (src_file, dst_file) tuple.
     """
-    filename = filename.strip()
-
-    file_path_elements = [
-        element
-        for element in filename.rstrip("/").split("/")
-        if len(element) > 0 and element[0] != "."
-    ]
+    file_path_elements = _split_path(filename.strip())
 
     if dst_folder is None:
         dst_file = None
     else:
         dst_folder = os.sep.join([dst_folder] + file_path_elements[:-1])
         dst_file = os.path.join(dst_folder, file_path_elements[-1])
+        _make_folder(dst_folder)
 
-        if not dst_file or not os.path.isfile(dst_file):
-
-            if not os.path.exists(dst_folder):
-                try:
-                    os.makedirs(dst_folder)
-                except OSError as exception:  # Guard against race condition
-                    if exception.errno != errno.EEXIST:
-                        raise
-
-    src_file = os.path.join(src_folder, *file_path_elements)
-    src_exists = False
-    if src_file and os.path.isfile(src_file):
-        src_exists = True
-    elif asset_folders:
-        for folder in reversed(asset_folders):
-            folder_path_elements = [
-                element
-                for element in folder.rstrip("/").split("/")
-                if len(element) > 0 and element[0] != "."
-            ]
-            if folder.startswith("/"):
-                folder_path_elements[0] = "/" + folder_path_elements[0]
-            src_file = os.path.join(*folder_path_elements, *file_path_elements)
-            if src_file and os.path.isfile(src_file):
-                src_exists = True
-                break
-    if src_exists:
-        return src_file, dst_file
-    return None, dst_file
+    src_file = get_asset_index(src_folder, asset_folders).lookup(tuple(file_path_elements))
+    return src_file, dst_file
 
 
 # Todo: Describe why you want to load content with script tags. And not just .js
@@ -185,11 +521,15 @@ def get_inline_js(
     src_folder: str,
     dst_folder: Optional[str] = None,
     asset_folders: Optional[List[str]] = None,
+    minifier: Optional[Callable[[str], str]] = None,
 ) -> str:
     """Locates and returns the content of the source file.
 
     Note that "</script" is replaced with r"\u003c/script"
 
+    The escaped content is kept in the inline_cache, so the file is only read again when its
+    modification time or size changes.
+
     Args:
         filename (str): The name of the file. For example 'main.js' or 'main.html'
         src_folder (str): The path to the source folder. For example 'www'.
@@ -197,13 +537,15 @@ def get_inline_js(
             'static'. Defaults to None.
         asset_folders (Optional[List[str]], optional): A list of extra source folders.
             Defaults to None.
+        minifier (Optional[Callable[[str], str]], optional): For example minify.minify_js.
+            Defaults to None.
 
 
     Returns:
         [str]: The inline js
     """
     src_file, _ = find_src_file(filename, src_folder, dst_folder, asset_folders)
-    return _read_file(src_file).replace("</script", r"\u003c/script")
+    return _read_inline_file(src_file, "</script", r"\u003c/script", minifier)
 
 
 # Todo: Describe why you want to load content with style tags. And not just .css
@@ -213,11 +555,15 @@ def get_inline_css(
     src_folder: str,
     dst_folder: Optional[str] = None,
     asset_folders: Optional[List[str]] = None,
+    minifier: Optional[Callable[[str], str]] = None,
 ) -> str:
     """Locates and returns the content of the source file.
 
     Note that "</style" is replaced with r"\u003c/style"
 
+    The escaped content is kept in the inline_cache, so the file is only read again when its
+    modification time or size changes.
+
     Args:
         filename (str): The name of the file. For example 'style.css' or 'style.html'
         src_folder (str): The path to the source folder. For example 'www'.
@@ -225,13 +571,375 @@ def get_inline_css(
             'static'. Defaults to None.
         asset_folders (Optional[List[str]], optional): A list of extra source folders.
             Defaults to None.
+        minifier (Optional[Callable[[str], str]], optional): For example minify.minify_css.
+            Defaults to None.
 
 
     Returns:
         [str]: The inline css
     """
     src_file, _ = find_src_file(filename, src_folder, dst_folder, asset_folders)
-    return _read_file(src_file).replace("</style", r"\00003c/style")
+    return _read_inline_file(src_file, "</style", r"\00003c/style", minifier)
+
+
+def file_digest(path: str) -> str:
+    """Returns the sha256 hex digest of the contents of the file
+
+    Args:
+        path (str): The path to the file.
+
+    Returns:
+        str: The hex digest
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as binary_file:
+        for chunk in iter(lambda: binary_file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_sri_hash(src_file: str, algorithm: str = "sha384") -> str:
+    """Returns the subresource integrity hash of the file, for the integrity attribute of the
+    link and script elements, see the PYVIZ_INTEGRITY of the component module.
+
+    Args:
+        src_file (str): The path to the file, for example a downloaded copy of a cdn resource.
+        algorithm (str, optional): One of 'sha256', 'sha384' or 'sha512'. Defaults to 'sha384'.
+
+    Returns:
+        str: The hash, for example 'sha384-...'
+    """
+    digest = hashlib.new(algorithm)
+    with open(src_file, "rb") as src:
+        for chunk in iter(lambda: src.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return "{}-{}".format(algorithm, base64.b64encode(digest.digest()).decode("ascii"))
+
+
+def _copy_file_contents(src, dst):
+    """Copies the contents of the src file object into the dst file object, inside the kernel
+    with os.copy_file_range or os.sendfile where possible.
+
+    Args:
+        src (BinaryIO): The source file, opened for reading at offset 0.
+        dst (BinaryIO): The destination file, opened for writing at offset 0.
+    """
+    size = os.fstat(src.fileno()).st_size
+    copy_file_range = getattr(os, "copy_file_range", None)
+    sendfile = getattr(os, "sendfile", None)
+    if copy_file_range or sendfile:
+        offset = 0
+        try:
+            while offset < size:
+                if copy_file_range:
+                    copied = copy_file_range(src.fileno(), dst.fileno(), size - offset)
+                else:
+                    copied = sendfile(dst.fileno(), src.fileno(), offset, size - offset)
+                if not copied:
+                    break
+                offset += copied
+        except OSError:
+            pass
+        if offset == size:
+            return
+        src.seek(0)
+        dst.seek(0)
+        dst.truncate()
+    shutil.copyfileobj(src, dst, 1024 * 1024)
+
+
+def _get_tmp_file(dst_file: str) -> str:
+    """Returns a hidden file name, next to the dst_file, to write it before moving it in place"""
+    return os.path.join(
+        os.path.dirname(dst_file),
+        ".{}.{}.{}.tmp".format(os.path.basename(dst_file), os.getpid(), threading.get_ident()),
+    )
+
+
+@contextlib.contextmanager
+def _file_lock(dst_file: str):
+    """Holds an exclusive lock on the dst_file, so that processes publishing to the same
+    destination folder don't overwrite each other's updates. The lock file is kept in the
+    temporary folder, not next to the published files. Only a thread lock where fcntl is not
+    available.
+
+    Args:
+        dst_file (str): The path to the file. For example 'static/manifest.json'.
+    """
+    if fcntl is None:
+        with _file_locks_lock:
+            yield
+        return
+    lock_file = os.path.join(
+        tempfile.gettempdir(),
+        "panel_components.{}.lock".format(
+            hashlib.sha1(os.path.abspath(dst_file).encode("utf8")).hexdigest()[:16]
+        ),
+    )
+    with open(lock_file, "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+_file_locks_lock = threading.Lock()
+
+
+def _copy_file(src_file: str, dst_file: str, use_hardlinks: bool = False):
+    """Atomically replaces the dst_file with a copy of (or a hard link to) the src_file, so that
+    the dst_file is never seen partially written. The copy keeps the modification time of the
+    src_file.
+
+    Args:
+        src_file (str): The path to the source file.
+        dst_file (str): The path to the destination file.
+        use_hardlinks (bool, optional): Link instead of copying where possible.
+            Defaults to False.
+    """
+    tmp_file = _get_tmp_file(dst_file)
+    try:
+        if use_hardlinks:
+            try:
+                os.link(src_file, tmp_file)
+                os.replace(tmp_file, dst_file)
+                return
+            except OSError:  # For example if the folders are on different devices
+                if os.path.lexists(tmp_file):
+                    os.remove(tmp_file)
+        with open(src_file, "rb") as src, open(tmp_file, "wb") as dst:
+            _copy_file_contents(src, dst)
+        src_stat = os.stat(src_file)
+        os.utime(tmp_file, ns=(src_stat.st_atime_ns, src_stat.st_mtime_ns))
+        os.replace(tmp_file, dst_file)
+    except BaseException:
+        if os.path.lexists(tmp_file):
+            os.remove(tmp_file)
+        raise
+
+
+# What publish_file knows about a published file, so that it can skip checking it again
+PublishRecord = namedtuple(
+    "PublishRecord", ["src_file", "mtime_ns", "size", "compressed", "checked_at"]
+)
+
+
+class PublishManifest:
+    """Records the files published by publish_file, keyed by the absolute path of the destination
+    file. A file whose record was checked less than check_interval seconds ago is not checked
+    again.
+    """
+
+    check_interval = 1.0
+
+    def __init__(self):
+        self._records: Dict[str, PublishRecord] = dict()
+        self._lock = threading.Lock()
+
+    def get(self, dst_file: str) -> Optional[PublishRecord]:
+        """Returns the record of the destination file, or None"""
+        return self._records.get(dst_file)
+
+    def set(self, dst_file: str, record: PublishRecord):
+        """Records the destination file"""
+        with self._lock:
+            self._records[dst_file] = record
+
+    def forget(self, dst_file: str):
+        """Forgets the record of the destination file, so it's checked again on its next publish"""
+        with self._lock:
+            self._records.pop(dst_file, None)
+
+    def clear(self):
+        """Forgets all the records, so every file is checked again on its next publish"""
+        with self._lock:
+            self._records.clear()
+
+    def __len__(self):
+        return len(self._records)
+
+
+publish_manifest = PublishManifest()
+
+# The lists of the recording_published_files blocks running in each thread
+_published_files = threading.local()
+
+
+@contextlib.contextmanager
+def recording_published_files():
+    """Collects the absolute paths of the files published by publish_file and make_bundle in the
+    block, in the list it yields, whether or not they had to be written.
+
+    Example:
+
+    >>> with recording_published_files() as published_files:
+    ...     make_available("main.js", "www", "static")  # doctest: +SKIP
+    """
+    files: List[str] = list()
+    previous = getattr(_published_files, "files", None)
+    _published_files.files = files
+    try:
+        yield files
+    finally:
+        _published_files.files = previous
+
+
+def _record_published_file(dst_file: str):
+    files = getattr(_published_files, "files", None)
+    if files is not None:
+        files.append(os.path.abspath(dst_file))
+
+
+# The extensions of the files worth compressing. Images and fonts are compressed already.
+COMPRESSIBLE_EXTENSIONS = {
+    ".css",
+    ".csv",
+    ".html",
+    ".js",
+    ".json",
+    ".map",
+    ".svg",
+    ".txt",
+    ".xml",
+}
+# Smaller files don't fill a network packet, compressing them saves nothing
+COMPRESS_MIN_SIZE = 1024
+
+
+def _get_compressors() -> List[Tuple[str, Any]]:
+    compressors: List[Tuple[str, Any]] = [
+        (".gz", lambda data: gzip.compress(data, compresslevel=9, mtime=0))
+    ]
+    if brotli is not None:
+        compressors.append((".br", lambda data: brotli.compress(data, quality=11)))
+    return compressors
+
+
+def compress_file(dst_file: str) -> List[str]:
+    """Writes precompressed copies of the dst_file next to it, dst_file.gz and, when the brotli
+    module is installed, dst_file.br, so that a server can send them to the browsers that accept
+    those encodings instead of compressing the dst_file on every request.
+
+    The copies get the modification time of the dst_file and are only rewritten when it changes.
+    Files that are small or don't have one of the COMPRESSIBLE_EXTENSIONS are skipped, as are
+    copies that would not be smaller than the dst_file.
+
+    Args:
+        dst_file (str): The path to the published file.
+
+    Returns:
+        List[str]: The paths to the up to date compressed copies
+    """
+    if os.path.splitext(dst_file)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+        return []
+    dst_stat = os.stat(dst_file)
+    if dst_stat.st_size < COMPRESS_MIN_SIZE:
+        return []
+
+    compressed_files = []
+    data: Optional[bytes] = None
+    for suffix, compress in _get_compressors():
+        compressed_file = dst_file + suffix
+        try:
+            if os.stat(compressed_file).st_mtime_ns == dst_stat.st_mtime_ns:
+                compressed_files.append(compressed_file)
+                continue
+        except OSError:
+            pass
+
+        if data is None:
+            with open(dst_file, "rb") as dst:
+                data = dst.read()
+        compressed = compress(data)
+        if len(compressed) >= len(data):
+            if os.path.lexists(compressed_file):
+                os.remove(compressed_file)
+            continue
+
+        tmp_file = _get_tmp_file(compressed_file)
+        try:
+            with open(tmp_file, "wb") as tmp:
+                tmp.write(compressed)
+            os.utime(tmp_file, ns=(dst_stat.st_atime_ns, dst_stat.st_mtime_ns))
+            os.replace(tmp_file, compressed_file)
+        except BaseException:
+            if os.path.lexists(tmp_file):
+                os.remove(tmp_file)
+            raise
+        compressed_files.append(compressed_file)
+    return compressed_files
+
+
+def publish_file(
+    src_file: str, dst_file: str, use_hardlinks: bool = False, compress: bool = False
+) -> bool:
+    """Makes sure the dst_file has the contents of the src_file, copying only when needed
+
+    The src_file is compared with the publish_manifest record of the dst_file first, and then
+    with the dst_file itself by size and modification time, falling back to comparing their
+    contents when only the modification times differ.
+
+    Args:
+        src_file (str): The path to the source file.
+        dst_file (str): The path to the destination file.
+        use_hardlinks (bool, optional): Link instead of copying where possible.
+            Defaults to False.
+        compress (bool, optional): Also write precompressed copies of the dst_file, see
+            compress_file. Defaults to False.
+
+    Returns:
+        bool: True if the dst_file was (re)written
+    """
+    key = os.path.abspath(dst_file)
+    _record_published_file(key)
+    now = time.monotonic()
+    record = publish_manifest.get(key)
+    if (
+        record is not None
+        and record.src_file == src_file
+        and record.compressed >= compress
+        and now - record.checked_at < publish_manifest.check_interval
+    ):
+        return False
+
+    src_stat = os.stat(src_file)
+    if (
+        record is not None
+        and record.src_file == src_file
+        and record.compressed >= compress
+        and record.mtime_ns == src_stat.st_mtime_ns
+        and record.size == src_stat.st_size
+        and os.path.exists(dst_file)
+    ):
+        publish_manifest.set(key, record._replace(checked_at=now))
+        return False
+
+    try:
+        dst_stat: Optional[os.stat_result] = os.stat(dst_file)
+    except OSError:
+        dst_stat = None
+
+    copied = False
+    if dst_stat is None:
+        # The folder may have been removed since _make_folder created it
+        os.makedirs(os.path.dirname(dst_file) or os.curdir, exist_ok=True)
+    if dst_stat is None or dst_stat.st_size != src_stat.st_size:
+        _copy_file(src_file, dst_file, use_hardlinks)
+        copied = True
+    elif dst_stat.st_mtime_ns != src_stat.st_mtime_ns:
+        if file_digest(src_file) == file_digest(dst_file):
+            os.utime(dst_file, ns=(dst_stat.st_atime_ns, src_stat.st_mtime_ns))
+        else:
+            _copy_file(src_file, dst_file, use_hardlinks)
+            copied = True
+    if compress:
+        compress_file(dst_file)
+
+    publish_manifest.set(
+        key, PublishRecord(src_file, src_stat.st_mtime_ns, src_stat.st_size, compress, now)
+    )
+    return copied
 
 
 def make_available(
@@ -239,9 +947,13 @@ def make_available(
     src_folder: str,
     dst_folder: Optional[str] = None,
     asset_folders: Optional[List[str]] = None,
-):
+    use_hardlinks: bool = False,
+    compress: bool = False,
+) -> Optional[str]:
     """Locates the source file and makes sure it's available in the destionation folder
 
+    Only new or changed files are copied, see publish_file.
+
     Args:
         filename (str): The name of the file. For example 'main.js' or 'main.html'
         src_folder (str): The path to the source folder. For example 'www'.
@@ -249,16 +961,342 @@ def make_available(
             'static'. Defaults to None.
         asset_folders (Optional[List[str]], optional): A list of extra source folders.
             Defaults to None.
+        use_hardlinks (bool, optional): Link instead of copying where possible.
+            Defaults to False.
+        compress (bool, optional): Also write precompressed copies of the destination file, see
+            compress_file. Defaults to False.
+
+    Returns:
+        Optional[str]: The destination file, or None if the source file was not found
     """
     src_file, dst_file = find_src_file(filename, src_folder, dst_folder, asset_folders)
-    if src_file and not os.path.exists(dst_file):
-        if not os.path.exists(dst_folder):
-            try:
-                os.makedirs(dst_folder)
-            except OSError as exception:  # Guard against race condition
-                if exception.errno != errno.EEXIST:
-                    raise
-        shutil.copyfile(src_file, dst_file)
+    if src_file and dst_file:
+        publish_file(src_file, dst_file, use_hardlinks, compress)
+        return dst_file
+    return None
+
+
+def fingerprint_filename(filename: str, digest: str, length: int = 12) -> str:
+    """Returns the filename with the start of the digest inserted before its extension
+
+    Example:
+
+    >>> fingerprint_filename("bokeh.min.js", "0123456789abcdef")
+    'bokeh.min.0123456789ab.js'
+
+    Args:
+        filename (str): The name of the file. For example 'bokeh.min.js'.
+        digest (str): A hex digest of the contents of the file.
+        length (int, optional): The number of digest characters to use. Defaults to 12.
+
+    Returns:
+        str: The fingerprinted filename
+    """
+    name, dot, extension = filename.rpartition(".")
+    if not dot or not name:
+        return "{}.{}".format(filename, digest[:length])
+    return "{}.{}.{}".format(name, digest[:length], extension)
+
+
+_file_digests = LRUCache(max_bytes=1024 * 1024)
+
+
+def _get_file_digest(src_file: str) -> str:
+    """Returns the file_digest of the src_file, only reading it again when its modification time
+    or size changed.
+
+    Args:
+        src_file (str): The path to the file.
+
+    Returns:
+        str: The hex digest
+    """
+    src_stat = os.stat(src_file)
+    key = (os.path.abspath(src_file), src_stat.st_mtime_ns, src_stat.st_size)
+    digest = _file_digests.get(key)
+    if digest is None:
+        digest = file_digest(src_file)
+        _file_digests.set(key, digest)
+    return digest
+
+
+class AssetManifest:
+    """Maps the logical names of the assets published to a destination folder with fingerprinted
+    names to those names, and keeps a copy of the mapping in the manifest.json file of the folder,
+    for servers and tools outside of Python.
+
+    Args:
+        dst_folder (str): The path to the destination folder. For example 'static'.
+    """
+
+    filename = "manifest.json"
+
+    def __init__(self, dst_folder: str):
+        self.dst_folder = dst_folder
+        self._names: Dict[str, str] = dict()
+        self._lock = threading.Lock()
+        try:
+            with open(os.path.join(dst_folder, self.filename), encoding="utf8") as manifest:
+                self._names.update(json.load(manifest))
+        except (OSError, ValueError):
+            pass
+
+    def get(self, name: str) -> Optional[str]:
+        """Returns the fingerprinted name of the asset, or None"""
+        return self._names.get(name)
+
+    def set(self, name: str, fingerprinted_name: str):
+        """Records the fingerprinted name of the asset, updating the manifest.json file. The
+        names recorded in the file by other processes are kept."""
+        with self._lock:
+            if self._names.get(name) == fingerprinted_name:
+                return
+            _make_folder(self.dst_folder)
+            manifest_file = os.path.join(self.dst_folder, self.filename)
+            with _file_lock(manifest_file):
+                try:
+                    with open(manifest_file, encoding="utf8") as manifest:
+                        self._names.update(json.load(manifest))
+                except (OSError, ValueError):
+                    pass
+                self._names[name] = fingerprinted_name
+                tmp_file = _get_tmp_file(manifest_file)
+                with open(tmp_file, "w", encoding="utf8") as manifest:
+                    json.dump(self._names, manifest, indent=2, sort_keys=True)
+                os.replace(tmp_file, manifest_file)
+
+    def items(self) -> List[Tuple[str, str]]:
+        """Returns the (name, fingerprinted_name) pairs"""
+        with self._lock:
+            return list(self._names.items())
+
+
+_asset_manifests: Dict[str, AssetManifest] = dict()
+_asset_manifests_lock = threading.Lock()
+
+
+def get_asset_manifest(dst_folder: str) -> AssetManifest:
+    """Returns the AssetManifest of the destination folder
+
+    Args:
+        dst_folder (str): The path to the destination folder. For example 'static'.
+
+    Returns:
+        AssetManifest: The manifest
+    """
+    key = os.path.abspath(dst_folder)
+    with _asset_manifests_lock:
+        asset_manifest = _asset_manifests.get(key)
+        if asset_manifest is None:
+            asset_manifest = _asset_manifests[key] = AssetManifest(dst_folder)
+    return asset_manifest
+
+
+def make_available_fingerprinted(
+    filename: str,
+    src_folder: str,
+    dst_folder: str,
+    asset_folders: Optional[List[str]] = None,
+    use_hardlinks: bool = False,
+    compress: bool = False,
+) -> Optional[str]:
+    """Locates the source file and publishes it to the destination folder under a name that
+    includes a hash of its contents, see fingerprint_filename, recording the name in the
+    AssetManifest of the destination folder. As the contents of a published file never change,
+    it can be served with a far future expiration date.
+
+    Args:
+        filename (str): The name of the file. For example 'bokeh/bokeh.min.js'
+        src_folder (str): The path to the source folder. For example 'www'.
+        dst_folder (str): The path to the destination folder. For example 'static'.
+        asset_folders (Optional[List[str]], optional): A list of extra source folders.
+            Defaults to None.
+        use_hardlinks (bool, optional): Link instead of copying where possible.
+            Defaults to False.
+        compress (bool, optional): Also write precompressed copies of the published file, see
+            compress_file. Defaults to False.
+
+    Returns:
+        Optional[str]: The fingerprinted name, for example 'bokeh/bokeh.min.0123456789ab.js', or
+            None if the source file was not found
+    """
+    src_file, _ = find_src_file(filename, src_folder, asset_folders=asset_folders)
+    if not src_file:
+        return None
+    file_path_elements = _split_path(filename.strip())
+    file_path_elements[-1] = fingerprint_filename(
+        file_path_elements[-1], _get_file_digest(src_file)
+    )
+    fingerprinted_name = "/".join(file_path_elements)
+
+    dst_file = os.path.join(dst_folder, *file_path_elements)
+    _make_folder(os.path.dirname(dst_file))
+    publish_file(src_file, dst_file, use_hardlinks, compress)
+    get_asset_manifest(dst_folder).set("/".join(_split_path(filename)), fingerprinted_name)
+    return fingerprinted_name
+
+
+_CSS_URL_RE = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+_SOURCE_MAP_RE = re.compile(r"^[ \t]*//[#@] sourceMappingURL=.*$", re.MULTILINE)
+
+bundle_cache = LRUCache(max_bytes=1024 * 1024)
+
+
+def _rebase_css_urls(css: str, filename: str, root: str = "") -> str:
+    """Returns the css with its relative urls made relative to the root of the destination folder,
+    where the bundles are written, instead of to the folder of the filename.
+
+    Example:
+
+    >>> _rebase_css_urls("src: url('fonts/a.woff') url(/b.woff)", "katex/katex.css")
+    "src: url('katex/fonts/a.woff') url(/b.woff)"
+    >>> _rebase_css_urls("src: url(fonts/a.woff)", "katex/katex.css", "/app/static")
+    'src: url(/app/static/katex/fonts/a.woff)'
+
+    Args:
+        css (str): The css.
+        filename (str): The name of the css file. For example 'katex/katex.css'.
+        root (str, optional): The url of the destination folder, to make the urls absolute. For
+            example '/app/static'. Defaults to "".
+
+    Returns:
+        str: The css with rebased urls
+    """
+    folder = "/".join(_split_path(filename)[:-1])
+    if not folder and not root:
+        return css
+
+    def rebase(match):
+        quote, url = match.group(1), match.group(2).strip()
+        if url.startswith(("/", "#", "data:")) or "://" in url:
+            return match.group(0)
+        url = posixpath.normpath(posixpath.join(folder, url))
+        if root:
+            url = root.rstrip("/") + "/" + url
+        return "url({0}{1}{0})".format(quote, url)
+
+    return _CSS_URL_RE.sub(rebase, css)
+
+
+def make_bundle(
+    filenames: List[str],
+    kind: str,
+    src_folder: str,
+    dst_folder: str,
+    asset_folders: Optional[List[str]] = None,
+    compress: bool = False,
+    minifier: Optional[Callable[[str], str]] = None,
+) -> Optional[str]:
+    """Concatenates the js or css files into a single bundle file, named after a hash of its
+    contents, in the root of the destination folder, so that browsers make a single request for
+    all of them.
+
+    The source map comments of js files are removed, and the relative urls of css files are
+    rebased to the destination folder. The names of the bundles are kept in the bundle_cache, so
+    the files are only read again when one of them changes.
+
+    Args:
+        filenames (List[str]): The names of the files, in the order they should run in.
+        kind (str): Either 'js' or 'css'.
+        src_folder (str): The path to the source folder. For example 'www'.
+        dst_folder (str): The path to the destination folder. For example 'static'.
+        asset_folders (Optional[List[str]], optional): A list of extra source folders.
+            Defaults to None.
+        compress (bool, optional): Also write precompressed copies of the bundle, see
+            compress_file. Defaults to False.
+        minifier (Optional[Callable[[str], str]], optional): Applied to each file, for example
+            minify.minify_js. Defaults to None.
+
+    Returns:
+        Optional[str]: The name of the bundle, for example 'bundle.0123456789ab.js', or None if
+            none of the files were found
+    """
+    src_files = list()
+    for filename in filenames:
+        src_file, _ = find_src_file(filename, src_folder, asset_folders=asset_folders)
+        if src_file:
+            src_stat = os.stat(src_file)
+            src_files.append((filename, src_file, src_stat.st_mtime_ns, src_stat.st_size))
+    if not src_files:
+        return None
+
+    key = (os.path.abspath(dst_folder), kind, compress, minifier, tuple(src_files))
+    bundle_name = bundle_cache.get(key)
+    if bundle_name is not None and os.path.exists(os.path.join(dst_folder, bundle_name)):
+        _record_published_file(os.path.join(dst_folder, bundle_name))
+        return bundle_name
+
+    parts = list()
+    for filename, src_file, _, _ in src_files:
+        contents = _read_file(src_file)
+        if minifier is not None:
+            contents = minifier(contents)
+        if kind == "css":
+            parts.append(_rebase_css_urls(contents, filename))
+        else:
+            # Guards against files that rely on automatic semicolon insertion at their end
+            parts.append(_SOURCE_MAP_RE.sub("", contents).rstrip() + "\n;")
+    bundle = "\n".join(parts).encode("utf8")
+
+    bundle_name = "bundle.{}.{}".format(hashlib.sha256(bundle).hexdigest()[:12], kind)
+    bundle_file = os.path.join(dst_folder, bundle_name)
+    if not os.path.exists(bundle_file):
+        # Not _make_folder, as the folder may have been removed since it was created
+        os.makedirs(dst_folder, exist_ok=True)
+        tmp_file = _get_tmp_file(bundle_file)
+        try:
+            with open(tmp_file, "wb") as tmp:
+                tmp.write(bundle)
+            os.replace(tmp_file, bundle_file)
+        except BaseException:
+            if os.path.lexists(tmp_file):
+                os.remove(tmp_file)
+            raise
+    if compress:
+        compress_file(bundle_file)
+    bundle_cache.set(key, bundle_name)
+    _record_published_file(bundle_file)
+    return bundle_name
+
+
+def write_text_file(
+    dst_file: str, chunks: Iterable[str], compress: bool = False, keep_unchanged: bool = False
+) -> bool:
+    """Atomically replaces the dst_file with the text of the chunks, written as they are yielded,
+    so that the dst_file is never seen partially written
+
+    Args:
+        dst_file (str): The path to the file. For example 'site/index.html'.
+        chunks (Iterable[str]): The text, for example the chunks of Component.iter_page.
+        compress (bool, optional): Also write precompressed copies of the file, see
+            compress_file. Defaults to False.
+        keep_unchanged (bool, optional): Leave the dst_file, and its modification time, as it is
+            if it already has the same text. File servers derive their ETag and Last-Modified
+            headers from the modification time. Defaults to False.
+
+    Returns:
+        bool: True if the dst_file was written, False if it was kept unchanged
+    """
+    folder = os.path.dirname(dst_file)
+    if folder:
+        _make_folder(folder)
+    tmp_file = _get_tmp_file(dst_file)
+    try:
+        with open(tmp_file, "w", encoding="utf8") as tmp:
+            for chunk in chunks:
+                tmp.write(chunk)
+        if keep_unchanged and os.path.isfile(dst_file):
+            if filecmp.cmp(tmp_file, dst_file, shallow=False):
+                os.remove(tmp_file)
+                return False
+        os.replace(tmp_file, dst_file)
+    except BaseException:
+        if os.path.lexists(tmp_file):
+            os.remove(tmp_file)
+        raise
+    if compress:
+        compress_file(dst_file)
+    return True
 
 
 # Todo: Rename src_file to file. This function works on any file. Not only 'src' files.
@@ -296,6 +1334,9 @@ def make_inline_uri(
 ) -> str:
     """Returns an inline uri of the file
 
+    The uris are kept in the inline_uri_cache, keyed by the absolute path, modification time
+    and size of the file they were made from, so a changed file gets a new uri.
+
     Example:
 
     >>> import pathlib
@@ -315,63 +1356,58 @@ def make_inline_uri(
         [str]: The inline uri
     """
     src_file = src_file.strip()
-    if src_file in make_inline_uri.memo:  # type: ignore
-        return make_inline_uri.memo[src_file]  # type: ignore
-
-    memo_key = src_file
-    return_value = ""
     src_exists = False
 
     if src_file[0] in ["/", "~"]:
         if src_file and os.path.isfile(src_file):
             src_exists = True
     else:
-        file_path_elements = [
-            element
-            for element in src_file.strip("/").split("/")
-            if len(element) > 0 and element[0] != "."
-        ]
-
-        src_file = os.path.join(src_folder, *file_path_elements)
-        if src_file and os.path.isfile(src_file):
-            src_exists = True
-        elif asset_folders:
-            for folder in reversed(asset_folders):
-                folder_path_elements = [
-                    element
-                    for element in folder.strip("/").split("/")
-                    if len(element) > 0 and element[0] != "."
-                ]
-                if folder.startswith("/"):
-                    folder_path_elements[0] = "/" + folder_path_elements[0]
-                src_file = os.path.join(*folder_path_elements, *file_path_elements)
-                if src_file and os.path.isfile(src_file):
-                    src_exists = True
-                    break
+        src_file = get_asset_index(src_folder, asset_folders).lookup(
+            tuple(_split_path(src_file))
+        )
+        src_exists = src_file is not None
+
+    if not src_exists:
+        return ""
+
+    src_stat = os.stat(src_file)
+    key = (os.path.abspath(src_file), src_stat.st_mtime_ns, src_stat.st_size)
+    return_value = inline_uri_cache.get(key)
+    if return_value is None:
+        return_value = _make_inline_uri(src_file)
+        if return_value:
+            inline_uri_cache.set(key, return_value)
+    return return_value
 
-    if src_exists:
-        if src_file.lower().endswith(".svg"):
-            svg = open(src_file).read()
-            start = svg.find("<svg")
-            start = svg.find("<SVG") if start < 0 else start
-            return_value = 'data:image/svg+xml;charset=utf8,{}") format("svg");'.format(
-                html.escape(svg[start:])
-            )
-        else:
-            file_format = src_file.split(".")[-1].lower()
-            if file_format == "jpg":
-                file_format = "jpeg"
-            if file_format in {"png", "gif", "jpeg"}:
-                uri_start = "data:image/{};charset=utf8;base64,".format(file_format)
-            elif file_format in {"ttf", "otf", "woff", "woff2", "eot"}:
-                uri_start = "data:application/x-font-{};charset=utf8;base64,".format(file_format)
-            else:
-                return ""
-            base64encoded = base64.b64encode(open(src_file, "rb").read())
-            return_value = uri_start + base64encoded.decode()
-        make_inline_uri.memo[memo_key] = return_value  # type: ignore
 
-    return return_value
+def _make_inline_uri(src_file: str) -> str:
+    """Returns an inline uri with the contents of the src_file, or an empty string if the file
+    format is not supported.
 
+    Args:
+        src_file (str): The path to an existing file
 
-make_inline_uri.memo = dict() # type: ignore
+    Returns:
+        str: The inline uri
+    """
+    if src_file.lower().endswith(".svg"):
+        with open(src_file) as svg_file:
+            svg = svg_file.read()
+        start = svg.find("<svg")
+        start = svg.find("<SVG") if start < 0 else start
+        return 'data:image/svg+xml;charset=utf8,{}") format("svg");'.format(
+            html.escape(svg[start:])
+        )
+
+    file_format = src_file.split(".")[-1].lower()
+    if file_format == "jpg":
+        file_format = "jpeg"
+    if file_format in {"png", "gif", "jpeg"}:
+        uri_start = "data:image/{};charset=utf8;base64,".format(file_format)
+    elif file_format in {"ttf", "otf", "woff", "woff2", "eot"}:
+        uri_start = "data:application/x-font-{};charset=utf8;base64,".format(file_format)
+    else:
+        return ""
+    with open(src_file, "rb") as binary_file:
+        base64encoded = base64.b64encode(binary_file.read())
+    return uri_start + base64encoded.decode()
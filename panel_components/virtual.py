@@ -0,0 +1,364 @@
+"""This module renders very long lists and tables in a fixed height scroll container that only
+creates the rows in view, so the size of the DOM doesn't depend on the number of rows.
+
+The html only has the first rows, the rows themselves are serialized as compact JSON in
+window.data_values with the other component data, and a script renders the rows in view while
+scrolling. With a page_url, the rows aren't in the page at all: the script fetches them a page at
+a time from the server, for example from a server.RowsHandler, so that the size of the page
+doesn't depend on the number of rows either.
+
+The rows have a fixed height, longer values are cut.
+
+Example:
+
+>>> items = virtual_list(["Item {}".format(index) for index in range(100000)], height=300)
+"""
+import html
+import math
+from typing import Any, Dict, Hashable, List, Optional, Sequence
+
+from .component import Component, compact_json
+from .table import Formatter, _get_columns, _format_column
+
+VIRTUAL_ROWS_STYLE = """
+[data-virtual-rows] {
+  overflow-y: auto;
+  position: relative;
+}
+[data-virtual-rows] > ul {
+  margin: 0;
+  padding: 0;
+  list-style: none;
+}
+[data-virtual-rows] [data-virtual-body] > * {
+  box-sizing: border-box;
+  overflow: hidden;
+  white-space: nowrap;
+}
+[data-virtual-rows] thead th {
+  position: sticky;
+  top: 0;
+  background: #fff;
+}
+"""
+
+VIRTUAL_ROWS_SCRIPT = """
+(function () {
+  function init(element) {
+    element.setAttribute("data-virtual-ready", "");
+    var body = element.querySelector("[data-virtual-body]");
+    var rowHeight = Number(element.getAttribute("data-row-height"));
+    var rowCount = Number(element.getAttribute("data-row-count"));
+    var overscan = Number(element.getAttribute("data-overscan"));
+    var pageUrl = element.getAttribute("data-page-url");
+    var pageSize = Number(element.getAttribute("data-page-size"));
+    var isTable = body.tagName === "TBODY";
+    var rows = ((window.data_values || {})[element.id] || []).slice();
+    var requested = {};
+    var scheduled = false;
+    var offset = body.getBoundingClientRect().top - element.getBoundingClientRect().top
+      + element.scrollTop;
+
+    function makeRow(height, values) {
+      var row = document.createElement(isTable ? "tr" : "li");
+      row.style.height = height + "px";
+      if (values === null) {
+        row.setAttribute("aria-hidden", "true");
+      } else if (isTable) {
+        for (var i = 0; i < values.length; i++) {
+          row.appendChild(document.createElement("td")).textContent = values[i];
+        }
+      } else {
+        row.textContent = values;
+      }
+      return row;
+    }
+
+    function fetchPage(page) {
+      requested[page] = true;
+      var start = page * pageSize;
+      var stop = Math.min(start + pageSize, rowCount);
+      var url = pageUrl + (pageUrl.indexOf("?") < 0 ? "?" : "&") + "start=" + start
+        + "&stop=" + stop;
+      fetch(url).then(function (response) {
+        if (!response.ok) {
+          throw new Error(response.statusText);
+        }
+        return response.json();
+      }).then(function (pageRows) {
+        for (var i = 0; i < pageRows.length; i++) {
+          rows[start + i] = pageRows[i];
+        }
+        schedule();
+      }).catch(function () {
+        delete requested[page];  // Requested again on the next scroll
+      });
+    }
+
+    function render() {
+      scheduled = false;
+      var top = element.scrollTop - offset;
+      var first = Math.max(0, Math.floor(top / rowHeight) - overscan);
+      var last = Math.min(
+        rowCount, Math.ceil((top + element.clientHeight) / rowHeight) + overscan
+      );
+      var fragment = document.createDocumentFragment();
+      if (first > 0) {
+        fragment.appendChild(makeRow(first * rowHeight, null));
+      }
+      for (var index = first; index < last; index++) {
+        var values = rows[index];
+        if (values === undefined) {
+          if (pageUrl && !requested[Math.floor(index / pageSize)]) {
+            fetchPage(Math.floor(index / pageSize));
+          }
+          values = isTable ? [] : "";
+        }
+        fragment.appendChild(makeRow(rowHeight, values));
+      }
+      if (last < rowCount) {
+        fragment.appendChild(makeRow((rowCount - last) * rowHeight, null));
+      }
+      while (body.firstChild) {
+        body.removeChild(body.firstChild);
+      }
+      body.appendChild(fragment);
+    }
+
+    function schedule() {
+      if (!scheduled) {
+        scheduled = true;
+        window.requestAnimationFrame(render);
+      }
+    }
+
+    element.addEventListener("scroll", schedule);
+    window.addEventListener("resize", schedule);
+    render();
+  }
+
+  function initAll() {
+    var elements = document.querySelectorAll("[data-virtual-rows]:not([data-virtual-ready])");
+    for (var i = 0; i < elements.length; i++) {
+      init(elements[i]);
+    }
+  }
+
+  // The component data is written after the scripts
+  if (document.readyState === "loading") {
+    document.addEventListener("DOMContentLoaded", initAll);
+  } else {
+    setTimeout(initAll, 0);
+  }
+})();
+"""
+
+
+def _get_row_tag(tag: str, height: int, aria_hidden: bool = False) -> str:
+    return '<{}{} style="height: {}px">'.format(
+        tag, ' aria-hidden="true"' if aria_hidden else "", height
+    )
+
+
+def _get_cells(row: Any, kind: str) -> str:
+    if kind == "table":
+        return "<td>" + "</td><td>".join(map(html.escape, row)) + "</td>"
+    return html.escape(row)
+
+
+def _virtual_rows(
+    kind: str,
+    rows: List,
+    opening: str,
+    row_height: int,
+    height: int,
+    row_count: Optional[int],
+    page_url: Optional[str],
+    page_size: int,
+    overscan: int,
+    attributes: Dict[str, Any],
+) -> Component:
+    """Returns the scroll container of the rows, with the html of the first rows"""
+    if row_height <= 0 or height <= 0:
+        raise ValueError("The row_height and the height must be positive")
+    if row_count is None:
+        if page_url:
+            raise ValueError("The row_count is needed to fetch the rows from the page_url")
+        row_count = len(rows)
+    if page_url and page_size <= 0:
+        raise ValueError("The page_size must be positive")
+
+    row_tag, closing_tag = ("tr", "</tr>") if kind == "table" else ("li", "</li>")
+    first_rows = min(row_count, len(rows), math.ceil(height / row_height) + overscan)
+    markup = [opening]
+    markup.extend(
+        _get_row_tag(row_tag, row_height) + _get_cells(row, kind) + closing_tag
+        for row in rows[:first_rows]
+    )
+    if first_rows < row_count:
+        markup.append(
+            _get_row_tag(row_tag, (row_count - first_rows) * row_height, aria_hidden=True)
+            + closing_tag
+        )
+    if kind == "table":
+        markup.append("</tbody></table>")
+    else:
+        markup.append("</ul>")
+
+    style = "height: {}px".format(height)
+    if "style" in attributes:
+        style = attributes.pop("style") + "; " + style
+    container = Component(
+        tag_name="div",
+        opening="<div>",
+        closing="</div>",
+        style=style,
+        data_virtual_rows="",
+        data_row_height=str(row_height),
+        data_row_count=str(row_count),
+        data_overscan=str(overscan),
+        **attributes
+    )
+    if page_url:
+        container.attributes["data-page-url"] = html.escape(page_url)
+        container.attributes["data-page-size"] = str(page_size)
+    container.append_html("".join(markup))
+    container.data(compact_json(rows))
+    container.prepend_body_style(virtual_rows=VIRTUAL_ROWS_STYLE)
+    container.append_body_script(virtual_rows=VIRTUAL_ROWS_SCRIPT)
+    return container
+
+
+def virtual_list(
+    items: Sequence,
+    row_height: int = 24,
+    height: int = 400,
+    row_count: Optional[int] = None,
+    page_url: Optional[str] = None,
+    page_size: int = 200,
+    overscan: int = 10,
+    **attributes
+) -> Component:
+    """Returns a list that only renders the items in view, in a scroll container of the height
+
+    Example:
+
+    >>> items = virtual_list(["Fish & Chips", "Pie"], row_height=20, height=100)
+    >>> print(items.get_html("", nb=False))  # doctest: +ELLIPSIS
+    <div style="height: 100px" data-virtual-rows ...><ul data-virtual-body><li style="height: 20px">Fish &amp; Chips</li><li style="height: 20px">Pie</li></ul></div>
+
+    Args:
+        items (Sequence): The items, converted to text with str. With a page_url, only the first
+            items, or none.
+        row_height (int, optional): The height of the items, in pixels. Defaults to 24.
+        height (int, optional): The height of the scroll container, in pixels. Defaults to 400.
+        row_count (Optional[int], optional): The number of items. Defaults to None, the number of
+            the items given. Needed with a page_url.
+        page_url (Optional[str], optional): The url the missing items are fetched from, a page at
+            a time, with start and stop query arguments. It must answer a JSON list of the items,
+            see server.RowsHandler. Defaults to None.
+        page_size (int, optional): The number of items fetched at once. Defaults to 200.
+        overscan (int, optional): The number of items rendered above and below the ones in view,
+            so that they're already there while scrolling. Defaults to 10.
+        **attributes: The attributes of the scroll container, for example css_classes or id.
+
+    Raises:
+        ValueError: If the heights aren't positive, or if there's a page_url but no row_count.
+
+    Returns:
+        Component: The scroll container of the list
+    """
+    return _virtual_rows(
+        "list",
+        list(map(str, items)),
+        "<ul data-virtual-body>",
+        row_height,
+        height,
+        row_count,
+        page_url,
+        page_size,
+        overscan,
+        attributes,
+    )
+
+
+def virtual_table(
+    data: Any,
+    columns: Optional[Sequence[Hashable]] = None,
+    formatters: Optional[Dict[Hashable, Formatter]] = None,
+    header: Optional[bool] = None,
+    row_height: int = 24,
+    height: int = 400,
+    row_count: Optional[int] = None,
+    page_url: Optional[str] = None,
+    page_size: int = 200,
+    overscan: int = 10,
+    **attributes
+) -> Component:
+    """Returns a table that only renders the rows in view, in a scroll container of the height.
+    The header row stays at the top of the container.
+
+    The values are converted to text a column at a time, like in table.table_from_frame.
+
+    Example:
+
+    >>> table = virtual_table([[7.5]], columns=["Price"], formatters={"Price": "{:.2f}"})
+
+    Args:
+        data (Any): A pandas DataFrame, a 1 or 2 dimensional NumPy array, or rows of values. With
+            a page_url, only the first rows, or none.
+        columns (Optional[Sequence[Hashable]], optional): The columns of the DataFrame to show,
+            or the names of the columns of the array or the rows, used as headers and as the keys
+            of the formatters. Defaults to None, all the columns of the DataFrame, or the
+            positions of the columns.
+        formatters (Optional[Dict[Hashable, Formatter]], optional): The format strings, for
+            example "{:,.2f}", or the functions that convert the values of the columns to text.
+            Defaults to None, which converts them with str.
+        header (Optional[bool], optional): Whether the table has a header row. Defaults to None,
+            which adds one for DataFrames and for the given columns.
+        row_height (int, optional): The height of the rows, in pixels. Defaults to 24.
+        height (int, optional): The height of the scroll container, in pixels. Defaults to 400.
+        row_count (Optional[int], optional): The number of rows. Defaults to None, the number of
+            rows of the data. Needed with a page_url.
+        page_url (Optional[str], optional): The url the missing rows are fetched from, a page at
+            a time, with start and stop query arguments. It must answer a JSON list of the rows,
+            each a list of the texts of its cells, see server.RowsHandler. Defaults to None.
+        page_size (int, optional): The number of rows fetched at once. Defaults to 200.
+        overscan (int, optional): The number of rows rendered above and below the ones in view,
+            so that they're already there while scrolling. Defaults to 10.
+        **attributes: The attributes of the scroll container, for example css_classes or id.
+
+    Raises:
+        ValueError: If the heights aren't positive, if there's a page_url but no row_count, if
+            the rows don't all have the same number of values, or if the number of columns isn't
+            the number of values of the rows.
+
+    Returns:
+        Component: The scroll container of the table
+    """
+    names, values = _get_columns(data, columns)
+    if header is None:
+        header = columns is not None or hasattr(data, "columns")
+    formatters = formatters or dict()
+
+    text_columns = [
+        _format_column(column, formatters.get(name)) for name, column in zip(names, values)
+    ]
+    markup = ["<table>"]
+    if header:
+        markup.append("<thead><tr>")
+        markup.extend("<th>" + html.escape(str(name)) + "</th>" for name in names)
+        markup.append("</tr></thead>")
+    markup.append("<tbody data-virtual-body>")
+    return _virtual_rows(
+        "table",
+        [list(row) for row in zip(*text_columns)],
+        "".join(markup),
+        row_height,
+        height,
+        row_count,
+        page_url,
+        page_size,
+        overscan,
+        attributes,
+    )
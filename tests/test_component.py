@@ -0,0 +1,683 @@
+# pylint: disable=redefined-outer-name,protected-access
+# pylint: disable=missing-function-docstring,missing-module-docstring,missing-class-docstring
+import os
+import shutil
+
+import panel as pn
+import pytest
+from panel_components import component as component_module
+from panel_components import tags
+from panel_components.component import (
+    PYVIZ_EXTENSIONS,
+    Component,
+    ComponentResources,
+    TemplateCache,
+)
+
+
+@pytest.fixture
+def tree():
+    first = tags.li("first", id="first")
+    first.append_body_js(shared="first.js", first="first.js")
+    first.prepend_body_css(shared="first.css", first="first.css")
+    first.asset_folders("first_folder")
+    first.pyviz_extensions("katex")
+
+    second = tags.li("second", id="second")
+    second.append_body_js(shared="second.js")
+    second.prepend_body_css(shared="second.css", second="second.css")
+    second.asset_folders("second_folder")
+    second.data_prefix = "second prefix"
+
+    root = tags.ul(first, second)
+    root.append_body_js(shared="root.js", root="root.js")
+    root.prepend_body_css(shared="root.css")
+    root.asset_folders("root_folder")
+    root.body_classes("dark wide")
+    return root
+
+
+def test_collect_resources_returns_component_resources(tree):
+    resources = tree.collect_resources()
+    assert isinstance(resources, ComponentResources)
+
+
+def test_collect_resources_descendants_win(tree):
+    resources = tree.collect_resources()
+    assert list(resources.append_body_js.items()) == [
+        ("shared", "second.js"),
+        ("root", "root.js"),
+        ("first", "first.js"),
+    ]
+
+
+def test_collect_resources_ancestors_win(tree):
+    resources = tree.collect_resources()
+    assert list(resources.prepend_body_css.items()) == [
+        ("shared", "root.css"),
+        ("second", "second.css"),
+        ("first", "first.css"),
+    ]
+
+
+def test_collect_resources_asset_folders_order(tree):
+    resources = tree.collect_resources()
+    assert resources.asset_folders == ("second_folder", "first_folder", "root_folder")
+
+
+def test_collect_resources_unions_and_prefixes(tree):
+    resources = tree.collect_resources()
+    assert resources.pyviz_extensions == {"katex"}
+    assert resources.body_classes == {"dark", "wide"}
+    assert resources.data_prefix == "second prefix"
+    assert resources.data_postfix == ""
+
+
+def test_collect_resources_is_immutable(tree):
+    resources = tree.collect_resources()
+    with pytest.raises(TypeError):
+        resources.append_body_js["other"] = "other.js"  # type: ignore
+
+
+@pytest.mark.parametrize(
+    "name",
+    [
+        "append_body_js",
+        "prepend_body_css",
+        "pyviz_extensions",
+        "body_classes",
+        "asset_folders",
+        "data_prefix",
+        "panels",
+    ],
+)
+def test_collect_resources_matches_getters(tree, name):
+    collected = getattr(tree.collect_resources(), name)
+    expected = getattr(tree, "get_" + name)()
+    if isinstance(expected, dict):
+        assert list(collected.items()) == list(expected.items())
+    elif isinstance(expected, list):
+        assert list(collected) == expected
+    else:
+        assert collected == expected
+
+
+def test_collect_resources_deep_tree():
+    leaf = Component().append_body_script(deep="var deep = true;")
+    root = leaf
+    for _ in range(5000):
+        root = Component(root)
+    assert dict(root.collect_resources().append_body_script) == {
+        "deep": "var deep = true;"
+    }
+
+
+def test_get_html():
+    component = tags.div(
+        tags.p("a < b", 1, css_classes="note"),
+        tags.br(),
+        tags.span(tags.b("{{ bold }}")),
+        id="root",
+        title='say "hi"',
+    )
+    assert component.get_html("") == (
+        '<div id="root" title="say &quot;hi&quot;">'
+        '<p class="note">a &lt; b1</p><br/>'
+        "<span><b>{{'{{'}} bold }}</b></span></div>"
+    )
+
+
+def test_iter_html_matches_get_html(tree):
+    fragments = list(tree.iter_html(""))
+    assert len(fragments) > 1
+    assert "".join(fragments) == tree.get_html("")
+
+
+def test_iter_html_deep_tree():
+    root = tags.span("leaf")
+    for _ in range(5000):
+        root = tags.div(root)
+    html = root.get_html("")
+    assert html.startswith("<div><div>")
+    assert html.count("</div>") == 5000
+
+
+@pytest.fixture
+def empty_template_cache(monkeypatch):
+    cache = TemplateCache()
+    monkeypatch.setattr(component_module, "template_cache", cache)
+    return cache
+
+
+def test_fingerprint_is_stable(tree):
+    assert tree.fingerprint() == tree.fingerprint()
+
+
+def test_fingerprint_changes_with_attributes(tree):
+    fingerprint = tree.fingerprint()
+    tree.add_attributes(title="changed")
+    assert tree.fingerprint() != fingerprint
+
+
+def test_fingerprint_changes_with_compress_assets(tree):
+    fingerprint = tree.fingerprint()
+    tree.compress_assets()
+    assert tree.fingerprint() != fingerprint
+
+
+def test_fingerprint_changes_with_asset_files(tmp_path):
+    asset_file = tmp_path / "app.js"
+    asset_file.write_text("var a = 1;")
+    component = Component().asset_folders(str(tmp_path))
+    component.append_body_js(app="app.js")
+    fingerprint = component.fingerprint()
+
+    asset_file.write_text("var a = 12;")
+    assert component.fingerprint() != fingerprint
+
+
+def test_template_cache():
+    cache = TemplateCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)  # Evicts "b", the least recently used entry
+    assert cache.get("b") is None
+    assert cache.stats() == {
+        "hits": 1,
+        "misses": 1,
+        "entries": 2,
+        "max_entries": 2,
+        "bytes": 0,
+        "max_bytes": 64 * 1024 * 1024,
+    }
+
+    cache.invalidate("a")
+    assert cache.get("a") is None
+    cache.invalidate()
+    assert cache.stats()["entries"] == 0
+
+
+def test_template_cache_is_bounded_by_size():
+    cache = TemplateCache(max_bytes=100)
+    cache.set("a", "a", size=60)
+    cache.set("b", "b", size=30)
+    cache.set("c", "c", size=30)  # Evicts "a"
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 60
+    cache.set("d", "d", size=101)  # Larger than the whole cache
+    assert cache.get("d") is None
+    cache.invalidate("b")
+    assert cache.stats()["bytes"] == 30
+
+
+def test_template_cache_size_of_templates(empty_template_cache):
+    tags.div(tags.p("Hello")).servable()
+    (cached,) = empty_template_cache._entries.values()
+    size = empty_template_cache.stats()["bytes"]
+    assert size == 2 * (len(cached.template_source) + len(cached.nb_template_source))
+
+
+def test_servable_reuses_cached_template(empty_template_cache):
+    component = tags.div(tags.p("Hello"))
+    first = component.servable()
+    second = component.servable()
+    assert empty_template_cache.stats()["hits"] == 1
+    assert second.template is first.template
+    assert list(second._render_items) == list(first._render_items)
+
+
+def test_servable_republishes_removed_assets(empty_template_cache, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "www").mkdir()
+    (tmp_path / "www" / "app.js").write_text("var a = 1;")
+    component = tags.div(tags.p("Hello"), main="app").append_body_js(app="app.js")
+    first = component.servable()
+    published_file = tmp_path / "static" / "app.js"
+    assert published_file.read_text() == "var a = 1;"
+
+    shutil.rmtree(str(tmp_path / "static"))
+    second = component.servable()
+    assert published_file.read_text() == "var a = 1;"
+    assert second.template is not first.template
+
+    third = component.servable()
+    assert third.template is second.template
+
+
+def test_servable_compresses_assets_of_cached_templates(
+    empty_template_cache, tmp_path, monkeypatch
+):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "www").mkdir()
+    (tmp_path / "www" / "app.js").write_text("var a = 1;\n" * 200)
+    component = tags.div(tags.p("Hello"), main="app").append_body_js(app="app.js")
+    component.servable()
+    assert not (tmp_path / "static" / "app.js.gz").exists()
+
+    component.compress_assets()
+    component.servable()
+    assert (tmp_path / "static" / "app.js.gz").exists()
+
+
+def test_servable_without_cache(empty_template_cache):
+    component = tags.div(tags.p("Hello"))
+    first = component.servable(use_cache=False)
+    second = component.servable(use_cache=False)
+    assert empty_template_cache.stats()["entries"] == 0
+    assert second.template is not first.template
+
+
+def test_fingerprint_assets(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "assets").mkdir()
+    (tmp_path / "assets" / "app.js").write_text("var a = 1;")
+    component = Component().asset_folders("assets")
+    component.append_body_js(app="app.js")
+    component.main = "app"
+    assert "/app/static/app.js" in component._get_template_contents_bottom(["assets"], nb=False)
+
+    component.fingerprint_assets()
+    template = component._get_template_contents_bottom(["assets"], nb=False)
+    published = {path.name for path in (tmp_path / "static").iterdir()}
+    fingerprinted = (published - {"app.js", "manifest.json"}).pop()
+    assert fingerprinted.startswith("app.") and fingerprinted.endswith(".js")
+    assert "/app/static/{}".format(fingerprinted) in template
+
+
+def test_resource_mode_cdn(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    url = PYVIZ_EXTENSIONS["katex"]["css"]["cdn"][0]
+    monkeypatch.setitem(component_module.PYVIZ_INTEGRITY, url, "sha384-abc")
+    component = Component(main="app").resource_mode("cdn")
+    component.pyviz_extensions("katex")
+    template = component._get_template_pyviz_resources([])
+    assert '<link href="{}" rel="stylesheet" integrity="sha384-abc"'.format(url) in template
+    assert PYVIZ_EXTENSIONS["bokeh"]["js"]["cdn"][0] in template
+    assert "/app/static/bokeh/panel.min.js" in template  # Not on a CDN
+    assert "/app/static/katex" not in template
+
+
+def test_resource_mode_inline():
+    component = Component(main="app").resource_mode("inline")
+    template = component._get_template_pyviz_resources([])
+    assert "/app/static/" not in template
+    assert "<script type=\"text/javascript\">" in template
+
+
+def test_resource_mode_default(monkeypatch):
+    monkeypatch.setattr(component_module, "_resource_mode", "local")
+    component = Component()
+    assert component.get_resource_mode() == "local"
+    component_module.set_resource_mode("cdn")
+    assert component.get_resource_mode() == "cdn"
+    assert component.resource_mode("inline").get_resource_mode() == "inline"
+    with pytest.raises(ValueError):
+        component.resource_mode("remote")
+
+
+def test_fingerprint_changes_with_resource_mode():
+    component = Component()
+    fingerprint = component.fingerprint()
+    assert component.resource_mode("cdn").fingerprint() != fingerprint
+
+
+def test_script_loading_order():
+    component = Component(main="app")
+    component.append_body_js(app="app.js").script_loading("app", after="vue")
+    component.append_body_js(vue="vue.js", helpers="helpers.js")
+    template = component._get_template_contents_bottom([], nb=False)
+    assert template.index("vue.js") < template.index("app.js") < template.index("helpers.js")
+
+
+def test_script_loading_cycle():
+    component = Component(main="app")
+    component.append_body_js(first="first.js").script_loading("first", after="second")
+    component.append_body_js(second="second.js").script_loading("second", after="first")
+    with pytest.raises(ValueError):
+        component._get_template_contents_bottom([], nb=False)
+
+
+def test_script_loading_attributes():
+    component = Component(main="app")
+    component.append_head_no_nb_js(analytics="analytics.js", vue="vue.js")
+    component.script_loading("analytics", loading="async")
+    component.script_loading("vue", loading="async", preload=True)
+    component.append_body_js(app="app.js").script_loading("app", after=["vue"])
+    head = component._get_template_head_no_nb([])
+    bottom = component._get_template_contents_bottom([], nb=False)
+    assert '<link rel="preload" href="/app/static/vue.js" as="script"' in head
+    assert 'src="/app/static/analytics.js" type="text/javascript" async' in head
+    # vue has a dependent, so it can't run in any order, and app must run after it
+    assert 'src="/app/static/vue.js" type="text/javascript" defer' in head
+    assert 'src="/app/static/app.js" type="text/javascript" defer' in bottom
+
+
+def test_script_loading_module_preload():
+    component = Component(main="app")
+    component.append_head_no_nb_module(main="main.mjs").script_loading("main", preload=True)
+    head = component._get_template_head_no_nb([])
+    assert '<link rel="modulepreload" href="/app/static/main.mjs"' in head
+    assert '<script src="/app/static/main.mjs" type="module" crossorigin' in head
+
+
+def test_script_loading_descendants_win():
+    child = Component().append_body_js(app="app.js").script_loading("app", loading="defer")
+    root = Component(child).append_body_js(app="app.js")
+    assert dict(root.collect_resources().script_loading) == {
+        ("append_body_js", "app"): component_module.ScriptLoading("defer", False, ())
+    }
+    with pytest.raises(ValueError):
+        root.script_loading("app", loading="lazy")
+    with pytest.raises(ValueError):
+        root.script_loading("vue", loading="defer")
+
+
+def test_script_names_like_the_loading_options():
+    component = Component().append_body_js(after="after.js", loading="loading.js")
+    assert dict(component.collect_resources().append_body_js) == {
+        "after": "after.js",
+        "loading": "loading.js",
+    }
+    assert dict(component.collect_resources().script_loading) == {}
+
+
+def test_bundle_assets(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "assets").mkdir()
+    for name in ["vue.js", "app.js", "late.js"]:
+        (tmp_path / "assets" / name).write_text("var {} = 1;".format(name[:-3]))
+    component = Component(main="app").asset_folders("assets").bundle_assets()
+    component.append_body_js(vue="vue.js", app="app.js")
+    component.append_body_js(late="late.js").script_loading("late", loading="defer")
+    template = component._get_template_contents_bottom(["assets"], nb=False)
+
+    assert template.count("<script src") == 2
+    assert '/app/static/late.js" type="text/javascript" defer' in template
+    bundle = (set(path.name for path in (tmp_path / "static").iterdir()) - {"late.js"}).pop()
+    assert "/app/static/{}".format(bundle) in template
+    assert (tmp_path / "static" / bundle).read_text() == "var vue = 1;\n;\nvar app = 1;\n;"
+
+
+def test_bundle_assets_keeps_blocking_order(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    component = Component(main="app").bundle_assets()
+    component.append_body_js(first="first.js")
+    component.append_body_js(second="second.js").script_loading("second", preload=True)
+    component.append_body_js(third="third.js")
+    (tmp_path / "www").mkdir()
+    for name in ["first.js", "second.js", "third.js"]:
+        (tmp_path / "www" / name).write_text(name)
+    template = component._get_template_contents_bottom([], nb=False)
+    assert template.count("<script src") == 3
+    assert template.index("bundle.") < template.index("second.js") < template.rindex("bundle.")
+
+
+def test_minify_assets():
+    component = Component().append_body_script(app="var app = 1;  // App\n\n")
+    component.prepend_body_style(app="body {\n  color: red;\n}\n")
+    assert "var app = 1;  // App" in component._get_template_contents_bottom([], nb=False)
+
+    component.minify_assets()
+    assert "var app=1;</script>" in component._get_template_contents_bottom([], nb=False)
+    assert "body{color:red}</style>" in component._get_template_contents_top([], nb=False)
+
+
+def test_critical_css(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "www").mkdir()
+    (tmp_path / "www" / "card.css").write_text(".card { color: red } .other { color: blue }")
+    component = tags.div("Hi", css_classes="card", main="app").critical_css()
+    component.prepend_body_css(card="card.css")
+    template = component._get_template_contents_top([], nb=False)
+    assert "<style>\n.card{color: red}</style>" in template
+    assert '<link rel="preload" href="/app/static/card.css" as="style"' in template
+    assert '<noscript><link href="/app/static/card.css" rel="stylesheet"' in template
+    assert (tmp_path / "static" / "card.css").exists()
+
+
+def test_get_panel_extensions():
+    spec = {"$schema": "https://vega.github.io/schema/vega-lite/v4.json", "mark": "bar"}
+    column = pn.Column(pn.widgets.Ace(value="x"), pn.Row(pn.pane.Vega(spec)))
+    latex = pn.pane.LaTeX("$x$", renderer="mathjax")
+    assert component_module.get_panel_extensions([column, latex, "Text"]) == {
+        "ace",
+        "vega",
+        "mathjax",
+    }
+
+
+def test_detect_extensions():
+    component = tags.div(pn.widgets.Ace(value="x")).pyviz_extensions("plotly katex")
+    resources = component.collect_resources()
+    assert component._get_pyviz_extension_names(resources) == {"bokeh", "plotly", "katex"}
+
+    component.detect_extensions()
+    assert component._get_pyviz_extension_names(resources) == {"bokeh", "ace", "katex"}
+    assert "plotly" not in component._get_template_pyviz_resources([])
+
+
+def test_lazy_panel_placeholder():
+    component = tags.div(component_module.lazy(pn.pane.Markdown("# Lazy"), height=200))
+    html = component.get_html("")
+    assert '<div data-lazy-panel="panel_' in html
+    assert 'style="min-height: 200px">{{ embed(roots.panel_' in html
+
+
+@pytest.mark.usefixtures("empty_template_cache")
+def test_servable_renders_lazy_panels_when_visible():
+    markdown = pn.pane.Markdown("# Lazy")
+    component = tags.div(component_module.lazy(markdown))
+    tmpl = component.servable()
+    name = next(iter(component.collect_resources().panels))
+    placeholder = tmpl._render_items[name][0]
+    trigger = tmpl._render_items[component_module.LAZY_PANELS_TRIGGER][0]
+    assert placeholder.objects == []
+    assert "[data-lazy-panel]" in component._get_template_lazy_panels()
+
+    trigger.value = name
+    assert placeholder.objects == [markdown]
+
+
+def test_iter_page_flushes_the_head_first():
+    component = tags.div(tags.ul(*[tags.li(str(index)) for index in range(2000)]))
+    chunks = list(component.iter_page(title="Report", chunk_size=1024))
+    assert chunks[0].startswith("<!DOCTYPE html>")
+    assert chunks[0].endswith("</head>\n")
+    assert "<title>Report</title>" in chunks[0]
+    assert len(chunks) > 10
+    assert all(len(chunk) >= 1024 for chunk in chunks[1:-1])
+    assert chunks[-1].endswith("</body>\n</html>\n")
+
+
+def test_iter_page_unescapes_the_html_and_renders_the_panels():
+    component = tags.div(tags.p("{{ embed(roots.text) }} {% raw %}"), pn.pane.Markdown("# Hi"))
+    name = next(iter(component.collect_resources().panels))
+    page = component.get_page(render_panel=lambda name, panel: "<{}>".format(name))
+    assert "<p>{{ embed(roots.text) }} {% raw %}</p>" in page
+    assert "<{}>".format(name) in page
+    assert "embed(roots.panel_" not in page
+
+
+@pytest.fixture
+def page_folder(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "www").mkdir()
+    (tmp_path / "www" / "app.js").write_text("var a = 1;")
+    return tmp_path
+
+
+def _get_page_component():
+    component = tags.div(tags.p("Report"), pn.pane.Markdown("# Hi"))
+    component.append_body_js(app="app.js")
+    return component
+
+
+def test_save_inline(page_folder):
+    component = _get_page_component()
+    component.save("site/index.html")
+    page = (page_folder / "site" / "index.html").read_text()
+    assert "var a = 1;" in page
+    assert "app.js" not in page
+    assert "Bokeh.safely" in page
+    assert not (page_folder / "site" / "static").exists()
+
+
+def test_save_local(page_folder):
+    component = _get_page_component()
+    component.main = "app"
+    component.save("site/index.html", resources="local")
+    page = (page_folder / "site" / "index.html").read_text()
+    assert '<script src="static/app.js"' in page
+    assert (page_folder / "site" / "static" / "app.js").read_text() == "var a = 1;"
+    assert component.main == "app"
+    assert component._dst_folder == "static"
+    assert all(item._asset_root is None for item in component._iter_tree())
+
+
+def test_save_unknown_resources(page_folder):
+    with pytest.raises(ValueError):
+        _get_page_component().save("index.html", resources="embedded")
+
+
+def test_text_children_are_text_nodes():
+    component = tags.p("Fish & Chips", 42)
+    assert [type(child) for child in component.children] == [
+        component_module.TextNode,
+        component_module.TextNode,
+    ]
+    assert component.get_html("") == "<p>Fish &amp; Chips42</p>"
+
+
+def test_text_nodes_cannot_have_children():
+    text = tags.p("Fish & Chips").children[0]
+    with pytest.raises(TypeError):
+        text.add_children(tags.b("!"))
+    with pytest.raises(TypeError):
+        text.append_html("<b>!</b>")
+    text.prepend_html("<i>Menu</i> ")
+    assert text.get_html("") == "<i>Menu</i> Fish &amp; Chips"
+
+
+def test_containers_are_created_on_first_use():
+    cell = tags.td("1")
+    assert cell._containers is None
+    assert cell.children[0]._containers is None
+    assert cell.collect_resources().append_body_js == {}
+    assert cell._containers is None
+
+    cell._panel_raw_css["cell"] = "td {margin: 0}"
+    cell.append_body_js(cell="cell.js")
+    assert cell.get_panel_raw_css() == {"cell": "td {margin: 0}"}
+    assert cell.get_append_body_js() == {"cell": "cell.js"}
+
+
+def test_components_accept_other_attributes():
+    component = tags.div()
+    component.custom = "value"
+    assert component.custom == "value"
+    assert component._dst_folder == "static"
+    component._dst_folder = "public"
+    assert component._dst_folder == "public"
+    assert tags.div()._dst_folder == "static"
+
+
+@pytest.fixture
+def new_document():
+    from bokeh.document import Document  # pylint: disable=import-outside-toplevel
+    from bokeh.io.doc import curdoc, set_curdoc  # pylint: disable=import-outside-toplevel
+
+    previous = curdoc()
+
+    def new():
+        set_curdoc(Document())
+
+    new()
+    yield new
+    set_curdoc(previous)
+
+
+def _build_page():
+    return tags.div(tags.p("Hello").data({"a": 1}), pn.pane.Markdown("# Hi"))
+
+
+def test_ids_are_the_same_in_every_render(new_document):
+    page = _build_page()
+    template = page._get_template([])
+    assert page._get_template([]) == template
+    new_document()
+    assert page._get_template([]) == template
+
+
+def test_canonical_ids_in_every_document(new_document):
+    first = _build_page()
+    new_document()
+    second = _build_page()
+    assert second.children[0].id != first.children[0].id
+    assert second.fingerprint() != first.fingerprint()
+    assert second.fingerprint(canonical_ids=True) == first.fingerprint(canonical_ids=True)
+
+
+def test_ids_are_unique_in_a_document(new_document):
+    first_id = tags.p().id
+    namespace = first_id[len("id_") : -len("1")]
+    assert first_id == "id_" + namespace + "1"
+    assert [tags.p().id for _ in range(2)] == ["id_" + namespace + "2", "id_" + namespace + "3"]
+    panels = tags.div(pn.pane.Markdown("# Hi")).get_panels()
+    assert list(panels) == ["panel_" + namespace + "4"]
+
+
+def test_ids_of_components_from_other_documents(new_document):
+    nav = tags.nav().data({"menu": 1})
+    old_panel = tags.div(pn.pane.Markdown("# Old"))
+    nav_id = nav.id
+    new_document()
+    paragraph = tags.p().data({"text": 2})
+    tree = tags.div(nav, paragraph, old_panel, tags.div(pn.pane.Markdown("# New")))
+    assert nav.id != paragraph.id
+
+    component_data = tree.collect_resources().component_data
+    assert nav.id == nav_id
+    assert component_data[nav.id]["data"] == {"menu": 1}
+    assert component_data[paragraph.id]["data"] == {"text": 2}
+    assert len(tree.get_panels()) == 2
+
+
+def test_set_id_generator(new_document):
+    component_module.set_id_generator(component_module.uuid_id)
+    try:
+        assert len(tags.p().id) == len("id_") + 32
+        with pytest.raises(TypeError):
+            component_module.set_id_generator("uuid")
+    finally:
+        component_module.set_id_generator()
+    assert component_module.get_id_generator() is component_module.counter_id
+
+
+def test_etag(page_folder, new_document):
+    component = _get_page_component()
+    etag = component.etag(version=1)
+    assert etag.startswith('W/"')
+    new_document()
+    assert _get_page_component().etag(version=1) == etag
+    assert _get_page_component().etag(variant="Report", version=1) != etag
+    assert _get_page_component().etag(version=2) != etag
+    assert tags.p("Report").etag().startswith('"')
+    assert tags.p("Report").etag() != tags.p("Summary").etag()
+
+
+def test_etag_of_panels_needs_a_version(new_document):
+    page_10 = tags.div(pn.pane.Markdown("# Price: 10"))
+    new_document()
+    page_99 = tags.div(pn.pane.Markdown("# Price: 99"))
+    assert page_10.etag() is None
+    assert page_99.etag() is None
+    assert page_10.etag(version=10) != page_99.etag(version=99)
+
+
+def test_last_modified(page_folder):
+    os.utime(str(page_folder / "www" / "app.js"), (0, 1600000000))
+    last_modified = _get_page_component().last_modified()
+    assert last_modified.timestamp() == 1600000000
+    assert last_modified.tzinfo is not None
+    assert tags.p("Report").last_modified() is None
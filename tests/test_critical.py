@@ -0,0 +1,59 @@
+# pylint: disable=redefined-outer-name,protected-access
+# pylint: disable=missing-function-docstring,missing-module-docstring,missing-class-docstring
+import pytest
+from panel_components.critical import (
+    critical_cache,
+    extract_critical_css,
+    get_critical_css,
+    get_selector_names,
+)
+
+
+@pytest.fixture
+def names():
+    return get_selector_names('<div id="main" class="card wide"><p class="note">Hi</p></div>')
+
+
+@pytest.mark.parametrize(
+    ["css", "expected"],
+    [
+        ("p { margin: 0 }", "p{margin: 0}"),
+        ("body > div.card { color: red }", "body > div.card{color: red}"),
+        ("#main .note:hover::after { content: '' }", "#main .note:hover::after{content: ''}"),
+        ("span, .note { color: red }", "span, .note{color: red}"),
+        (
+            "a[href$='.pdf'], .card:not(.narrow) { color: red }",
+            "a[href$='.pdf'], .card:not(.narrow){color: red}",
+        ),
+        ("span { color: red } .other { color: blue } #other { color: green }", ""),
+        (
+            "@media (max-width: 10px) { .card { width: 100% } .other { width: 0 } }",
+            "@media (max-width: 10px){.card{width: 100%}}",
+        ),
+        ("@media print { .other { width: 0 } }", ""),
+        ("@import 'other.css'; /* .card { color: red } */", ""),
+    ],
+)
+def test_extract_critical_css(css, expected, names):
+    assert extract_critical_css(css, names) == expected
+
+
+def test_extract_critical_css_used_font_faces(names):
+    css = (
+        "@font-face { font-family: 'Used'; src: url(used.woff) }"
+        "@font-face { font-family: Unused; src: url(unused.woff) }"
+        ".card { font-family: Used }"
+    )
+    assert extract_critical_css(css, names) == (
+        "@font-face{ font-family: 'Used'; src: url(used.woff) }.card{font-family: Used}"
+    )
+
+
+def test_get_critical_css(tmp_path, names):
+    critical_cache.clear()
+    css_file_path = tmp_path / "card.css"
+    css_file_path.write_text(".card { background: url(images/card.png) } .other { color: red }")
+    critical = get_critical_css("css/card.css", str(css_file_path), names, "/app/static")
+    assert critical == ".card{background: url(/app/static/css/images/card.png)}"
+    get_critical_css("css/card.css", str(css_file_path), names, "/app/static")
+    assert critical_cache.stats()["hits"] == 1
@@ -0,0 +1,52 @@
+# pylint: disable=missing-function-docstring,missing-module-docstring
+import json
+
+from panel_components import tags
+from panel_components.export import export_page, export_pages
+
+
+def create_report():
+    component = tags.div(tags.h1("Report"))
+    component.main = "app"
+    component.append_body_js(app="app.js")
+    component.fingerprint_assets()
+    return component
+
+
+def create_broken_report():
+    raise RuntimeError("No data")
+
+
+def test_export_page(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    result = export_page("site/index.html", create_report)
+    assert result.filename == "site/index.html"
+    assert result.seconds >= 0
+    assert result.error is None
+    assert "<h1>Report</h1>" in (tmp_path / "site" / "index.html").read_text()
+
+
+def test_export_page_reports_errors(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    result = export_page("site/index.html", create_broken_report)
+    assert result.error == "RuntimeError: No data"
+    assert not (tmp_path / "site" / "index.html").exists()
+
+
+def test_export_pages_share_the_static_folder(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "www").mkdir()
+    (tmp_path / "www" / "app.js").write_text("var a = 1;")
+    pages = [("site/report_{}.html".format(index), create_report) for index in range(8)]
+    pages.append(("site/broken.html", create_broken_report))
+
+    results = export_pages(pages, max_workers=4)
+
+    assert [result.filename for result in results] == [filename for filename, _ in pages]
+    assert [result.error for result in results[:-1]] == [None] * 8
+    assert results[-1].error == "RuntimeError: No data"
+    manifest = json.loads((tmp_path / "site" / "static" / "manifest.json").read_text())
+    assert (tmp_path / "site" / "static" / manifest["app.js"]).read_text() == "var a = 1;"
+    for index in range(8):
+        page = (tmp_path / "site" / "report_{}.html".format(index)).read_text()
+        assert 'src="static/{}"'.format(manifest["app.js"]) in page
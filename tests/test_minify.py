@@ -0,0 +1,48 @@
+# pylint: disable=redefined-outer-name,protected-access
+# pylint: disable=missing-function-docstring,missing-module-docstring,missing-class-docstring
+import pytest
+from panel_components.minify import minify, minify_cache, minify_css, minify_js
+
+
+@pytest.mark.parametrize(
+    ["js", "expected"],
+    [
+        ("var a = 1;  // One\n\n\nvar b = 2;", "var a=1;\nvar b=2;"),
+        ("a = 1 /* c */ + /* d */ 2", "a=1 + 2"),
+        ("/*! License */\nvar a;", "/*! License */\nvar a;"),
+        ("a = b\n++c", "a=b\n++c"),
+        ("var a = b - -c, d = e + +f", "var a=b - -c,d=e + +f"),
+        ('x = "it\'s  // not a comment"', 'x="it\'s  // not a comment"'),
+        ("var re = /https?:\\/\\//g; // comment", "var re=/https?:\\/\\//g;"),
+        ("return /[/]/.test(s)", "return /[/]/.test(s)"),
+        ("y = (1) / 2 // half", "y=(1)/ 2"),
+        ("var s = `a  ${ `b   c` }  d`;", "var s=`a  ${ `b   c` }  d`;"),
+    ],
+)
+def test_minify_js(js, expected):
+    assert minify_js(js) == expected
+
+
+@pytest.mark.parametrize(
+    ["css", "expected"],
+    [
+        ("a :hover { color : red ; }", "a :hover{color :red}"),
+        (
+            "@media screen and (max-width: 10px) { .a > .b , .c { margin: 0 auto; } }",
+            "@media screen and (max-width:10px){.a>.b,.c{margin:0 auto}}",
+        ),
+        (".a { width: calc(100% - 10px) }", ".a{width:calc(100% - 10px)}"),
+        ("a { content: 'x  ;}' } /* Done */", "a{content:'x  ;}'}"),
+        ("/*! License */ a { b: c }", "/*! License */ a{b:c}"),
+    ],
+)
+def test_minify_css(css, expected):
+    assert minify_css(css) == expected
+
+
+def test_minify_is_cached():
+    minify_cache.clear()
+    assert minify("var a = 1;", minify_js) == "var a=1;"
+    assert minify("var a = 1;", minify_js) == "var a=1;"
+    assert minify_cache.stats()["hits"] == 1
+    assert minify("var a = 1;", None) == "var a = 1;"
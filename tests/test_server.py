@@ -0,0 +1,87 @@
+# pylint: disable=missing-function-docstring,missing-module-docstring
+import asyncio
+
+import panel as pn
+from tornado import httpclient, httpserver, testing, web
+
+from panel_components import tags
+from panel_components.server import ComponentHandler, RowsHandler
+
+
+async def _fetch(handler_arguments, headers=None, handler=ComponentHandler, query=""):
+    app = web.Application([(r"/", handler, handler_arguments)])
+    sock, port = testing.bind_unused_port()
+    server = httpserver.HTTPServer(app)
+    server.add_sockets([sock])
+    chunks = []
+    try:
+        response = await httpclient.AsyncHTTPClient().fetch(
+            "http://127.0.0.1:{}/{}".format(port, query),
+            headers=headers,
+            streaming_callback=chunks.append,
+            raise_error=False,
+        )
+    finally:
+        server.stop()
+    return response, b"".join(chunks).decode("utf8")
+
+
+def test_component_handler_streams_the_page():
+    response, page = asyncio.run(
+        _fetch({"create_component": lambda: tags.p("Hi"), "title": "Streamed"})
+    )
+    assert response.headers["Content-Type"] == "text/html; charset=UTF-8"
+    assert "<title>Streamed</title>" in page
+    assert "<p>Hi</p>" in page
+
+
+def test_component_handler_answers_not_modified():
+    arguments = {"create_component": lambda: tags.p("Hi")}
+    response, _ = asyncio.run(_fetch(arguments))
+    etag = response.headers["Etag"]
+    assert etag == tags.p("Hi").etag(variant="Panel App")
+
+    response, page = asyncio.run(_fetch(arguments, headers={"If-None-Match": etag}))
+    assert response.code == 304
+    assert page == ""
+
+    arguments = {"create_component": lambda: tags.p("Bye")}
+    response, page = asyncio.run(_fetch(arguments, headers={"If-None-Match": etag}))
+    assert response.code == 200
+    assert "<p>Bye</p>" in page
+
+
+def test_component_handler_pages_with_panels():
+    prices = [10]
+    arguments = {
+        "create_component": lambda: tags.div(pn.pane.Markdown("# Price: {}".format(prices[0])))
+    }
+    response, page = asyncio.run(_fetch(arguments))
+    assert "Etag" not in response.headers
+    assert "Price: 10" in page
+
+    arguments["get_version"] = lambda: prices[0]
+    response, _ = asyncio.run(_fetch(arguments))
+    etag = response.headers["Etag"]
+    assert etag.startswith('W/"')
+    response, _ = asyncio.run(_fetch(arguments, headers={"If-None-Match": etag}))
+    assert response.code == 304
+
+    prices[0] = 99
+    response, page = asyncio.run(_fetch(arguments, headers={"If-None-Match": etag}))
+    assert response.code == 200
+    assert "Price: 99" in page
+
+
+def test_rows_handler_answers_a_page_of_rows():
+    items = ["Item {}".format(index) for index in range(100)]
+    arguments = {"get_rows": items.__getitem__, "max_page_size": 5}
+    response, rows = asyncio.run(_fetch(arguments, handler=RowsHandler, query="?start=10&stop=13"))
+    assert response.headers["Content-Type"] == "application/json; charset=UTF-8"
+    assert rows == '["Item 10","Item 11","Item 12"]'
+
+    _, rows = asyncio.run(_fetch(arguments, handler=RowsHandler, query="?start=10&stop=90"))
+    assert rows == '["Item 10","Item 11","Item 12","Item 13","Item 14"]'
+
+    response, _ = asyncio.run(_fetch(arguments, handler=RowsHandler, query="?start=ten"))
+    assert response.code == 400
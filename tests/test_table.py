@@ -0,0 +1,82 @@
+# pylint: disable=missing-function-docstring,missing-module-docstring
+import numpy as np
+import pytest
+
+from panel_components import tags
+from panel_components.table import escape_column, table_from_frame
+
+
+def test_table_from_rows():
+    table = table_from_frame([("Fish & Chips", 7.5), ("Soup", 4)])
+    assert table.get_html("", nb=False) == (
+        "<table><tbody>"
+        "<tr><td>Fish &amp; Chips</td><td>7.5</td></tr>"
+        "<tr><td>Soup</td><td>4</td></tr>"
+        "</tbody></table>"
+    )
+
+
+def test_table_from_array_matches_the_tags():
+    data = np.arange(6).reshape(3, 2) * 1.5
+    expected = tags.table(
+        tags.tbody(*[tags.tr(*[tags.td(str(value)) for value in row]) for row in data.tolist()])
+    )
+    assert table_from_frame(data).get_html("", nb=False) == expected.get_html("", nb=False)
+
+
+def test_table_formatters_and_column_classes():
+    table = table_from_frame(
+        np.array([[1234.5, 2], [0.25, 3]]),
+        columns=["Price", "Count"],
+        formatters={"Price": "{:,.2f}", "Count": lambda value: "x{:g}".format(value)},
+        column_classes={"Price": "number"},
+        css_classes="report",
+        id="prices",
+    )
+    html = table.get_html("", nb=False)
+    assert html.startswith('<table id="prices" class="report"><thead><tr>')
+    assert '<th class="number">Price</th><th>Count</th>' in html
+    assert '<tr><td class="number">1,234.50</td><td>x2</td></tr>' in html
+    assert '<tr><td class="number">0.25</td><td>x3</td></tr>' in html
+
+
+def test_table_without_header():
+    html = table_from_frame([[1]], columns=["A"], header=False).get_html("", nb=False)
+    assert html == "<table><tbody><tr><td>1</td></tr></tbody></table>"
+
+
+def test_table_escapes_template_markup():
+    table = table_from_frame([["{{ value }}"]])
+    assert table.get_html("", nb=False) == (
+        "<table><tbody><tr><td>{{'{{'}} value }}</td></tr></tbody></table>"
+    )
+
+
+def test_table_from_frame_with_pandas():
+    pandas = pytest.importorskip("pandas")
+    frame = pandas.DataFrame({"Dish": ["Soup"], "Price": [4.5]})
+    html = table_from_frame(frame).get_html("", nb=False)
+    assert "<thead><tr><th>Dish</th><th>Price</th></tr></thead>" in html
+    assert "<tr><td>Soup</td><td>4.5</td></tr>" in html
+
+    html = table_from_frame(frame, columns=["Price"]).get_html("", nb=False)
+    assert "<thead><tr><th>Price</th></tr></thead>" in html
+    assert "<tr><td>4.5</td></tr>" in html
+    with pytest.raises(KeyError):
+        table_from_frame(frame, columns=["Cost"])
+
+
+def test_table_from_frame_checks_the_columns():
+    with pytest.raises(ValueError):
+        table_from_frame([[1, 2, 3], [4, 5]])
+    with pytest.raises(ValueError):
+        table_from_frame([[1, 2, 3], [4, 5, 6]], columns=["A"])
+    with pytest.raises(ValueError):
+        table_from_frame(np.zeros((2, 3)), columns=["A", "B"])
+    html = table_from_frame([], columns=["A"]).get_html("", nb=False)
+    assert html == "<table><thead><tr><th>A</th></tr></thead><tbody></tbody></table>"
+
+
+def test_escape_column():
+    assert escape_column(["a & b", '"c"']) == ["a &amp; b", "&quot;c&quot;"]
+    assert escape_column(["a\0b", "<"]) == ["a\0b", "&lt;"]
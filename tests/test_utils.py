@@ -1,7 +1,12 @@
 # pylint: disable=redefined-outer-name,protected-access
 # pylint: disable=missing-function-docstring,missing-module-docstring,missing-class-docstring
+import base64
+import gzip
+import hashlib
+import json
 import os
 import pathlib
+import shutil
 
 import pytest
 from panel_components.utils import (
@@ -16,6 +21,23 @@ from panel_components.utils import (
     make_available,
     can_make_inline_uri,
     make_inline_uri,
+    LRUCache,
+    inline_cache,
+    inline_uri_cache,
+    AssetIndex,
+    get_asset_index,
+    PublishManifest,
+    publish_file,
+    publish_manifest,
+    fingerprint_filename,
+    make_available_fingerprinted,
+    compress_file,
+    get_sri_hash,
+    make_bundle,
+    bundle_cache,
+    write_text_file,
+    AssetManifest,
+    recording_published_files,
 )
 
 
@@ -170,6 +192,70 @@ def test_find_dst_file(tmp_path: pathlib.Path):
     assert dst == dst_file
 
 
+def test_find_src_file_precedence(tmp_path: pathlib.Path):
+    folders = []
+    for name in ["src", "first", "last"]:
+        folder_path = tmp_path / name
+        (folder_path / "css").mkdir(parents=True)
+        (folder_path / "css" / "style.css").write_text(name)
+        (folder_path / name).write_text(name)
+        folders.append(str(folder_path))
+    src_folder, first_folder, last_folder = folders
+
+    def find(filename):
+        src, _ = find_src_file(
+            filename, src_folder=src_folder, asset_folders=[first_folder, last_folder]
+        )
+        return src
+
+    assert find("css/style.css") == os.path.join(src_folder, "css", "style.css")
+    assert find("last") == os.path.join(last_folder, "last")
+    assert find("first") == os.path.join(first_folder, "first")
+    assert find("missing") is None
+
+
+def test_asset_index_notices_new_files(monkeypatch, src_folder_path):
+    monkeypatch.setattr(AssetIndex, "check_interval", 0)
+    asset_index = get_asset_index(str(src_folder_path))
+    assert asset_index.lookup(("new.js",)) is None
+
+    (src_folder_path / "new.js").write_text("var a=1")
+    assert asset_index.lookup(("new.js",)) == str(src_folder_path / "new.js")
+
+
+def test_asset_index_refresh(src_folder_path):
+    asset_index = AssetIndex((str(src_folder_path),))
+    (src_folder_path / "new.js").write_text("var a=1")
+    assert asset_index.is_stale()
+
+    asset_index.refresh()
+    assert asset_index.lookup(("new.js",)) == str(src_folder_path / "new.js")
+    assert not asset_index.is_stale()
+
+
+def test_asset_index_notices_removed_files(tmp_path):
+    for name in ["src", "assets"]:
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "image.png").write_bytes(b"png")
+    src_folder, asset_folder = str(tmp_path / "src"), str(tmp_path / "assets")
+    asset_index = get_asset_index(src_folder, [asset_folder])
+    assert asset_index.lookup(("image.png",)) == os.path.join(src_folder, "image.png")
+
+    os.remove(os.path.join(src_folder, "image.png"))
+    assert asset_index.lookup(("image.png",)) == os.path.join(asset_folder, "image.png")
+    os.remove(os.path.join(asset_folder, "image.png"))
+    assert make_inline_uri("image.png", src_folder, asset_folders=[asset_folder]) == ""
+    assert make_available("image.png", src_folder, str(tmp_path / "static")) is None
+
+
+def test_asset_index_too_many_files(src_folder_path):
+    for index in range(3):
+        (src_folder_path / "{}.js".format(index)).write_text("")
+    asset_index = AssetIndex((str(src_folder_path),), max_files=2)
+    assert asset_index.lookup(("2.js",)) == str(src_folder_path / "2.js")
+    assert asset_index.lookup(("3.js",)) is None
+
+
 def test_get_inline_js(filename, src_folder, src_file_path):
     src_file_path.write_text("<script>var a=1</script>")
     assert get_inline_js(filename, src_folder) == "<script>var a=1\\u003c/script>"
@@ -180,6 +266,50 @@ def test_get_inline_css(filename, src_folder, src_file_path):
     assert get_inline_css(filename, src_folder) == "<style>body {background: text}\\00003c/style>"
 
 
+def test_get_inline_js_is_cached(filename, src_folder, src_file_path):
+    inline_cache.clear()
+    src_file_path.write_text("var a=1")
+    assert get_inline_js(filename, src_folder) == "var a=1"
+    assert get_inline_js(filename, src_folder) == "var a=1"
+    assert inline_cache.stats()["hits"] == 1
+
+
+def test_get_inline_js_notices_changed_file(filename, src_folder, src_file_path):
+    src_file_path.write_text("var a=1")
+    assert get_inline_js(filename, src_folder) == "var a=1"
+    src_file_path.write_text("var a=12")
+    assert get_inline_js(filename, src_folder) == "var a=12"
+
+
+def test_get_inline_js_with_minifier(src_folder, src_folder_path):
+    (src_folder_path / "app.js").write_text("var app = 1;\n")
+    assert get_inline_js("app.js", src_folder) == "var app = 1;\n"
+    assert get_inline_js("app.js", src_folder, minifier=str.strip) == "var app = 1;"
+
+
+def test_get_inline_css_and_js_are_cached_separately(filename, src_folder, src_file_path):
+    src_file_path.write_text("</script></style>")
+    assert get_inline_js(filename, src_folder) == "\\u003c/script></style>"
+    assert get_inline_css(filename, src_folder) == "</script>\\00003c/style>"
+
+
+def test_lru_cache_byte_budget():
+    cache = LRUCache(max_bytes=10)
+    cache.set("a", "12345")
+    cache.set("b", "67890")
+    cache.get("a")
+    cache.set("c", "abc")  # Evicts "b", the least recently used entry
+    assert cache.get("b") is None
+    assert cache.stats()["bytes"] == 8
+
+    cache.set("d", "this value is too large")
+    assert cache.get("d") is None
+
+    cache.max_bytes = 3
+    assert cache.get("a") is None
+    assert cache.get("c") == "abc"
+
+
 def test_make_available(filename, src_folder, src_file, tmp_path): # pylint: disable=unused-argument
     dst_path = tmp_path / "desty"
     dst_folder = str(dst_path)
@@ -190,6 +320,182 @@ def test_make_available(filename, src_folder, src_file, tmp_path): # pylint: dis
     assert dst_file.exists()
 
 
+@pytest.fixture
+def no_publish_check_interval(monkeypatch):
+    monkeypatch.setattr(PublishManifest, "check_interval", 0)
+    publish_manifest.clear()
+
+
+@pytest.mark.usefixtures("no_publish_check_interval")
+def test_publish_file(src_file_path, tmp_path):
+    dst_file_path = tmp_path / "image.png"
+    assert publish_file(str(src_file_path), str(dst_file_path))
+    assert dst_file_path.read_text() == src_file_path.read_text()
+    assert dst_file_path.stat().st_mtime_ns == src_file_path.stat().st_mtime_ns
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["image.png", "src"]
+
+
+@pytest.mark.usefixtures("no_publish_check_interval")
+def test_publish_file_only_copies_changes(src_file_path, tmp_path):
+    dst_file = str(tmp_path / "image.png")
+    assert publish_file(str(src_file_path), dst_file)
+    assert not publish_file(str(src_file_path), dst_file)
+
+    src_file_path.write_text("changed")
+    assert publish_file(str(src_file_path), dst_file)
+    assert pathlib.Path(dst_file).read_text() == "changed"
+
+
+@pytest.mark.usefixtures("no_publish_check_interval")
+def test_publish_file_republishes_removed_files(src_file_path, tmp_path):
+    dst_file_path = tmp_path / "static" / "image.png"
+    with recording_published_files() as published_files:
+        assert publish_file(str(src_file_path), str(dst_file_path))
+        shutil.rmtree(str(tmp_path / "static"))
+        assert publish_file(str(src_file_path), str(dst_file_path))
+    assert dst_file_path.read_text() == "src"
+    assert published_files == [str(dst_file_path)] * 2
+
+
+@pytest.mark.usefixtures("no_publish_check_interval")
+def test_publish_file_compares_contents(src_file_path, tmp_path):
+    dst_file_path = tmp_path / "image.png"
+    dst_file_path.write_text(src_file_path.read_text())
+    assert not publish_file(str(src_file_path), str(dst_file_path))
+
+    dst_file_path.write_text("src".upper())  # Same size, different contents
+    publish_manifest.clear()
+    assert publish_file(str(src_file_path), str(dst_file_path))
+    assert dst_file_path.read_text() == "src"
+
+
+@pytest.mark.usefixtures("no_publish_check_interval")
+def test_publish_file_with_hardlinks(src_file_path, tmp_path):
+    dst_file_path = tmp_path / "image.png"
+    publish_file(str(src_file_path), str(dst_file_path), use_hardlinks=True)
+    assert dst_file_path.stat().st_ino == src_file_path.stat().st_ino
+
+
+def test_get_sri_hash(src_file):
+    assert get_sri_hash(src_file) == (
+        "sha384-" + base64.b64encode(hashlib.sha384(b"src").digest()).decode("ascii")
+    )
+    assert get_sri_hash(src_file, "sha256").startswith("sha256-")
+
+
+@pytest.fixture
+def js_file_path(tmp_path):
+    path = tmp_path / "app.js"
+    path.write_text("var a = 1;\n" * 200)
+    return path
+
+
+def test_compress_file(js_file_path):
+    compressed_files = compress_file(str(js_file_path))
+    gz_file_path = pathlib.Path(str(js_file_path) + ".gz")
+    assert str(gz_file_path) in compressed_files
+    assert gzip.decompress(gz_file_path.read_bytes()) == js_file_path.read_bytes()
+    assert gz_file_path.stat().st_mtime_ns == js_file_path.stat().st_mtime_ns
+
+
+def test_compress_file_reuses_compressed_files(js_file_path):
+    compress_file(str(js_file_path))
+    gz_file_path = pathlib.Path(str(js_file_path) + ".gz")
+    gz_file_path.write_bytes(b"reused")
+    os.utime(str(gz_file_path), ns=(0, js_file_path.stat().st_mtime_ns))
+    compress_file(str(js_file_path))
+    assert gz_file_path.read_bytes() == b"reused"
+
+    js_file_path.write_text("var b = 2;\n" * 200)
+    compress_file(str(js_file_path))
+    assert gzip.decompress(gz_file_path.read_bytes()) == js_file_path.read_bytes()
+
+
+@pytest.mark.parametrize("name", ["image.png", "small.js"])
+def test_compress_file_skips_files(tmp_path, name):
+    path = tmp_path / name
+    path.write_text("var a = 1;")
+    assert compress_file(str(path)) == []
+    assert [path.name for path in tmp_path.iterdir()] == [name]
+
+
+@pytest.mark.usefixtures("no_publish_check_interval")
+def test_publish_file_with_compress(js_file_path, tmp_path):
+    dst_file_path = tmp_path / "dst.js"
+    publish_file(str(js_file_path), str(dst_file_path))
+    assert not pathlib.Path(str(dst_file_path) + ".gz").exists()
+
+    assert not publish_file(str(js_file_path), str(dst_file_path), compress=True)
+    assert pathlib.Path(str(dst_file_path) + ".gz").exists()
+
+
+def test_make_bundle_js(src_folder_path, src_folder, tmp_path):
+    (src_folder_path / "a.js").write_text("var a = 1\n//# sourceMappingURL=a.js.map\n")
+    (src_folder_path / "b.js").write_text("var b = a + 1;")
+    dst_folder_path = tmp_path / "dst"
+    bundle = make_bundle(["a.js", "missing.js", "b.js"], "js", src_folder, str(dst_folder_path))
+    assert bundle.startswith("bundle.") and bundle.endswith(".js")
+    assert (dst_folder_path / bundle).read_text() == "var a = 1\n;\nvar b = a + 1;\n;"
+
+
+def test_make_bundle_css(src_folder_path, src_folder, tmp_path):
+    (src_folder_path / "katex").mkdir()
+    (src_folder_path / "katex" / "katex.css").write_text(
+        "@font-face {src: url(fonts/a.woff), url('data:font/woff;base64,AA')}"
+    )
+    bundle = make_bundle(["katex/katex.css"], "css", src_folder, str(tmp_path))
+    assert (tmp_path / bundle).read_text() == (
+        "@font-face {src: url(katex/fonts/a.woff), url('data:font/woff;base64,AA')}"
+    )
+
+
+def test_make_bundle_is_cached(src_folder_path, src_folder, tmp_path):
+    bundle_cache.clear()
+    js_file_path = src_folder_path / "a.js"
+    js_file_path.write_text("var a = 1;")
+    bundle = make_bundle(["a.js"], "js", src_folder, str(tmp_path))
+    assert make_bundle(["a.js"], "js", src_folder, str(tmp_path)) == bundle
+    assert bundle_cache.stats()["hits"] == 1
+
+    js_file_path.write_text("var a = 12;")
+    assert make_bundle(["a.js"], "js", src_folder, str(tmp_path)) != bundle
+
+
+def test_make_bundle_missing_files(src_folder, tmp_path):
+    assert make_bundle(["missing.js"], "js", src_folder, str(tmp_path)) is None
+
+
+@pytest.mark.parametrize(
+    ["filename", "expected"],
+    [
+        ("bokeh.min.js", "bokeh.min.0123456789ab.js"),
+        ("style.css", "style.0123456789ab.css"),
+        ("LICENSE", "LICENSE.0123456789ab"),
+        (".hidden", ".hidden.0123456789ab"),
+    ],
+)
+def test_fingerprint_filename(filename, expected):
+    assert fingerprint_filename(filename, "0123456789abcdef") == expected
+
+
+@pytest.mark.usefixtures("no_publish_check_interval")
+def test_make_available_fingerprinted(src_folder, src_file_path, tmp_path):
+    dst_folder = tmp_path / "dst"
+    name = make_available_fingerprinted("image.png", src_folder, str(dst_folder))
+    assert name.startswith("image.") and name.endswith(".png") and name != "image.png"
+    assert (dst_folder / name).read_text() == src_file_path.read_text()
+    assert json.loads((dst_folder / "manifest.json").read_text()) == {"image.png": name}
+
+    src_file_path.write_text("changed")
+    changed_name = make_available_fingerprinted("image.png", src_folder, str(dst_folder))
+    assert changed_name != name
+    assert (dst_folder / name).exists()  # Pages already served still refer to the old name
+
+
+def test_make_available_fingerprinted_missing_file(src_folder, tmp_path):
+    assert make_available_fingerprinted("missing.js", src_folder, str(tmp_path)) is None
+
+
 @pytest.mark.parametrize(
     ["file", "expected"],
     [
@@ -233,3 +539,57 @@ def test_can_make_inline_uri(file, expected):
 def test_make_inline_uri(file, inline_uri_start):
     src_folder = str(pathlib.Path(__file__).parent / "fixtures/")
     assert inline_uri_start in make_inline_uri(src_file=file, src_folder=src_folder)
+
+
+def test_make_inline_uri_is_cached(src_folder, src_file):  # pylint: disable=unused-argument
+    inline_uri_cache.clear()
+    uri = make_inline_uri(src_file="image.png", src_folder=src_folder)
+    assert uri == make_inline_uri(src_file="image.png", src_folder=src_folder)
+    assert inline_uri_cache.stats()["hits"] == 1
+    assert inline_uri_cache.stats()["entries"] == 1
+
+
+def test_make_inline_uri_notices_changed_file(src_folder, src_file_path):
+    src_file_path.write_bytes(b"first")
+    first_uri = make_inline_uri(src_file="image.png", src_folder=src_folder)
+    src_file_path.write_bytes(b"second")
+    assert make_inline_uri(src_file="image.png", src_folder=src_folder) != first_uri
+
+
+def test_make_inline_uri_does_not_mix_folders(tmp_path):
+    uris = set()
+    for name in ["first", "second"]:
+        folder_path = tmp_path / name
+        folder_path.mkdir()
+        (folder_path / "image.png").write_bytes(name.encode())
+        uris.add(make_inline_uri(src_file="image.png", src_folder=str(folder_path)))
+    assert len(uris) == 2
+
+
+def test_write_text_file(tmp_path):
+    dst_file = tmp_path / "site" / "index.html"
+    write_text_file(str(dst_file), iter(["<p>", "Hi", "</p>"]))
+    assert dst_file.read_text() == "<p>Hi</p>"
+    assert os.listdir(str(tmp_path / "site")) == ["index.html"]
+
+
+def test_asset_manifest_keeps_the_names_of_other_processes(tmp_path):
+    first = AssetManifest(str(tmp_path))
+    second = AssetManifest(str(tmp_path))
+    first.set("a.js", "a.0123.js")
+    second.set("b.js", "b.4567.js")
+    assert json.loads((tmp_path / "manifest.json").read_text()) == {
+        "a.js": "a.0123.js",
+        "b.js": "b.4567.js",
+    }
+
+
+def test_write_text_file_keeps_unchanged_files(tmp_path):
+    dst_file = tmp_path / "index.html"
+    assert write_text_file(str(dst_file), ["<p>Hi</p>"], keep_unchanged=True)
+    os.utime(str(dst_file), (0, 1600000000))
+    assert not write_text_file(str(dst_file), ["<p>", "Hi</p>"], keep_unchanged=True)
+    assert os.stat(str(dst_file)).st_mtime == 1600000000
+    assert write_text_file(str(dst_file), ["<p>Bye</p>"], keep_unchanged=True)
+    assert dst_file.read_text() == "<p>Bye</p>"
+    assert os.listdir(str(tmp_path)) == ["index.html"]
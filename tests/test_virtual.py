@@ -0,0 +1,67 @@
+# pylint: disable=missing-function-docstring,missing-module-docstring
+import numpy as np
+import pytest
+
+from panel_components import tags
+from panel_components.virtual import VIRTUAL_ROWS_SCRIPT, virtual_list, virtual_table
+
+
+def test_virtual_list_renders_the_first_rows():
+    items = virtual_list(["Fish & Chips", "Pie"], row_height=20, height=100, id="menu")
+    assert items.get_html("", nb=False) == (
+        '<div style="height: 100px" data-virtual-rows data-row-height="20" '
+        'data-row-count="2" data-overscan="10" id="menu"><ul data-virtual-body>'
+        '<li style="height: 20px">Fish &amp; Chips</li>'
+        '<li style="height: 20px">Pie</li>'
+        "</ul></div>"
+    )
+    resources = items.collect_resources()
+    assert resources.append_body_script["virtual_rows"] == VIRTUAL_ROWS_SCRIPT
+    assert 'menu: ["Fish & Chips","Pie"]' in items.get_data_template(resources)
+
+
+def test_virtual_list_html_does_not_grow_with_the_rows():
+    def get_html(count):
+        return virtual_list(range(count), height=240, id="items").get_html("", nb=False)
+
+    small, large = get_html(1000), get_html(1000000)
+    assert small.count("<li") == large.count("<li") == 21
+    assert len(large) - len(small) <= 10
+    assert '<li aria-hidden="true" style="height: 23999520px"></li>' in large
+
+
+def test_virtual_table_with_a_page_url():
+    table = virtual_table(
+        np.array([[1.5, 2], [3, 4]]),
+        columns=["Price", "Count"],
+        formatters={"Price": "{:.2f}"},
+        height=48,
+        row_count=100,
+        page_url="/rows?table=prices&page=1",
+        page_size=50,
+    )
+    html = table.get_html("", nb=False)
+    assert 'data-page-url="/rows?table=prices&amp;page=1" data-page-size="50"' in html
+    assert "<thead><tr><th>Price</th><th>Count</th></tr></thead><tbody data-virtual-body>" in html
+    assert '<tr style="height: 24px"><td>1.50</td><td>2.0</td></tr>' in html
+    assert '<tr aria-hidden="true" style="height: 2352px"></tr></tbody></table>' in html
+    assert ': [["1.50","2.0"],["3.00","4.0"]]' in table.get_data_template()
+
+
+def test_virtual_rows_errors():
+    with pytest.raises(ValueError):
+        virtual_list(["Pie"], row_height=0)
+    with pytest.raises(ValueError):
+        virtual_list(["Pie"], page_url="/rows")
+    with pytest.raises(ValueError):
+        virtual_table([["Pie"]], row_count=10, page_url="/rows", page_size=0)
+    with pytest.raises(ValueError):
+        virtual_table([["Pie", 4.5], ["Soup"]])
+    with pytest.raises(ValueError):
+        virtual_table([["Pie", 4.5]], columns=["Dish"])
+
+
+def test_virtual_rows_script_is_shared():
+    page = tags.div(virtual_list(["Pie"]), virtual_table([["Soup"]]))
+    template = page._get_template_contents_bottom([], nb=False)
+    assert template.count("function init(element)") == 1